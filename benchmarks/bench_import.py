@@ -0,0 +1,107 @@
+"""
+Benchmark of import time and memory: runs each case in a fresh interpreter and reports the wall time of its
+statements and the peak resident set size of the process, to track the cost of importing fredapi and of the pandas-free
+core API against the pandas one.
+
+Usage:
+
+    python -m benchmarks.bench_import --repeat 5 --json import.json
+    python -m benchmarks.bench_import --compare import.json
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import textwrap
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir)
+
+SETUP = textwrap.dedent('''\
+    import resource, sys, time
+    sys.path.insert(0, %r)
+
+    class Transport(object):
+        def get(self, url):
+            rows = ''.join('<observation date="%%d-%%02d-01" value="%%d.5" />' %% (1950 + i // 12, i %% 12 + 1, i)
+                           for i in range(900))
+            return '<observations>' + rows + '</observations>'
+
+        def close(self):
+            pass
+    ''') % ROOT
+
+CASES = [
+    ('python', ''),
+    ('import fredapi', 'import fredapi'),
+    ('from fredapi import Fred', 'from fredapi import Fred'),
+    ('get_series_columns', "from fredapi import Fred\n"
+                           "Fred(api_key='secret', transport=Transport()).get_series_columns('GDP')"),
+    ('get_series', "from fredapi import Fred\n"
+                   "Fred(api_key='secret', transport=Transport()).get_series('GDP')"),
+    ('import pandas', 'import pandas'),
+]
+
+
+def run_case(statements):
+    """run statements in a fresh interpreter, returning their wall time and the peak RSS of the process"""
+    script = SETUP + textwrap.dedent('''\
+        start = time.perf_counter()
+        %s
+        seconds = time.perf_counter() - start
+        print(seconds, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss, 'pandas' in sys.modules)
+        ''') % statements
+    output = subprocess.run([sys.executable, '-c', script], check=True, capture_output=True, text=True).stdout
+    seconds, rss, pandas = output.split()
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS
+    rss = int(rss) / (1024.0 if sys.platform != 'darwin' else 1024.0 ** 2)
+    return float(seconds), rss, pandas == 'True'
+
+
+def run_benchmark(repeat):
+    results = []
+    for name, statements in CASES:
+        runs = [run_case(statements) for _ in range(repeat)]
+        results.append({'case': name, 'seconds': min(run[0] for run in runs),
+                        'rss_mb': min(run[1] for run in runs), 'pandas': runs[0][2]})
+    return results
+
+
+def environment():
+    return {'python': platform.python_version(), 'platform': platform.platform()}
+
+
+def print_results(results, baseline=None):
+    previous = {result['case']: result for result in baseline['results']} if baseline else {}
+    print('%-26s %10s %10s %8s' % ('case', 'ms', 'RSS MB', 'pandas'))
+    for result in results:
+        line = '%-26s %10.1f %10.1f %8s' % (result['case'], result['seconds'] * 1e3, result['rss_mb'],
+                                            'yes' if result['pandas'] else 'no')
+        before = previous.get(result['case'])
+        if before and before['seconds']:
+            line += '   %+.0f%% time, %+.1f MB' % (100.0 * (result['seconds'] / before['seconds'] - 1),
+                                                   result['rss_mb'] - before['rss_mb'])
+        print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--json', help='write the results to this file')
+    parser.add_argument('--compare', help='results file of an earlier run to compare against')
+    args = parser.parse_args()
+
+    results = run_benchmark(args.repeat)
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+    print_results(results, baseline)
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({'environment': environment(), 'results': results}, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,83 @@
+"""
+Compare the columnar observation parser used by Fred.get_series and Fred.get_series_all_releases against the
+original per-element loop.
+
+Usage:
+
+    python -m benchmarks.bench_observations --rows 200000 --repeat 3
+"""
+import argparse
+import datetime
+import timeit
+import xml.etree.ElementTree as ET
+
+import pandas as pd
+
+from fredapi import Fred
+
+
+def make_payload(rows, vintages=4):
+    """
+    build an all-releases style <observations> payload with `rows` observations, cycling through `vintages`
+    revisions per observation date
+    """
+    start = datetime.date(1950, 1, 1)
+    lines = ['<?xml version="1.0" encoding="utf-8" ?>',
+             '<observations count="%d" offset="0" limit="100000">' % rows]
+    for i in range(rows):
+        date = start + datetime.timedelta(days=i // vintages)
+        realtime_start = date + datetime.timedelta(days=30 * (i % vintages + 1))
+        value = '.' if i % 97 == 0 else '%.2f' % (1000 + i * 0.01)
+        lines.append('<observation realtime_start="%s" realtime_end="9999-12-31" date="%s" value="%s"/>'
+                     % (realtime_start, date, value))
+    lines.append('</observations>')
+    return '\n'.join(lines).encode('utf-8')
+
+
+def legacy_all_releases(fred, root):
+    """the per-element loop that Fred.get_series_all_releases used before the columnar parser"""
+    data = {}
+    i = 0
+    for child in root:
+        val = child.get('value')
+        if val == fred.nan_char:
+            val = float('NaN')
+        else:
+            val = float(val)
+        data[i] = {'realtime_start': fred._parse(child.get('realtime_start')),
+                   'date': fred._parse(child.get('date')),
+                   'value': val}
+        i += 1
+    return pd.DataFrame(data).T
+
+
+def columnar_all_releases(fred, root):
+    columns = fred._parse_observations(root, ('realtime_start', 'date', 'value'))
+    return pd.DataFrame(columns, columns=['realtime_start', 'date', 'value'])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, default=100000)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--skip-legacy', action='store_true', help='only time the columnar parser')
+    args = parser.parse_args()
+
+    fred = Fred(api_key='benchmark')
+    root = ET.fromstring(make_payload(args.rows))
+
+    timings = [('columnar', columnar_all_releases)]
+    if not args.skip_legacy:
+        timings.append(('legacy', legacy_all_releases))
+
+    results = {}
+    for name, func in timings:
+        best = min(timeit.repeat(lambda: func(fred, root), number=1, repeat=args.repeat))
+        results[name] = best
+        print('%-10s %8d rows  %8.3f s  %12.0f rows/s' % (name, args.rows, best, args.rows / best))
+    if 'legacy' in results:
+        print('speedup    %.1fx' % (results['legacy'] / results['columnar']))
+
+
+if __name__ == '__main__':
+    main()
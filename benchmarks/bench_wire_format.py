@@ -0,0 +1,63 @@
+"""
+Compare parse time and peak memory of the XML and JSON wire formats on a large vintage-history payload, from raw
+response bytes to the DataFrame returned by Fred.get_series_all_releases. The xml-stream row parses the XML
+incrementally as Fred(stream=True) does.
+
+Usage:
+
+    python -m benchmarks.bench_wire_format --rows 200000 --repeat 3
+"""
+import argparse
+import io
+import json
+import timeit
+import tracemalloc
+import xml.etree.ElementTree as ET
+
+from fredapi import Fred
+from benchmarks.bench_observations import make_payload
+
+
+def to_json_payload(xml_payload):
+    """convert an <observations> payload to the equivalent FRED JSON response"""
+    root = ET.fromstring(xml_payload)
+    data = dict(root.attrib)
+    data['observations'] = [dict(child.attrib) for child in root]
+    return json.dumps(data).encode('utf-8')
+
+
+def parse(fred, payload):
+    if fred.stream:
+        return fred._parse_series_all_releases(fred._parse_stream(io.BytesIO(payload)))
+    return fred._parse_series_all_releases(fred._parse_response(payload))
+
+
+def peak_memory(func):
+    tracemalloc.start()
+    try:
+        func()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, default=100000)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    xml_payload = make_payload(args.rows)
+    payloads = [('xml', False, xml_payload), ('xml', True, xml_payload), ('json', False, to_json_payload(xml_payload))]
+
+    for file_type, stream, payload in payloads:
+        fred = Fred(api_key='benchmark', file_type=file_type, stream=stream)
+        best = min(timeit.repeat(lambda: parse(fred, payload), number=1, repeat=args.repeat))
+        peak = peak_memory(lambda: parse(fred, payload))
+        print('%-10s %8d rows  %6.1f MB payload  %8.3f s  %12.0f rows/s  %8.1f MB peak'
+              % (file_type + ('-stream' if stream else ''), args.rows, len(payload) / 1e6, best, args.rows / best,
+                 peak / 1e6))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,193 @@
+"""
+Benchmark suite for parsing and frame construction: runs Fred.get_series, Fred.get_series_all_releases and
+Fred.search_by_release on synthetic FRED-shaped XML and JSON payloads, with the network stubbed out, and reports
+throughput and peak memory, split into parse and frame building time per stage.
+
+Usage:
+
+    python -m benchmarks.suite --rows 10000 100000 1000000 --search 10000 --json results.json
+    python -m benchmarks.suite --compare results.json
+"""
+import argparse
+import datetime
+import io
+import json
+import platform
+import timeit
+import tracemalloc
+import xml.etree.ElementTree as ET
+
+import numpy as np
+import pandas as pd
+
+from fredapi import Fred, __version__
+from fredapi.cache import url_endpoint
+from fredapi.metrics import RequestStats
+from fredapi.ratelimit import RateLimiter, Retry
+from benchmarks.bench_observations import make_payload
+
+PAGE_SIZE = 1000
+LEAN_FIELDS = ['title', 'observation_start', 'observation_end', 'frequency_short', 'units_short',
+               'seasonal_adjustment_short', 'last_updated', 'popularity']
+
+
+def search_page(count, offset, notes_length=400):
+    """build one page of release/series search results"""
+    lines = ['<?xml version="1.0" encoding="utf-8" ?>',
+             '<seriess count="%d" offset="%d" limit="%d">' % (count, offset, PAGE_SIZE)]
+    notes = ('Synthetic notes. ' * (notes_length // 17 + 1))[:notes_length]
+    for i in range(offset, min(offset + PAGE_SIZE, count)):
+        lines.append('<series id="S%07d" realtime_start="2015-07-19" realtime_end="2015-07-19" title="Series %d" '
+                     'observation_start="1969-01-01" observation_end="2013-01-01" frequency="Annual" '
+                     'frequency_short="A" units="Dollars" units_short="$" seasonal_adjustment="Not Seasonally '
+                     'Adjusted" seasonal_adjustment_short="NSA" last_updated="2015-01-29 12:10:21-06" '
+                     'popularity="%d" notes="%s"/>' % (i, i, i % 100, notes))
+    lines.append('</seriess>')
+    return '\n'.join(lines).encode('utf-8')
+
+
+def to_json(payload):
+    """convert an XML payload to the equivalent FRED JSON response"""
+    root = ET.fromstring(payload)
+    data = dict(root.attrib)
+    data['observations' if root.tag == 'observations' else 'seriess'] = [dict(child.attrib) for child in root]
+    return json.dumps(data).encode('utf-8')
+
+
+class SyntheticTransport(object):
+    """
+    Transport answering every request with a synthetic payload for its endpoint, so that no network is used. Search
+    pages are served according to the offset parameter.
+    """
+
+    def __init__(self, observations=None, releases=None, search_count=0, file_type='xml'):
+        convert = to_json if file_type == 'json' else (lambda payload: payload)
+        self.observations = convert(observations) if observations is not None else None
+        self.releases = convert(releases) if releases is not None else None
+        self.pages = dict((offset, convert(search_page(search_count, offset)))
+                          for offset in range(0, max(search_count, 1), PAGE_SIZE))
+
+    def get(self, url):
+        if url_endpoint(url) == 'release/series':
+            offset = int(url.split('&offset=')[1].split('&')[0]) if '&offset=' in url else 0
+            return self.pages[offset]
+        if 'realtime_start=' in url:
+            return self.releases
+        return self.observations
+
+    def open(self, url):
+        return io.BytesIO(self.get(url))
+
+    def close(self):
+        pass
+
+
+def make_fred(transport, file_type, stream, stats):
+    return Fred(api_key='benchmark', transport=transport, file_type=file_type, stream=stream,
+                rate_limiter=RateLimiter(rate=1e9, period=1.0), retry=Retry(total=0), hooks=[stats])
+
+
+def run_case(name, rows, func, transport, file_type, stream, repeat):
+    """time func(fred) and measure its peak memory and per stage times"""
+    stats = RequestStats()
+    fred = make_fred(transport, file_type, stream, stats)
+    seconds = min(timeit.repeat(lambda: func(fred), number=1, repeat=repeat))
+    totals = stats.totals()
+    tracemalloc.start()
+    try:
+        func(fred)
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return {
+        'case': name,
+        'format': file_type + ('-stream' if stream else ''),
+        'rows': rows,
+        'seconds': seconds,
+        'rows_per_second': rows / seconds,
+        'requests': totals['requests'] // repeat,
+        'parse_seconds': totals['parse_time'] / repeat,
+        'frame_seconds': totals['frame_time'] / repeat,
+        'peak_mb': peak / 1e6,
+    }
+
+
+def observations_payload(rows):
+    """build a get_series style payload with one observation per date"""
+    return make_payload(rows, vintages=1)
+
+
+def run_suite(sizes, search_count, repeat):
+    results = []
+    formats = [('xml', False), ('xml', True), ('json', False)]
+    for rows in sizes:
+        observations, releases = observations_payload(rows), make_payload(rows)
+        for file_type, stream in formats:
+            transport = SyntheticTransport(observations=observations, releases=releases, file_type=file_type)
+            results.append(run_case('get_series', rows, lambda fred: fred.get_series('BENCH'),
+                                    transport, file_type, stream, repeat))
+            results.append(run_case('get_series_all_releases', rows,
+                                    lambda fred: fred.get_series_all_releases('BENCH'),
+                                    transport, file_type, stream, repeat))
+    if search_count:
+        for file_type, stream in formats:
+            transport = SyntheticTransport(search_count=search_count, file_type=file_type)
+            results.append(run_case('search_by_release', search_count,
+                                    lambda fred: fred.search_by_release(1, limit=0),
+                                    transport, file_type, stream, repeat))
+            results.append(run_case('search_by_release fields', search_count,
+                                    lambda fred: fred.search_by_release(1, limit=0, fields=LEAN_FIELDS),
+                                    transport, file_type, stream, repeat))
+    return results
+
+
+def environment():
+    return {
+        'fredapi': __version__,
+        'python': platform.python_version(),
+        'pandas': pd.__version__,
+        'numpy': np.__version__,
+        'platform': platform.platform(),
+        'timestamp': datetime.datetime.now().isoformat(timespec='seconds'),
+    }
+
+
+def print_results(results, baseline=None):
+    previous = {}
+    if baseline is not None:
+        previous = dict(((r['case'], r['format'], r['rows']), r) for r in baseline['results'])
+    print('%-26s %-11s %9s %9s %12s %9s %9s %9s%s' % ('case', 'format', 'rows', 'seconds', 'rows/s', 'parse', 'frame',
+                                                      'peak MB', '  vs baseline' if baseline else ''))
+    for r in results:
+        line = ('%-26s %-11s %9d %9.3f %12.0f %9.3f %9.3f %9.1f'
+                % (r['case'], r['format'], r['rows'], r['seconds'], r['rows_per_second'], r['parse_seconds'],
+                   r['frame_seconds'], r['peak_mb']))
+        old = previous.get((r['case'], r['format'], r['rows']))
+        if old is not None:
+            line += '  %5.2fx time %5.2fx memory' % (r['seconds'] / old['seconds'], r['peak_mb'] / old['peak_mb'])
+        print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, nargs='+', default=[10000, 100000],
+                        help='numbers of observations per payload')
+    parser.add_argument('--search', type=int, default=10000, help='number of search results, 0 to skip')
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--json', help='write the results to this file')
+    parser.add_argument('--compare', help='results file of an earlier run to compare against')
+    args = parser.parse_args()
+
+    results = run_suite(args.rows, args.search, args.repeat)
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+    print_results(results, baseline)
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({'environment': environment(), 'results': results}, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
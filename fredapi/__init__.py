@@ -1,3 +1,14 @@
-
 from fredapi.version import version as __version__
-from fredapi.fred import Fred
+
+__all__ = ['Fred', 'AsyncFred']
+
+
+def __getattr__(name):
+    # the clients are imported on first use, so that importing fredapi stays fast
+    if name == 'Fred':
+        from fredapi.fred import Fred
+        return Fred
+    if name == 'AsyncFred':
+        from fredapi.async_fred import AsyncFred
+        return AsyncFred
+    raise AttributeError('module %r has no attribute %r' % (__name__, name))
@@ -0,0 +1,322 @@
+import asyncio
+import time
+import urllib.parse as url_parse
+import urllib.request as url_request
+import warnings
+
+from fredapi.fred import HTTPError, _BaseFred, pd
+from fredapi.metrics import RequestEvent
+from fredapi.ratelimit import RateLimiter, Retry
+from fredapi.transport import AsyncHTTPTransport
+
+
+class AsyncFred(_BaseFred):
+    """
+    Asyncio version of Fred. Every query method is a coroutine taking the same arguments and returning the same
+    result as its Fred counterpart; the URL building and parsing code is shared between the two clients.
+    """
+
+    def __init__(self,
+                 api_key=None,
+                 api_key_file=None,
+                 transport=None,
+                 max_concurrency=10,
+                 rate_limiter=None,
+                 metadata_cache=None,
+                 file_type='xml',
+                 retry=None,
+                 hooks=None):
+        """
+        Initialize the AsyncFred class. The API key is looked up in the same way as for Fred.
+
+        Parameters
+        ----------
+        api_key : str
+            API key. A free api key can be obtained on the Fred website at http://research.stlouisfed.org/fred2/.
+        api_key_file : str
+            Path to a file containing the api key.
+        transport : object, optional
+            Transport used for HTTP requests: any object with a coroutine get(url) returning the response body as
+            bytes. Defaults to a fredapi.transport.AsyncHTTPTransport keeping up to max_concurrency connections alive,
+            which does not support proxies: a warning is issued if one is set in the environment.
+        max_concurrency : int, optional
+            maximum number of requests in flight at the same time
+        rate_limiter : RateLimiter, optional
+            Throttle shared by all requests made through this instance. Defaults to FRED's limit of 120 requests
+            per minute.
+        metadata_cache : MemoryCache, optional
+            In-process memo for metadata lookups, see Fred.
+        file_type : str, optional
+            Wire format requested from FRED, 'xml' (the default) or 'json'
+        retry : Retry, optional
+            Policy for retrying requests that fail with a transient error, see Fred. Waits between retries are
+            awaited, so retry.sleep is not used.
+        hooks : list of callable, optional
+            Functions called with a fredapi.metrics.RequestEvent for every request, see Fred.
+        """
+        super(AsyncFred, self).__init__(api_key, api_key_file, file_type=file_type)
+        if transport is None:
+            if self.proxies and not url_request.proxy_bypass(url_parse.urlsplit(self.root_url).hostname):
+                warnings.warn('AsyncHTTPTransport does not support proxies, so the proxy set in the environment is not '
+                              'used and requests go directly to FRED. Pass a transport that supports proxies if '
+                              'FRED is only reachable through one.', stacklevel=2)
+            transport = AsyncHTTPTransport(pool_size=max_concurrency)
+        self.transport = transport
+        if rate_limiter is None:
+            rate_limiter = RateLimiter()
+        self.rate_limiter = rate_limiter
+        self.max_concurrency = max_concurrency
+        self.metadata_cache = metadata_cache
+        if retry is None:
+            retry = Retry()
+        self.retry = retry
+        self.hooks = list(hooks or [])
+        self._semaphore = None
+        self._loop = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    async def close(self):
+        """
+        Close the connections held by the transport. The instance can still be used afterwards, including from
+        another event loop.
+        """
+        self._semaphore = None
+        self._loop = None
+        await self.transport.close()
+
+    async def __fetch_data(self, url, events=None):
+        """
+        helper function for fetching data given a request URL. If events is a list, a RequestEvent measuring the
+        request is appended to it.
+        """
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            # created lazily, and again whenever the instance is used from another event loop, e.g. a new
+            # asyncio.run() call, since a semaphore is bound to the loop it is first used in
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+            self._loop = loop
+        url = self._request_url(url)
+        event = RequestEvent(url)
+        attempt = 0
+        try:
+            async with self._semaphore:
+                while True:
+                    wait = self.rate_limiter.reserve()
+                    if wait > 0:
+                        await asyncio.sleep(wait)
+                        event.wait += wait
+                    started = time.perf_counter()
+                    try:
+                        body = await self.transport.get(url)
+                    except Exception as exc:
+                        event.latency = time.perf_counter() - started
+                        if not self.retry.is_retryable(exc, attempt):
+                            if isinstance(exc, HTTPError):
+                                raise self._parse_error(exc.read())
+                            raise
+                        wait = self.retry.backoff(attempt, exc)
+                        if getattr(exc, 'code', None) == 429:
+                            self.rate_limiter.throttled(wait)
+                        await asyncio.sleep(wait)
+                        event.wait += wait
+                        attempt += 1
+                        event.retries = attempt
+                        continue
+                    event.latency = time.perf_counter() - started
+                    self.rate_limiter.succeeded()
+                    break
+            return self._timed_parse(body, event)
+        except Exception as exc:
+            event.error = exc
+            raise
+        finally:
+            if events is not None:
+                events.append(event)
+
+    async def __run(self, plan):
+        """
+        helper function for driving a request plan with awaitable requests, see _BaseFred
+        """
+        events = [] if self.hooks else None
+        try:
+            url = next(plan)
+            while True:
+                frame_time = 0.0
+                try:
+                    if isinstance(url, list):
+                        response = await asyncio.gather(*[self.__fetch_data(u, events) for u in url])
+                    else:
+                        response = await self.__fetch_data(url, events)
+                    started = time.perf_counter()
+                    try:
+                        url = plan.send(response)
+                    finally:
+                        frame_time = time.perf_counter() - started
+                finally:
+                    if events:
+                        self._emit(events, frame_time)
+        except StopIteration as stop:
+            return stop.value
+
+    async def __memoized(self, key, plan):
+        """
+        helper function for driving a request plan whose result is memoized in metadata_cache
+        """
+        if self.metadata_cache is None:
+            return await self.__run(plan)
+        found, value = self.metadata_cache.lookup(key)
+        if not found:
+            value = await self.__run(plan)
+            self.metadata_cache.set(key, value)
+        return value
+
+    async def get_series_info(self, series_id, as_dict=False):
+        """
+        Get information about a series, see Fred.get_series_info()
+        """
+        key = ('series_info_dict' if as_dict else 'series_info', series_id)
+        return await self.__memoized(key, self._plan_series_info(series_id, as_dict))
+
+    async def get_series(self, series_id, observation_start=None, observation_end=None, **kwargs):
+        """
+        Get data for a Fred series id, see Fred.get_series()
+        """
+        return await self.__run(self._plan_series(series_id, observation_start, observation_end, **kwargs))
+
+    async def get_series_columns(self, series_id, observation_start=None, observation_end=None, **kwargs):
+        """
+        Get data for a Fred series id as plain columns without pandas, see Fred.get_series_columns()
+        """
+        return await self.__run(self._plan_series_columns(series_id, observation_start, observation_end, **kwargs))
+
+    async def get_series_many(self, series_ids, observation_start=None, observation_end=None, as_frame=True,
+                              errors=None, **kwargs):
+        """
+        Get data for many Fred series ids at once, see Fred.get_series_many(). The number of requests in flight is
+        capped by max_concurrency.
+        """
+        series_ids = list(dict.fromkeys(series_ids))
+        outcomes = await asyncio.gather(*[self.get_series(series_id, observation_start, observation_end, **kwargs)
+                                          for series_id in series_ids], return_exceptions=True)
+        results, failures = {}, {}
+        for series_id, outcome in zip(series_ids, outcomes):
+            if isinstance(outcome, Exception):
+                failures[series_id] = outcome
+            else:
+                results[series_id] = outcome
+        return self._combine_series(series_ids, results, failures, as_frame, errors)
+
+    async def get_panel(self, series_ids, frequency, observation_start=None, observation_end=None,
+                        aggregation_method='avg', units='lin', errors=None):
+        """
+        Get data for many Fred series ids at a common frequency as one aligned DataFrame, with the frequency
+        conversion done by FRED, see Fred.get_panel(). The number of requests in flight is capped by max_concurrency.
+        """
+        series_ids = list(dict.fromkeys(series_ids))
+        params = self._panel_options(series_ids, frequency, aggregation_method, units)
+        outcomes = await asyncio.gather(*[self.__run(self._plan_observations(series_id, observation_start,
+                                                                             observation_end, **params[series_id]))
+                                          for series_id in series_ids], return_exceptions=True)
+        columns, failures = {}, {}
+        for series_id, outcome in zip(series_ids, outcomes):
+            if isinstance(outcome, Exception):
+                failures[series_id] = outcome
+            else:
+                columns[series_id] = outcome
+        self._handle_failures(series_ids, failures, errors)
+        return self._panel(series_ids, columns)
+
+    async def update_series(self, series_id, series, revision_window=None, **kwargs):
+        """
+        Bring a previously downloaded series up to date, see Fred.update_series()
+        """
+        return await self.__run(self._plan_update_series(series_id, series, revision_window, **kwargs))
+
+    async def get_series_latest_release(self, series_id):
+        """
+        Get the latest known data for a Fred series id, see Fred.get_series_latest_release()
+        """
+        return await self.get_series(series_id)
+
+    async def get_series_first_release(self, series_id):
+        """
+        Get first-release data for a Fred series id, see Fred.get_series_first_release()
+        """
+        return await self.__run(self._plan_series_first_release(series_id))
+
+    async def get_series_as_of_date(self, series_id, as_of_date):
+        """
+        Get data for a Fred series id as known on a particular date, see Fred.get_series_as_of_date()
+        """
+        return await self.__run(self._plan_series_as_of_date(series_id, as_of_date))
+
+    async def get_series_all_releases(self, series_id, realtime_start=None, realtime_end=None,
+                                      include_realtime_end=False):
+        """
+        Get all data for a Fred series id including revisions, see Fred.get_series_all_releases()
+        """
+        return await self.__run(self._plan_series_all_releases(series_id, realtime_start, realtime_end,
+                                                               include_realtime_end))
+
+    async def get_series_as_of_panel(self, series_ids, as_of_dates):
+        """
+        Get the data of several series as known on each of several dates, see Fred.get_series_as_of_panel(). There
+        is no max_workers argument: the revision histories are all requested at once, and the number in flight is
+        capped by the max_concurrency of this instance.
+        """
+        series_ids = list(dict.fromkeys(series_ids))
+        as_of_dates = self._check_as_of_dates(as_of_dates)
+        realtime_end = max(pd.to_datetime(as_of_dates)).strftime('%Y-%m-%d')
+        histories = await asyncio.gather(*[self.get_series_all_releases(series_id, realtime_end=realtime_end,
+                                                                        include_realtime_end=True)
+                                           for series_id in series_ids])
+        return self._as_of_panel(dict(zip(series_ids, histories)), as_of_dates)
+
+    async def get_series_vintage_dates(self, series_id):
+        """
+        Get a list of vintage dates for a series, see Fred.get_series_vintage_dates()
+        """
+        return await self.__memoized(('series_vintage_dates', series_id), self._plan_series_vintage_dates(series_id))
+
+    async def get_category_children(self, category_id):
+        """
+        Get the child categories of a category, see Fred.get_category_children()
+        """
+        return await self.__memoized(('category_children', category_id), self._plan_category_children(category_id))
+
+    async def get_releases(self):
+        """
+        Get all releases of economic data, see Fred.get_releases()
+        """
+        return await self.__memoized(('releases',), self._plan_releases())
+
+    async def search(self, text, limit=1000, order_by=None, sort_order=None, filter=None, fields=None):
+        """
+        Do a fulltext search for series in the Fred dataset, see Fred.search()
+        """
+        fields = self._check_search_fields(fields)
+        key = self._search_key('search', text, limit, order_by, sort_order, filter, fields)
+        return await self.__memoized(key, self._plan_search(text, limit, order_by, sort_order, filter, fields))
+
+    async def search_by_release(self, release_id, limit=0, order_by=None, sort_order=None, filter=None, fields=None):
+        """
+        Search for series that belongs to a release id, see Fred.search_by_release()
+        """
+        fields = self._check_search_fields(fields)
+        key = self._search_key('search_by_release', release_id, limit, order_by, sort_order, filter, fields)
+        return await self.__memoized(key, self._plan_search_by_release(release_id, limit, order_by, sort_order, filter,
+                                                                       fields))
+
+    async def search_by_category(self, category_id, limit=0, order_by=None, sort_order=None, filter=None, fields=None):
+        """
+        Search for series that belongs to a category id, see Fred.search_by_category()
+        """
+        fields = self._check_search_fields(fields)
+        key = self._search_key('search_by_category', category_id, limit, order_by, sort_order, filter, fields)
+        return await self.__memoized(key, self._plan_search_by_category(category_id, limit, order_by, sort_order,
+                                                                        filter, fields))
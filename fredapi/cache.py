@@ -0,0 +1,272 @@
+"""
+Response caches for the FRED web service.
+"""
+import copy
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+import urllib.parse as url_parse
+from collections import OrderedDict
+
+# seconds a cached response stays fresh, per API endpoint
+DEFAULT_TTL = {
+    'series': 24 * 3600,
+    'series/observations': 3600,
+    'series/vintagedates': 3600,
+    'series/search': 24 * 3600,
+    'release/series': 24 * 3600,
+    'category/series': 24 * 3600,
+    'category/children': 24 * 3600,
+    'releases': 24 * 3600,
+}
+
+
+def normalize_url(url):
+    """
+    Return a canonical form of a request URL: the api_key parameter is dropped and the remaining query parameters
+    are sorted, so that equivalent requests map to the same key.
+    """
+    parts = url_parse.urlsplit(url)
+    query = sorted((name, value) for name, value in url_parse.parse_qsl(parts.query, keep_blank_values=True)
+                   if name != 'api_key')
+    return url_parse.urlunsplit((parts.scheme, parts.netloc, parts.path, url_parse.urlencode(query), ''))
+
+
+def url_endpoint(url):
+    """
+    Return the API endpoint of a request URL, e.g. 'series/observations'
+    """
+    path = url_parse.urlsplit(url).path
+    return path.rsplit('/fred/', 1)[-1].strip('/')
+
+
+class CacheEntry(object):
+    """
+    A cached response body along with the time it was stored and whether it is still fresh.
+    """
+
+    def __init__(self, url, body, stored_at, fresh):
+        self.url = url
+        self.body = body
+        self.stored_at = stored_at
+        self.fresh = fresh
+
+
+class FileCache(object):
+    """
+    Persistent on-disk cache of raw FRED responses, keyed on the normalized request URL (without the api key).
+    Entries expire after a per-endpoint time to live, and the least recently used entries are evicted once the
+    cache grows beyond max_size bytes. Safe to share between threads.
+    """
+
+    def __init__(self, directory, ttl=None, max_size=512 * 1024 ** 2, revalidate=False, clock=time.time):
+        """
+        Parameters
+        ----------
+        directory : str
+            directory holding the cache files, created if needed
+        ttl : int or dict, optional
+            seconds a response stays fresh. Either one number for all endpoints, or a dict mapping endpoints such as
+            'series/observations' to seconds, which overrides DEFAULT_TTL.
+        max_size : int, optional
+            maximum total size of the cache in bytes
+        revalidate : bool, optional
+            if True, an expired observations or vintage dates response is reused as long as get_series_info()
+            reports that the series has not been updated since the response was stored
+        clock : callable, optional
+            function returning the current time in seconds since the epoch, for testing
+        """
+        self.directory = directory
+        self.ttl = dict(DEFAULT_TTL)
+        self.default_ttl = 3600
+        if isinstance(ttl, dict):
+            self.ttl.update(ttl)
+        elif ttl is not None:
+            self.ttl = {}
+            self.default_ttl = ttl
+        self.max_size = max_size
+        self.revalidate = revalidate
+        self.clock = clock
+        self._lock = threading.Lock()
+        self._index = None
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+
+    def _path(self, key):
+        return os.path.join(self.directory, hashlib.sha1(key.encode('utf-8')).hexdigest() + '.cache')
+
+    def _load_index(self):
+        """
+        helper function for building the in-memory index of file sizes and access times
+        """
+        if self._index is None:
+            self._index = {}
+            for entry in os.scandir(self.directory):
+                if entry.name.endswith('.cache'):
+                    stat = entry.stat()
+                    self._index[entry.path] = [stat.st_size, stat.st_mtime]
+        return self._index
+
+    def get(self, url):
+        """
+        Look up the response for a request URL. Returns a CacheEntry, which may be stale, or None.
+        """
+        key = normalize_url(url)
+        path = self._path(key)
+        with self._lock:
+            try:
+                with open(path, 'rb') as f:
+                    header = json.loads(f.readline().decode('utf-8'))
+                    body = f.read()
+            except (IOError, OSError, ValueError):
+                return None
+            if header.get('url') != key:
+                return None
+            now = self.clock()
+            # the modification time tracks the last access, for LRU eviction
+            os.utime(path, (now, now))
+            self._load_index()[path] = [os.path.getsize(path), now]
+        ttl = self.ttl.get(url_endpoint(key), self.default_ttl)
+        return CacheEntry(key, body, header['stored_at'], now - header['stored_at'] < ttl)
+
+    def set(self, url, body, stored_at=None):
+        """
+        Store the response body for a request URL.
+        """
+        key = normalize_url(url)
+        path = self._path(key)
+        if stored_at is None:
+            stored_at = self.clock()
+        header = json.dumps({'url': key, 'stored_at': stored_at}).encode('utf-8')
+        with self._lock:
+            fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+            with os.fdopen(fd, 'wb') as f:
+                f.write(header + b'\n')
+                f.write(body)
+            os.replace(tmp_path, path)
+            now = self.clock()
+            os.utime(path, (now, now))
+            index = self._load_index()
+            index[path] = [os.path.getsize(path), now]
+            self._evict(index, keep=path)
+
+    def touch(self, url):
+        """
+        Mark the cached response for a request URL as freshly stored, after it has been revalidated.
+        """
+        entry = self.get(url)
+        if entry is not None:
+            self.set(url, entry.body)
+
+    def _evict(self, index, keep):
+        total = sum(size for size, _ in index.values())
+        if total <= self.max_size:
+            return
+        for path, (size, _) in sorted(index.items(), key=lambda item: item[1][1]):
+            if total <= self.max_size:
+                break
+            if path == keep:
+                continue
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            del index[path]
+            total -= size
+
+    def clear(self):
+        """
+        Remove every cached response.
+        """
+        with self._lock:
+            for path in list(self._load_index()):
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+            self._index = {}
+
+
+class MemoryCache(object):
+    """
+    Bounded in-process LRU cache with a time to live, used by Fred to memoize metadata lookups such as
+    get_series_info(). Values are copied on the way in and out so callers can modify what they get back. Safe to
+    share between threads.
+    """
+
+    def __init__(self, maxsize=1024, ttl=3600, clock=time.monotonic):
+        """
+        Parameters
+        ----------
+        maxsize : int, optional
+            maximum number of entries kept, the least recently used ones are dropped first
+        ttl : float, optional
+            seconds an entry stays valid, or None to keep entries until they are evicted or invalidated
+        clock : callable, optional
+            function returning the current time in seconds, for testing
+        """
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.clock = clock
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._data)
+
+    def lookup(self, key):
+        """
+        Return a (found, value) tuple for key.
+        """
+        with self._lock:
+            item = self._data.get(key)
+            if item is not None and (self.ttl is None or self.clock() - item[0] < self.ttl):
+                self._data.move_to_end(key)
+                self.hits += 1
+                return True, copy.copy(item[1])
+            if item is not None:
+                del self._data[key]
+            self.misses += 1
+            return False, None
+
+    def set(self, key, value):
+        """
+        Store value under key.
+        """
+        with self._lock:
+            self._data[key] = (self.clock(), copy.copy(value))
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def get_or_set(self, key, func):
+        """
+        Return the value stored under key, calling func() to compute and store it if missing.
+        """
+        found, value = self.lookup(key)
+        if not found:
+            value = func()
+            self.set(key, value)
+        return value
+
+    def invalidate(self, *keys):
+        """
+        Drop the given keys, or every entry if no key is given.
+        """
+        with self._lock:
+            if not keys:
+                self._data.clear()
+            for key in keys:
+                self._data.pop(key, None)
+
+    def stats(self):
+        """
+        Return a dict with the number of hits, misses and entries.
+        """
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses, 'size': len(self._data)}
@@ -0,0 +1,513 @@
+"""
+Crawler walking the FRED category tree and releases to build a local catalog of every series, with the categories and
+releases each series belongs to, and offline full-text search over the catalog. Catalogs are saved in Parquet format,
+which requires pyarrow.
+"""
+import copy
+import itertools
+import math
+import os
+import re
+import shutil
+import tempfile
+import threading
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+import numpy as np
+import pandas as pd
+
+from fredapi.fred import Fred
+
+try:
+    import pyarrow
+except ImportError:
+    pyarrow = None
+
+_TOKEN = re.compile(r'[a-z0-9]+')
+
+
+def _check_pyarrow():
+    """
+    helper function for raising a helpful error when pyarrow is missing
+    """
+    if pyarrow is None:
+        raise ImportError('Saving catalogs requires pyarrow, which can be installed with: pip install pyarrow')
+
+
+def _write_frame(frame, path):
+    """
+    helper function for atomically replacing a file with a DataFrame in Parquet format
+    """
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+    os.close(fd)
+    try:
+        frame.to_parquet(tmp_path, engine='pyarrow')
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+
+
+def _read_frame(path):
+    """
+    helper function for reading a DataFrame written by _write_frame()
+    """
+    return pd.read_parquet(path, engine='pyarrow')
+
+
+class _SearchIndex(object):
+    """
+    Inverted index over the text fields of series metadata, ranking matches with BM25. The postings of all tokens are
+    kept in two flat arrays, sorted by token and then by row, and each token maps to its slice of them. A match in
+    the series id or title counts more than one in the units, frequency, seasonal adjustment or notes.
+    """
+
+    k1 = 1.2
+    b = 0.75
+    weights = [('title', 3.0), ('units', 1.0), ('frequency', 1.0), ('seasonal_adjustment', 1.0), ('notes', 1.0)]
+    id_weight = 3.0
+
+    def __init__(self, series):
+        columns = [(series.index, self.id_weight)]
+        columns.extend((series[field], weight) for field, weight in self.weights if field in series.columns)
+        self.count = len(series)
+        # each distinct value of a column is tokenized once, which matters for columns such as frequency or units
+        tokens, parts = [], []
+        for values, weight in columns:
+            value_codes, uniques = pd.factorize(np.asarray(values, dtype=object))
+            lists = [_TOKEN.findall(value.lower()) if isinstance(value, str) else [] for value in uniques]
+            sizes = np.array([len(value_tokens) for value_tokens in lists] + [0], dtype='int64')
+            parts.append((value_codes, sizes, len(tokens), weight))
+            tokens.extend(itertools.chain.from_iterable(lists))
+        token_codes, vocabulary = pd.factorize(np.asarray(tokens, dtype=object))
+        codes, rows, weights = [], [], []
+        for value_codes, sizes, start, weight in parts:
+            offsets = start + np.r_[0, np.cumsum(sizes)[:-1]]
+            counts = sizes[value_codes]
+            total = counts.sum()
+            # position of every token of every row in tokens
+            ramp = np.arange(total) - np.repeat(np.cumsum(counts) - counts, counts)
+            codes.append(token_codes[np.repeat(offsets[value_codes], counts) + ramp])
+            rows.append(np.repeat(np.arange(self.count, dtype='int64'), counts))
+            weights.append(np.full(total, weight))
+        codes, rows, weights = np.concatenate(codes), np.concatenate(rows), np.concatenate(weights)
+        # one posting per (token, row), with the weights of repeated tokens added up
+        keys = codes * max(self.count, 1) + rows
+        order = np.argsort(keys)
+        keys = keys[order]
+        first = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]]) if len(keys) else np.array([], dtype='int64')
+        self.tf = np.add.reduceat(weights[order], first) if len(first) else np.array([])
+        self.rows = rows[order][first]
+        codes = codes[order][first]
+        starts = np.searchsorted(codes, np.arange(len(vocabulary)))
+        stops = np.r_[starts[1:], len(codes)]
+        self.spans = dict(zip(vocabulary, zip(starts.tolist(), stops.tolist())))
+        self.lengths = np.bincount(self.rows, weights=self.tf, minlength=self.count)
+        self.average_length = self.lengths.mean() if self.count and self.lengths.mean() > 0 else 1.0
+
+    def _score(self, rows, tf):
+        """
+        helper function for the BM25 score of one token in the given rows
+        """
+        idf = math.log(1 + (self.count - len(rows) + 0.5) / (len(rows) + 0.5))
+        norm = self.k1 * (1 - self.b + self.b * self.lengths[rows] / self.average_length)
+        return idf * tf * (self.k1 + 1) / (tf + norm)
+
+    def search(self, text):
+        """
+        Return the positions of the series matching every word of text, in order, along with their scores. Empty
+        text matches every series with a score of 0.
+        """
+        tokens = list(dict.fromkeys(_TOKEN.findall(text.lower())))
+        if not tokens:
+            return np.arange(self.count), np.zeros(self.count)
+        spans = [self.spans.get(token) for token in tokens]
+        if any(span is None for span in spans):
+            return np.array([], dtype='int64'), np.array([])
+        rows = scores = None
+        # start from the rarest token, so the candidates only shrink
+        for start, stop in sorted(spans, key=lambda span: span[1] - span[0]):
+            token_rows, tf = self.rows[start:stop], self.tf[start:stop]
+            if rows is None:
+                rows, scores = token_rows, self._score(token_rows, tf)
+                continue
+            keep = np.isin(rows, token_rows, assume_unique=True)
+            rows, scores = rows[keep], scores[keep]
+            positions = np.searchsorted(token_rows, rows)
+            scores = scores + self._score(rows, tf[positions])
+        return rows, scores
+
+
+class Catalog(object):
+    """
+    Local catalog of series metadata, as built by CatalogCrawler. Every series is listed once, along with the ids of
+    all categories and releases it was found under.
+
+    Attributes
+    ----------
+    series : DataFrame
+        series metadata indexed by series id, as returned by the search methods, with 'categories' and 'releases'
+        columns holding tuples of ids
+    categories : DataFrame
+        the category tree, indexed by category id, with the name and parent_id of each category
+    releases : DataFrame
+        releases indexed by release id, as returned by Fred.get_releases()
+    """
+
+    filter_variables = ['frequency', 'units', 'seasonal_adjustment']
+
+    def __init__(self, series, categories=None, releases=None):
+        """
+        Parameters
+        ----------
+        series : DataFrame
+            series metadata indexed by series id, such as a Catalog built by CatalogCrawler, or the metadata stored in
+            a SeriesStore
+        categories : DataFrame, optional
+            the category tree
+        releases : DataFrame, optional
+            the releases
+        """
+        self.series = series
+        self.categories = categories if categories is not None else pd.DataFrame(columns=['name', 'parent_id'])
+        self.releases = releases if releases is not None else pd.DataFrame()
+        self._index = None
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.series)
+
+    def __contains__(self, series_id):
+        return series_id in self.series.index
+
+    def search(self, text, limit=1000, order_by=None, sort_order=None, filter=None):
+        """
+        Do a fulltext search for series in the catalog, without any request. Every word of text has to appear in the
+        series id, title, units, frequency, seasonal adjustment or notes of a series, and matches are ranked with
+        BM25. The inverted index is built on the first search.
+
+        Parameters
+        ----------
+        text : str
+            text to do fulltext search on, e.g., 'Real GDP'
+        limit : int, optional
+            limit the number of results to this value. If limit is 0, it means returning all results without limit.
+        order_by : str, optional
+            order the results by a criterion, as in Fred.search(). Defaults to 'search_rank'.
+        sort_order : str, optional
+            sort the results by ascending or descending order. Valid options are 'asc' or 'desc'. Defaults to 'desc'
+            when ordering by 'search_rank' or 'popularity', and 'asc' otherwise.
+        filter : tuple, optional
+            filters the results. Expects a tuple like (filter_variable, filter_value).
+            Valid filter_variable values are 'frequency', 'units', and 'seasonal_adjustment'
+
+        Returns
+        -------
+        info : DataFrame
+            a DataFrame containing information about the matching series
+        """
+        Fred._check_search_options(order_by, sort_order, filter)
+        if order_by is None:
+            order_by = 'search_rank'
+        if sort_order is None:
+            sort_order = 'desc' if order_by in ('search_rank', 'popularity') else 'asc'
+        with self._lock:
+            if self._index is None:
+                self._index = _SearchIndex(self.series)
+        rows, scores = self._index.search(text)
+        info = self.series.iloc[rows]
+
+        if filter is not None:
+            variable, value = filter
+            if variable not in self.filter_variables:
+                raise ValueError('%s is not in the valid list of filter variables: %s'
+                                 % (variable, str(self.filter_variables)))
+            mask = np.asarray(info[self._column(variable)].astype(object) == value, dtype=bool)
+            info, scores = info[mask], scores[mask]
+
+        if order_by == 'search_rank':
+            key = pd.Series(scores)
+        elif order_by == 'series_id':
+            key = pd.Series(info.index)
+        elif order_by == 'popularity':
+            key = pd.Series(pd.to_numeric(info[self._column(order_by)]).to_numpy())
+        else:
+            key = pd.Series(info[self._column(order_by)].to_numpy())
+        order = key.sort_values(ascending=sort_order == 'asc', kind='mergesort', na_position='last').index
+        info = info.iloc[order]
+        if limit:
+            info = info.head(limit)
+        return info
+
+    def _column(self, field):
+        """
+        helper function for checking that a field needed by a search was kept in the catalog
+        """
+        if field not in self.series.columns:
+            raise ValueError('%s is not in the fields kept in the catalog' % field)
+        return field
+
+    def save(self, path):
+        """
+        Write the catalog to a directory, as one Parquet file each for the series, categories and releases.
+        """
+        _check_pyarrow()
+        if not os.path.isdir(path):
+            os.makedirs(path)
+        series = self.series.copy()
+        for column in ['categories', 'releases']:
+            if column in series.columns:
+                series[column] = [list(ids) for ids in series[column]]
+        _write_frame(series, os.path.join(path, 'series.parquet'))
+        _write_frame(self.categories, os.path.join(path, 'categories.parquet'))
+        _write_frame(self.releases, os.path.join(path, 'releases.parquet'))
+
+    @classmethod
+    def load(cls, path):
+        """
+        Read a catalog written by save().
+        """
+        _check_pyarrow()
+        series = _read_frame(os.path.join(path, 'series.parquet'))
+        for column in ['categories', 'releases']:
+            if column in series.columns:
+                series[column] = [tuple(int(i) for i in ids) for ids in series[column]]
+        return cls(series, _read_frame(os.path.join(path, 'categories.parquet')),
+                   _read_frame(os.path.join(path, 'releases.parquet')))
+
+    def subcategories(self, category_id):
+        """
+        Return the ids of a category and of all categories below it.
+        """
+        children = self.categories.groupby('parent_id').groups
+        found = [category_id]
+        seen = set(found)
+        for parent in found:
+            for child in children.get(parent, []):
+                if child not in seen:
+                    seen.add(child)
+                    found.append(child)
+        return found
+
+    def series_in_category(self, category_id, recursive=False):
+        """
+        Return the metadata of the series in a category, and with recursive=True in any category below it too.
+        """
+        category_ids = set(self.subcategories(category_id) if recursive else [category_id])
+        mask = [not category_ids.isdisjoint(categories) for categories in self.series['categories']]
+        return self.series[mask]
+
+    def series_in_release(self, release_id):
+        """
+        Return the metadata of the series in a release.
+        """
+        return self.series[[release_id in releases for releases in self.series['releases']]]
+
+
+class CatalogCrawler(object):
+    """
+    Crawler building a Catalog by walking the category tree breadth-first from a root category, and every release,
+    with up to max_workers nodes fetched at the same time. The pages of each node are requested one after the other,
+    so at most max_workers requests are in flight, and all requests go through the rate limiter of the client, which
+    is what bounds a full crawl.
+
+    Each visited node is saved in Parquet format under directory/nodes as soon as it is complete, so an interrupted
+    crawl resumes where it stopped: saved nodes are read back instead of being requested again. Requires pyarrow.
+    """
+
+    def __init__(self, fred, directory, fields=None, max_workers=8):
+        """
+        Parameters
+        ----------
+        fred : Fred
+            client used for the requests
+        directory : str
+            directory holding the saved nodes and the catalog, created if needed
+        fields : list of str, optional
+            only keep these fields of the series metadata, see Fred.search(). Defaults to all fields.
+        max_workers : int, optional
+            number of nodes fetched at the same time
+        """
+        _check_pyarrow()
+        self.fred = fred
+        # the client the nodes are requested with, sharing the transport, rate limiter and caches of fred, but
+        # requesting the pages of a node one at a time
+        self._fred = copy.copy(fred)
+        self._fred.max_workers = 1
+        self.directory = directory
+        self.fields = fred._check_search_fields(fields)
+        self.max_workers = max_workers
+        self._lock = threading.Lock()
+        self.requested = 0
+        self.resumed = 0
+        node_directory = os.path.join(directory, 'nodes')
+        if not os.path.isdir(node_directory):
+            os.makedirs(node_directory)
+
+    @property
+    def path(self):
+        """
+        the directory the catalog is saved to
+        """
+        return os.path.join(self.directory, 'catalog')
+
+    def _node_paths(self, kind, node_id):
+        """
+        helper function for the files of a saved node, in the order they are written
+        """
+        names = ['series', 'children'] if kind == 'category' else ['series']
+        return [(name, os.path.join(self.directory, 'nodes', '%s-%d-%s.parquet' % (kind, node_id, name)))
+                for name in names]
+
+    def _series(self, pages):
+        """
+        helper function for joining the pages of search results of a node
+        """
+        pages = list(pages)
+        if not pages:
+            return None
+        return self.fred._concat_search_pages(pages, self.fields)
+
+    def _fetch(self, kind, node_id):
+        """
+        helper function for requesting a node: a category with its child categories and series, or a release with
+        its series
+        """
+        if kind == 'category':
+            children = self._fred.get_category_children(node_id)
+            series = self._series(self._fred.iter_search_by_category(node_id, fields=self.fields))
+        else:
+            children = None
+            series = self._series(self._fred.iter_search_by_release(node_id, fields=self.fields))
+        return {'children': children, 'series': series}
+
+    def _visit(self, kind, node_id):
+        """
+        helper function for getting a node from its saved files, or requesting and saving it. A node without series
+        is saved with an empty series file.
+        """
+        paths = self._node_paths(kind, node_id)
+        # the last file is only written once the others are, so a node is complete if it exists
+        if os.path.exists(paths[-1][1]):
+            with self._lock:
+                self.resumed += 1
+            node = dict((name, _read_frame(path)) for name, path in paths)
+            if not len(node['series']):
+                node['series'] = None
+            node.setdefault('children', None)
+            return node
+        node = self._fetch(kind, node_id)
+        for name, path in paths:
+            frame = node[name]
+            _write_frame(frame if frame is not None else pd.DataFrame(), path)
+        with self._lock:
+            self.requested += 1
+        return node
+
+    def _releases(self):
+        """
+        helper function for getting the list of releases from its saved file, or requesting and saving it
+        """
+        path = os.path.join(self.directory, 'nodes', 'releases.parquet')
+        if os.path.exists(path):
+            return _read_frame(path)
+        releases = self.fred.get_releases()
+        _write_frame(releases, path)
+        return releases
+
+    def _walk(self, roots):
+        """
+        helper function for visiting nodes breadth-first from roots, keeping up to max_workers visits running. Child
+        categories are queued as soon as their parent is visited. Returns the visited nodes keyed by (kind, id).
+        """
+        queue = deque(roots)
+        seen = set(queue)
+        nodes = {}
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            running = {}
+            try:
+                while queue or running:
+                    while queue and len(running) < self.max_workers:
+                        key = queue.popleft()
+                        running[executor.submit(self._visit, *key)] = key
+                    done, _ = wait(running, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        key = running.pop(future)
+                        node = nodes[key] = future.result()
+                        if node['children'] is not None:
+                            for child_id in node['children'].index:
+                                child = ('category', int(child_id))
+                                if child not in seen:
+                                    seen.add(child)
+                                    queue.append(child)
+            finally:
+                for future in running:
+                    future.cancel()
+        return nodes
+
+    def crawl(self, root_category_id=0, categories=True, releases=True, resume=True):
+        """
+        Crawl the categories below root_category_id and every release, then build, save and return the Catalog.
+
+        Parameters
+        ----------
+        root_category_id : int, optional
+            category to start from, defaults to the root of the category tree
+        categories : bool, optional
+            whether to walk the category tree
+        releases : bool, optional
+            whether to visit every release
+        resume : bool, optional
+            if True (the default), nodes saved by an earlier crawl are reused. If False, they are dropped first, for
+            a full refresh.
+
+        Returns
+        -------
+        catalog : Catalog
+        """
+        if not resume:
+            shutil.rmtree(os.path.join(self.directory, 'nodes'))
+            os.makedirs(os.path.join(self.directory, 'nodes'))
+        release_list = self._releases() if releases else None
+        roots = []
+        if categories:
+            roots.append(('category', root_category_id))
+        if releases:
+            roots.extend(('release', int(release_id)) for release_id in release_list.index)
+        nodes = self._walk(roots)
+        catalog = self._build(nodes, release_list)
+        catalog.save(self.path)
+        return catalog
+
+    def _build(self, nodes, release_list):
+        """
+        helper function for assembling the Catalog from the visited nodes: the metadata of each series is kept once,
+        and the ids of the nodes it was found under are gathered per series
+        """
+        frames = []
+        members = {'category': [], 'release': []}
+        for (kind, node_id), node in sorted(nodes.items()):
+            if node['series'] is not None:
+                frames.append(node['series'])
+                members[kind].append(pd.Series(node_id, index=node['series'].index))
+        if frames:
+            series = self.fred._concat_search_pages(frames, self.fields)
+            series = series[~series.index.duplicated()]
+        else:
+            series = pd.DataFrame(index=pd.Index([], name='series id'))
+        for kind, column in [('category', 'categories'), ('release', 'releases')]:
+            if members[kind]:
+                ids = pd.concat(members[kind])
+                grouped = ids.groupby(level=0, sort=False).agg(lambda values: tuple(sorted(set(values))))
+                series[column] = grouped.reindex(series.index)
+            else:
+                series[column] = None
+            series[column] = [value if isinstance(value, tuple) else () for value in series[column]]
+
+        children = [node['children'] for (kind, _), node in sorted(nodes.items()) if kind == 'category']
+        categories = pd.concat(children) if children else pd.DataFrame(columns=['name', 'parent_id'])
+        categories = categories[~categories.index.duplicated()]
+        if release_list is None:
+            release_list = pd.DataFrame()
+        return Catalog(series, categories, release_list)
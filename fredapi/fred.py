@@ -1,103 +1,1158 @@
 
+import array
+import copy
+import datetime
+import itertools
+import json
 import os
-import sys
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 import xml.etree.ElementTree as ET
-if sys.version_info[0] >= 3:
-    import urllib.request as url_request
-    import urllib.parse as url_parse
-    import urllib.error as url_error
-else:
-    import urllib2 as url_request
-    import urllib as url_parse
-    import urllib2 as url_error
-
-import pandas as pd
-
-urlopen = url_request.urlopen
+import urllib.request as url_request
+import urllib.parse as url_parse
+import urllib.error as url_error
+from operator import itemgetter
+
+from fredapi.cache import url_endpoint
+from fredapi.lazy import LazyModule
+from fredapi.metrics import RequestEvent
+from fredapi.ratelimit import RateLimiter, Retry
+from fredapi.transport import HTTPTransport
+
+# pandas and numpy are only imported once they are used, so that importing fredapi stays fast and the methods
+# returning plain columns, such as get_series_columns(), work without them
+np = LazyModule('numpy')
+pd = LazyModule('pandas')
+
 quote_plus = url_parse.quote_plus
 urlencode = url_parse.urlencode
 HTTPError = url_error.HTTPError
 
-class Fred:
+
+class _XMLStream(object):
+    """
+    Incrementally parsed XML response. The attributes of the root element are available as soon as it has been
+    read, and iterating yields each child element once it is complete, after which it is dropped from the tree, so
+    only a few elements are held in memory at any time. The underlying stream is closed once it is exhausted, and
+    the number of bytes read is then recorded in event if given.
+    """
+
+    def __init__(self, stream, event=None):
+        self._stream = stream
+        self.event = event
+        self.bytes_read = 0
+        self._events = ET.iterparse(self, events=('start', 'end'))
+        _, self._root = next(self._events)
+        self.attrib = self._root.attrib
+        self.tag = self._root.tag
+
+    def get(self, key, default=None):
+        return self.attrib.get(key, default)
+
+    def read(self, size=-1):
+        if self._stream is None:
+            return b''
+        data = self._stream.read(size)
+        self.bytes_read += len(data)
+        return data
+
+    def __iter__(self):
+        depth = 0
+        try:
+            for event, elem in self._events:
+                if event == 'start':
+                    depth += 1
+                    continue
+                depth -= 1
+                if depth == 0:
+                    yield elem
+                    self._root.remove(elem)
+        finally:
+            self.close()
+
+    def close(self):
+        if self._stream is not None:
+            stream, self._stream = self._stream, None
+            stream.close()
+            if self.event is not None:
+                self.event.bytes = self.bytes_read
+
+
+class _Flight(object):
+    """
+    A call in progress, along with the number of callers waiting for its result.
+    """
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.waiters = 0
+        self.result = None
+        self.error = None
+
+
+class _SingleFlight(object):
+    """
+    Coalesces concurrent calls with the same key: while a call runs, other threads making the same call wait for it
+    and share its result instead of repeating the work. Each waiter gets its own deep copy of the result, as does the
+    caller that ran it when there were waiters, so callers can modify what they get back.
+    """
+
+    def __init__(self):
+        self._flights = {}
+        self._lock = threading.Lock()
+
+    def do(self, key, func):
+        """
+        Return func(), or a copy of the result of the call with the same key that is already running.
+        """
+        try:
+            hash(key)
+        except TypeError:
+            return func()
+        with self._lock:
+            flight = self._flights.get(key)
+            if flight is None:
+                flight = self._flights[key] = _Flight()
+                leader = True
+            else:
+                flight.waiters += 1
+                leader = False
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return copy.deepcopy(flight.result)
+        try:
+            flight.result = func()
+        except BaseException as exc:
+            flight.error = exc
+            raise
+        finally:
+            with self._lock:
+                del self._flights[key]
+                waiters = flight.waiters
+            flight.done.set()
+        # the shared result itself is never handed out, so no caller can modify it while another copies it
+        return copy.deepcopy(flight.result) if waiters else flight.result
+
+
+class _BaseFred(object):
+    """
+    Configuration, URL building and response parsing shared by Fred and fredapi.async_fred.AsyncFred. Each query is
+    written once as a request plan: a generator that yields request URLs, is sent back the parsed response for
+    each, and returns the final result. A plan can also yield a list of URLs, which are requested concurrently and
+    answered with the list of parsed responses. Fred drives the plans with blocking requests and AsyncFred with
+    awaitable ones, so both clients build identical requests and return identical results.
+    """
     earliest_realtime_start = '1776-07-04'
     latest_realtime_end = '9999-12-31'
     nan_char = '.'
     max_results_per_request = 1000
     root_url = 'https://api.stlouisfed.org/fred'
+    metadata_cache = None
+    hooks = ()
+    file_types = ['xml', 'json']
+    search_fields = ['realtime_start', 'realtime_end', 'title', 'observation_start', 'observation_end', 'frequency',
+                     'frequency_short', 'units', 'units_short', 'seasonal_adjustment', 'seasonal_adjustment_short',
+                     'last_updated', 'popularity', 'notes']
+    categorical_search_fields = ['frequency', 'frequency_short', 'units_short', 'seasonal_adjustment',
+                                 'seasonal_adjustment_short']
+    panel_frequencies = ['d', 'w', 'bw', 'm', 'q', 'sa', 'a', 'wef', 'weth', 'wew', 'wetu', 'wem', 'wesu', 'wesa',
+                         'bwew', 'bwem']
+    aggregation_methods = ['avg', 'sum', 'eop']
+    units_options = ['lin', 'chg', 'ch1', 'pch', 'pc1', 'pca', 'cch', 'cca', 'log']
+    search_order_by_options = ['search_rank', 'series_id', 'title', 'units', 'frequency', 'seasonal_adjustment',
+                               'realtime_start', 'realtime_end', 'last_updated', 'observation_start',
+                               'observation_end', 'popularity']
+
+    def __init__(self, api_key=None, api_key_file=None, proxies=None, file_type='xml'):
+        self.api_key = None
+        if api_key is not None:
+            self.api_key = api_key
+        elif api_key_file is not None:
+            f = open(api_key_file, 'r')
+            self.api_key = f.readline().strip()
+            f.close()
+        else:
+            self.api_key = os.environ.get('FRED_API_KEY')
+
+        if self.api_key is None:
+            import textwrap
+            raise ValueError(textwrap.dedent("""\
+                    You need to set a valid API key. You can set it in 3 ways:
+                    pass the string with api_key, or set api_key_file to a
+                    file with the api key in the first line, or set the
+                    environment variable 'FRED_API_KEY' to the value of your
+                    api key. You can sign up for a free api key on the Fred
+                    website at http://research.stlouisfed.org/fred2/"""))
+
+        if not proxies:
+            # the same lookup as urllib, which reads both http_proxy and HTTP_PROXY
+            environ_proxies = url_request.getproxies()
+            if environ_proxies.get('http') or environ_proxies.get('https'):
+                proxies = {'http': environ_proxies.get('http'), 'https': environ_proxies.get('https')}
+
+        self.proxies = proxies
+
+        if file_type not in self.file_types:
+            raise ValueError('%s is not in the valid list of file_type options: %s' % (file_type, str(self.file_types)))
+        self.file_type = file_type
+
+    def invalidate_metadata(self, series_id=None):
+        """
+        Drop memoized metadata lookups, see the metadata_cache parameter of Fred.
+
+        Parameters
+        ----------
+        series_id : str, optional
+            only drop the memoized get_series_info() and get_series_vintage_dates() results for this series. If not
+            given, every memoized result including searches is dropped.
+        """
+        if self.metadata_cache is None:
+            return
+        if series_id is None:
+            self.metadata_cache.invalidate()
+        else:
+            self.metadata_cache.invalidate(('series_info', series_id), ('series_info_dict', series_id),
+                                           ('series_vintage_dates', series_id))
+
+    def _search_key(self, kind, query, limit, order_by, sort_order, filter, fields=None):
+        """
+        helper function for building the metadata_cache key of a search
+        """
+        return (kind, query, limit, order_by, sort_order, tuple(filter) if filter is not None else None,
+                tuple(fields) if fields is not None else None)
+
+    def _request_url(self, url):
+        """
+        helper function for adding the api key, and the file type if not the default xml, to a request URL
+        """
+        if self.file_type != 'xml':
+            url += '&file_type=' + self.file_type
+        return url + '&api_key=' + self.api_key
+
+    def _parse_response(self, body):
+        """
+        helper function for parsing a response body: an XML element for xml, or a dict for json
+        """
+        if self.file_type == 'json':
+            return json.loads(body)
+        return ET.fromstring(body)
+
+    def _timed_parse(self, body, event):
+        """
+        helper function for parsing a response body while recording its size and the parse time in a RequestEvent
+        """
+        started = time.perf_counter()
+        root = self._parse_response(body)
+        event.parse_time = time.perf_counter() - started
+        event.bytes = len(body)
+        return root
+
+    def _emit(self, events, frame_time):
+        """
+        helper function for passing the RequestEvents of the responses consumed by one step of a request plan to the
+        hooks, along with the time the step took to build its result, split evenly between them so that totals add up
+        """
+        pending = list(events)
+        del events[:]
+        for event in pending:
+            event.frame_time = frame_time / len(pending)
+            for hook in self.hooks:
+                hook(event)
+
+    def _parse_stream(self, stream, event=None):
+        """
+        helper function for parsing an XML response incrementally while it is read from stream, see _XMLStream
+        """
+        try:
+            return _XMLStream(stream, event)
+        except Exception:
+            stream.close()
+            raise
+
+    def _close_response(self, root):
+        """
+        helper function for releasing the connection behind a streamed response that was not read to the end
+        """
+        if isinstance(root, _XMLStream):
+            root.close()
+
+    def _parse_error(self, body):
+        """
+        helper function for turning the body of an error response into a ValueError
+        """
+        if body.lstrip()[:1] in (b'{', '{'):
+            return ValueError(json.loads(body).get('error_message'))
+        try:
+            root = ET.fromstring(body)
+        except ET.ParseError:
+            # not an error from the FRED API itself, e.g. a gateway error page
+            if isinstance(body, bytes):
+                body = body.decode('utf-8', 'replace')
+            return ValueError(body.strip())
+        return ValueError(root.get('message'))
+
+    def _records(self, root, key, as_text=False):
+        """
+        helper function for getting the records of a parsed response as dicts: the attributes of the child elements
+        of an XML response, or the list stored under key in a JSON response. If as_text is True, the numbers and
+        booleans of JSON records are turned into the strings an XML response holds, so both give the same results.
+        """
+        if isinstance(root, dict):
+            records = root.get(key, [])
+            if as_text:
+                records = [dict((name, self._as_text(value)) for name, value in record.items()) for record in records]
+            return records
+        return (child.attrib for child in root)
+
+    def _as_text(self, value):
+        """
+        helper function for turning a JSON scalar into its XML attribute string
+        """
+        if isinstance(value, bool):
+            return 'true' if value else 'false'
+        if value is None or isinstance(value, str):
+            return value
+        return str(value)
+
+    def _parse(self, date_str, format='%Y-%m-%d'):
+        """
+        helper function for parsing FRED date string into datetime
+        """
+        if format is not None and isinstance(date_str, str):
+            return datetime.datetime.strptime(date_str, format)
+        rv = pd.to_datetime(date_str, format=format)
+        if hasattr(rv, 'to_pydatetime'):
+            rv = rv.to_pydatetime()
+        return rv
+
+    def _parse_observations(self, root, fields=('date', 'value')):
+        """
+        helper function for parsing observations into typed columns. The fields are pulled out of the records in a
+        single pass and each column is then converted at once: 'value' becomes float64 (with nan_char mapped to NaN)
+        and every other field is parsed into datetime64, with an open-ended realtime_end mapped to NaT.
+        """
+        getter = itemgetter(*fields)
+        rows = [getter(record) for record in self._records(root, 'observations')]
+        if len(fields) == 1:
+            rows = [(row,) for row in rows]
+        raw_columns = list(zip(*rows)) if rows else [()] * len(fields)
+
+        columns = {}
+        for field, raw in zip(fields, raw_columns):
+            if field == 'value':
+                raw = np.array(raw, dtype=object)
+                raw[raw == self.nan_char] = 'nan'
+                columns[field] = raw.astype('float64')
+            else:
+                raw = pd.Index(raw, dtype=object)
+                if field == 'realtime_end':
+                    raw = raw.where(raw != self.latest_realtime_end)
+                columns[field] = pd.to_datetime(raw, format='%Y-%m-%d')
+        return columns
+
+    def _handle_failures(self, series_ids, failures, errors):
+        """
+        helper function for raising the first failure of a many-series request in series order, or storing all of
+        them in errors if given
+        """
+        if failures:
+            if errors is None:
+                raise failures[next(s for s in series_ids if s in failures)]
+            errors.update(failures)
+
+    def _combine_series(self, series_ids, results, failures, as_frame, errors):
+        """
+        helper function for assembling the per-series results of get_series_many()
+        """
+        self._handle_failures(series_ids, failures, errors)
+
+        data = dict((series_id, results[series_id]) for series_id in series_ids if series_id in results)
+        if not as_frame:
+            return data
+        if not data:
+            return pd.DataFrame()
+        return pd.concat(data, axis=1)
+
+    def _check_as_of_dates(self, as_of_dates):
+        """
+        helper function for validating the as_of_dates of get_series_as_of_panel(), returned as a list
+        """
+        as_of_dates = list(as_of_dates)
+        if not as_of_dates:
+            raise ValueError('as_of_dates is empty')
+        return as_of_dates
+
+    def _as_of_panel(self, histories, as_of_dates):
+        """
+        helper function for building the DataFrame of get_series_as_of_panel() from revision histories with a
+        realtime_end column. For each series, every (as_of_date, date) pair where date had been released by
+        as_of_date is matched to its last revision released on or before as_of_date with a single merge_asof.
+        """
+        as_of_dates = pd.DatetimeIndex(pd.to_datetime(list(as_of_dates))).unique().sort_values()
+        data = {}
+        for series_id, history in histories.items():
+            history = history.sort_values('realtime_start', kind='mergesort')
+            as_of = as_of_dates.astype(history['realtime_start'].dtype).values
+            # dates ordered by first release, so the dates known on each as_of date are a prefix
+            first_releases = history.drop_duplicates('date')
+            counts = np.searchsorted(first_releases['realtime_start'].values, as_of, side='right')
+            dates = first_releases['date'].values
+            pairs = pd.DataFrame({'as_of': np.repeat(as_of, counts),
+                                  'date': np.concatenate([dates[:count] for count in counts] or [dates[:0]])})
+            merged = pd.merge_asof(pairs, history, left_on='as_of', right_on='realtime_start', by='date')
+            # leave out dates that had been dropped by as_of
+            merged = merged[~(merged['realtime_end'] < merged['as_of'])]
+            index = pd.MultiIndex.from_arrays([merged['as_of'], merged['date']], names=['as_of', 'date'])
+            data[series_id] = pd.Series(merged['value'].to_numpy(), index=index)
+        if not data:
+            return pd.DataFrame(index=pd.MultiIndex.from_arrays([[], []], names=['as_of', 'date']))
+        return pd.concat(data, axis=1).sort_index()
+
+    def __do_series_search(self, url, fields=None):
+        """
+        helper function for making one HTTP request for data, and parsing the returned results into a DataFrame. This
+        is a request plan, see _BaseFred.
+        """
+        root = yield url
+        return self._parse_series_search(root, fields)
+
+    def _parse_series_search(self, root, fields=None):
+        """
+        helper function for parsing one page of search results into a DataFrame. Returns the DataFrame, or None if
+        the page is empty, and the total number of results. If fields is given, only those fields are kept and the
+        columns are typed, see _parse_search_fields().
+        """
+        if fields is not None:
+            return self._parse_search_fields(root, fields)
+        series_ids = []
+        data = {}
+
+        num_results_returned = 0  # number of results returned in this HTTP request
+        num_results_total = int(root.get('count'))  # total number of results, this can be larger than number of results returned
+        for child in self._records(root, 'seriess', as_text=True):
+            num_results_returned += 1
+            series_id = child.get('id')
+            series_ids.append(series_id)
+            data[series_id] = {"id": series_id}
+            for field in self.search_fields:
+                data[series_id][field] = child.get(field)
+
+        if num_results_returned > 0:
+            data = pd.DataFrame(data, columns=series_ids).T
+            # parse datetime columns
+            for field in ["realtime_start", "realtime_end", "observation_start", "observation_end", "last_updated"]:
+                data[field] = data[field].apply(self._parse, format=None)
+            # set index name
+            data.index.name = 'series id'
+        else:
+            data = None
+        return data, num_results_total
+
+    def _check_search_fields(self, fields):
+        """
+        helper function for validating the fields option of the search methods
+        """
+        if fields is None:
+            return None
+        fields = list(dict.fromkeys(fields))
+        for field in fields:
+            if field not in self.search_fields:
+                raise ValueError('%s is not in the valid list of fields options: %s' % (field, str(self.search_fields)))
+        return fields
+
+    def _parse_search_fields(self, root, fields):
+        """
+        helper function for parsing one page of search results into a DataFrame holding only the given fields. The
+        fields are pulled out of the records in a single pass and each column is then converted at once: dates become
+        datetime64, last_updated becomes a UTC datetime64, popularity an integer and the frequency and seasonal
+        adjustment columns categoricals.
+        """
+        num_results_total = int(root.get('count'))
+        ids = []
+        columns = dict((field, []) for field in fields)
+        appends = [(field, columns[field].append) for field in fields]
+        for child in self._records(root, 'seriess'):
+            ids.append(child.get('id'))
+            for field, append in appends:
+                append(child.get(field))
+        if not ids:
+            return None, num_results_total
+        data = pd.DataFrame(dict((field, self._search_column(field, values)) for field, values in columns.items()),
+                            index=pd.Index(ids, name='series id'), columns=fields)
+        return data, num_results_total
+
+    def _search_column(self, field, values):
+        """
+        helper function for converting the values of one search result field to a typed column
+        """
+        if field in ('realtime_start', 'realtime_end', 'observation_start', 'observation_end'):
+            return pd.to_datetime(values, format='%Y-%m-%d')
+        if field == 'last_updated':
+            return pd.to_datetime(values, format='%Y-%m-%d %H:%M:%S%z', utc=True)
+        if field == 'popularity':
+            return pd.to_numeric(values).astype('int64')
+        if field in self.categorical_search_fields:
+            return pd.Categorical(values)
+        return values
+
+    def _concat_search_pages(self, pages, fields):
+        """
+        helper function for joining pages of search results, keeping categorical columns categorical
+        """
+        data = pd.concat([page for page in pages if page is not None])
+        if fields is not None:
+            for field in fields:
+                if field in self.categorical_search_fields:
+                    data[field] = data[field].astype('category')
+        return data
+
+    def _search_base_url(self, kind, value):
+        """
+        helper function for building the request URL of search(), search_by_release() or search_by_category()
+        """
+        if kind == 'search':
+            return "%s/series/search?search_text=%s&" % (self.root_url, quote_plus(value))
+        if kind == 'search_by_release':
+            return "%s/release/series?release_id=%d" % (self.root_url, value)
+        return "%s/category/series?category_id=%d&" % (self.root_url, value)
+
+    def _search_url(self, url, order_by, sort_order, filter):
+        """
+        helper function for validating the search options and adding them to a search URL
+        """
+        self._check_search_options(order_by, sort_order, filter)
+        if order_by is not None:
+            url = url + '&order_by=' + order_by
+        if filter is not None:
+            url = url + '&filter_variable=%s&filter_value=%s' % (filter[0], filter[1])
+        if sort_order is not None:
+            url = url + '&sort_order=' + sort_order
+        return url
+
+    @classmethod
+    def _check_search_options(cls, order_by, sort_order, filter):
+        """
+        helper function for validating the order_by, sort_order and filter options of the search methods
+        """
+        order_by_options = cls.search_order_by_options
+        if order_by is not None and order_by not in order_by_options:
+            raise ValueError('%s is not in the valid list of order_by options: %s' % (order_by, str(order_by_options)))
+        if filter is not None and len(filter) != 2:
+            raise ValueError('Filter should be a 2 item tuple like (filter_variable, filter_value)')
+        sort_order_options = ['asc', 'desc']
+        if sort_order is not None and sort_order not in sort_order_options:
+            raise ValueError('%s is not in the valid list of sort_order options: %s' % (sort_order, str(sort_order_options)))
+
+    def _search_pages(self, num_results_total, limit):
+        """
+        helper function for working out how many search results are needed, and the offsets of the pages still to
+        be requested after the first one
+        """
+        if limit == 0:
+            max_results_needed = num_results_total
+        else:
+            max_results_needed = min(limit, num_results_total)
+        offsets = list(range(self.max_results_per_request, max_results_needed, self.max_results_per_request))
+        return max_results_needed, offsets
+
+    def __get_search_results(self, url, limit, order_by, sort_order, filter, fields=None):
+        """
+        helper function for getting search results up to specified limit on the number of results. The Fred HTTP API
+        truncates to 1000 results per request, so this may issue multiple HTTP requests to obtain more available data.
+        The first page gives the total number of results, and the remaining pages are then requested together. This
+        is a request plan, see _BaseFred.
+        """
+        url = self._search_url(url, order_by, sort_order, filter)
+        data, num_results_total = yield from self.__do_series_search(url, fields)
+        if data is None:
+            return data
+
+        max_results_needed, offsets = self._search_pages(num_results_total, limit)
+        if offsets:
+            roots = yield [url + '&offset=' + str(offset) for offset in offsets]
+            pages = [data] + [self._parse_series_search(root, fields)[0] for root in roots]
+            data = self._concat_search_pages(pages, fields)
+        return data.head(max_results_needed)
+
+    def _plan_series_info(self, series_id, as_dict=False):
+        """
+        request plan for get_series_info()
+        """
+        url = "%s/series?series_id=%s" % (self.root_url, series_id)
+        root = yield url
+        record = next(iter(self._records(root, 'seriess', as_text=True)), None) if root is not None else None
+        if record is None:
+            raise ValueError('No info exists for series id: ' + series_id)
+        if as_dict:
+            return dict(record)
+        info = pd.Series(record)
+        return info
+
+    def _plan_series(self, series_id, observation_start=None, observation_end=None, **kwargs):
+        """
+        request plan for get_series()
+        """
+        columns = yield from self._plan_observations(series_id, observation_start, observation_end, **kwargs)
+        return pd.Series(columns['value'], index=columns['date'])
+
+    def _plan_observations(self, series_id, observation_start=None, observation_end=None, **kwargs):
+        """
+        request plan for the date and value columns of the observations of a series, as parsed by
+        _parse_observations()
+        """
+        url = self._observations_url(series_id, observation_start, observation_end, kwargs)
+        root = yield url
+        if root is None:
+            raise ValueError('No data exists for series id: ' + series_id)
+        return self._parse_observations(root, ('date', 'value'))
+
+    def _observations_url(self, series_id, observation_start, observation_end, kwargs):
+        """
+        helper function for building the request URL of the observations of a series
+        """
+        url = "%s/series/observations?series_id=%s" % (self.root_url, series_id)
+        if observation_start is not None:
+            url += '&observation_start=' + self._format_date(observation_start)
+        if observation_end is not None:
+            url += '&observation_end=' + self._format_date(observation_end)
+        if kwargs.keys():
+            url += '&' + urlencode(kwargs)
+        return url
+
+    def _format_date(self, value):
+        """
+        helper function for formatting a date request parameter. Dates, datetimes and strings such as '2014-07-01'
+        are handled without pandas, which is only used for other formats such as '7/1/2014'.
+        """
+        if hasattr(value, 'strftime'):
+            return value.strftime('%Y-%m-%d')
+        try:
+            return datetime.datetime.strptime(value, '%Y-%m-%d').strftime('%Y-%m-%d')
+        except (TypeError, ValueError):
+            return pd.to_datetime(value, errors='raise').strftime('%Y-%m-%d')
+
+    def _plan_series_columns(self, series_id, observation_start=None, observation_end=None, **kwargs):
+        """
+        request plan for get_series_columns()
+        """
+        url = self._observations_url(series_id, observation_start, observation_end, kwargs)
+        root = yield url
+        if root is None:
+            raise ValueError('No data exists for series id: ' + series_id)
+        return self._parse_columns(root)
+
+    def _parse_columns(self, root):
+        """
+        helper function for parsing observations into plain columns without pandas: a list of datetime.date and an
+        array of floats, with nan_char mapped to NaN
+        """
+        dates, values = [], array.array('d')
+        date, nan, nan_char = datetime.date, float('nan'), self.nan_char
+        for record in self._records(root, 'observations'):
+            text = record.get('date')
+            dates.append(date(int(text[:4]), int(text[5:7]), int(text[8:10])))
+            value = record.get('value')
+            values.append(nan if value == nan_char else float(value))
+        return {'date': dates, 'value': values}
+
+    def _panel_options(self, series_ids, frequency, aggregation_method, units):
+        """
+        helper function for validating the options of get_panel(), and returning the observations parameters of
+        each series. aggregation_method and units are either one value for all series or a dict keyed by series id.
+        """
+        if frequency not in self.panel_frequencies:
+            raise ValueError('%s is not in the valid list of frequency options: %s'
+                             % (frequency, str(self.panel_frequencies)))
+        params = {}
+        for series_id in series_ids:
+            method = aggregation_method.get(series_id, 'avg') if isinstance(aggregation_method, dict) \
+                else aggregation_method
+            unit = units.get(series_id, 'lin') if isinstance(units, dict) else units
+            if method not in self.aggregation_methods:
+                raise ValueError('%s is not in the valid list of aggregation_method options: %s'
+                                 % (method, str(self.aggregation_methods)))
+            if unit not in self.units_options:
+                raise ValueError('%s is not in the valid list of units options: %s' % (unit, str(self.units_options)))
+            params[series_id] = {'frequency': frequency, 'aggregation_method': method, 'units': unit}
+        return params
+
+    def _panel(self, series_ids, columns):
+        """
+        helper function for assembling the DataFrame of get_panel() from the date and value columns of each series:
+        the union of the dates is computed once and every series is written into its column of a single array
+        """
+        series_ids = [series_id for series_id in series_ids if series_id in columns]
+        dates = [np.asarray(columns[series_id]['date'], dtype='datetime64[ns]') for series_id in series_ids]
+        index = np.unique(np.concatenate(dates)) if dates else np.array([], dtype='datetime64[ns]')
+        values = np.full((len(index), len(series_ids)), np.nan)
+        for i, (series_id, series_dates) in enumerate(zip(series_ids, dates)):
+            values[np.searchsorted(index, series_dates), i] = columns[series_id]['value']
+        return pd.DataFrame(values, index=pd.DatetimeIndex(index, name='date'), columns=series_ids, copy=False)
+
+    def _plan_update_series(self, series_id, series, revision_window=None, **kwargs):
+        """
+        request plan for update_series()
+        """
+        if series is None or not len(series):
+            data = yield from self._plan_series(series_id, **kwargs)
+            return data
+        observation_start = series.index.max()
+        if revision_window is not None:
+            if isinstance(revision_window, str):
+                revision_window = pd.Timedelta(revision_window)
+            observation_start = observation_start - revision_window
+        recent = yield from self._plan_series(series_id, observation_start=observation_start, **kwargs)
+        # observations returned by FRED replace the stored ones, so revisions inside the window are picked up
+        data = pd.concat([series[series.index < observation_start], recent])
+        data.name = series.name
+        return data
+
+    def _plan_series_first_release(self, series_id):
+        """
+        request plan for get_series_first_release()
+        """
+        # output_type=4 asks FRED for the initial release of each observation only
+        root = yield self._series_all_releases_url(series_id) + '&output_type=4'
+        if root is None:
+            raise ValueError('No data exists for series id: ' + series_id)
+        columns = self._parse_observations(root, ('date', 'value'))
+        data = pd.Series(columns['value'], index=columns['date'], name='value')
+        data.index.name = 'date'
+        # releases come in order of realtime_start for each date, should more than the first one be returned
+        return data[~data.index.duplicated(keep='first')]
+
+    def _plan_series_as_of_date(self, series_id, as_of_date):
+        """
+        request plan for get_series_as_of_date()
+        """
+        as_of_date = pd.to_datetime(as_of_date)
+        df = yield from self._plan_series_all_releases(series_id, realtime_end=as_of_date.strftime('%Y-%m-%d'),
+                                                       include_realtime_end=True)
+        # leave out observations that had been revised or dropped by as_of_date, as get_series_as_of_panel() does.
+        # Revisions come in order of realtime_start for each date, so the last one known on as_of_date wins.
+        known = (df['realtime_start'] <= as_of_date) & ~(df['realtime_end'] < as_of_date)
+        data = df[known].drop_duplicates('date', keep='last').drop(columns='realtime_end')
+        return data
+
+    def _plan_series_all_releases(self, series_id, realtime_start=None, realtime_end=None, include_realtime_end=False):
+        """
+        request plan for get_series_all_releases()
+        """
+        root = yield self._series_all_releases_url(series_id, realtime_start, realtime_end)
+        if root is None:
+            raise ValueError('No data exists for series id: ' + series_id)
+        return self._parse_series_all_releases(root, include_realtime_end)
+
+    def _series_all_releases_url(self, series_id, realtime_start=None, realtime_end=None):
+        """
+        helper function for building the request URL of get_series_all_releases()
+        """
+        if realtime_start is None:
+            realtime_start = self.earliest_realtime_start
+        if realtime_end is None:
+            realtime_end = self.latest_realtime_end
+        url = "%s/series/observations?series_id=%s&realtime_start=%s&realtime_end=%s" % (self.root_url,
+                                                                                         series_id,
+                                                                                         realtime_start,
+                                                                                         realtime_end)
+        return url
+
+    def _parse_series_all_releases(self, root, include_realtime_end=False):
+        """
+        helper function for parsing observations with their realtime_start, and optionally realtime_end, into a
+        DataFrame
+        """
+        if include_realtime_end:
+            fields = ('realtime_start', 'realtime_end', 'date', 'value')
+        else:
+            fields = ('realtime_start', 'date', 'value')
+        columns = self._parse_observations(root, fields)
+        data = pd.DataFrame(columns, columns=list(fields))
+        return data
+
+    def _plan_series_vintage_dates(self, series_id):
+        """
+        request plan for get_series_vintage_dates()
+        """
+        url = "%s/series/vintagedates?series_id=%s" % (self.root_url, series_id)
+        root = yield url
+        if root is None:
+            raise ValueError('No vintage date exists for series id: ' + series_id)
+        if isinstance(root, dict):
+            texts = root.get('vintage_dates', [])
+        else:
+            texts = [child.text for child in root]
+        dates = []
+        for text in texts:
+            dates.append(self._parse(text))
+        return dates
+
+    def _plan_search(self, text, limit=1000, order_by=None, sort_order=None, filter=None, fields=None):
+        """
+        request plan for search()
+        """
+        url = self._search_base_url('search', text)
+        info = yield from self.__get_search_results(url, limit, order_by, sort_order, filter, fields)
+        return info
+
+    def _plan_search_by_release(self, release_id, limit=0, order_by=None, sort_order=None, filter=None, fields=None):
+        """
+        request plan for search_by_release()
+        """
+        url = self._search_base_url('search_by_release', release_id)
+        info = yield from self.__get_search_results(url, limit, order_by, sort_order, filter, fields)
+        if info is None:
+            raise ValueError('No series exists for release id: ' + str(release_id))
+        return info
+
+    def _plan_search_by_category(self, category_id, limit=0, order_by=None, sort_order=None, filter=None, fields=None):
+        """
+        request plan for search_by_category()
+        """
+        url = self._search_base_url('search_by_category', category_id)
+        info = yield from self.__get_search_results(url, limit, order_by, sort_order, filter, fields)
+        if info is None:
+            raise ValueError('No series exists for category id: ' + str(category_id))
+        return info
+
+    def _plan_category_children(self, category_id):
+        """
+        request plan for get_category_children()
+        """
+        url = "%s/category/children?category_id=%d" % (self.root_url, category_id)
+        root = yield url
+        records = list(self._records(root, 'categories')) if root is not None else []
+        ids = [int(record.get('id')) for record in records]
+        data = pd.DataFrame({'name': [record.get('name') for record in records],
+                             'parent_id': [int(record.get('parent_id')) for record in records]},
+                            index=pd.Index(ids, name='category id', dtype='int64'))
+        return data
+
+    def _parse_releases(self, root):
+        """
+        helper function for parsing one page of releases into a DataFrame, along with the total number of releases
+        """
+        records = list(self._records(root, 'releases', as_text=True))
+        data = pd.DataFrame.from_records(records, columns=['id', 'name', 'press_release', 'link', 'realtime_start',
+                                                           'realtime_end'])
+        data.index = pd.Index(data.pop('id').astype('int64'), name='release id')
+        return data, int(root.get('count'))
+
+    def _plan_releases(self):
+        """
+        request plan for get_releases(). Like searches, releases come in pages of up to 1000.
+        """
+        url = "%s/releases?limit=%d" % (self.root_url, self.max_results_per_request)
+        root = yield url
+        data, count = self._parse_releases(root)
+        _, offsets = self._search_pages(count, 0)
+        if offsets:
+            roots = yield [url + '&offset=' + str(offset) for offset in offsets]
+            data = pd.concat([data] + [self._parse_releases(root)[0] for root in roots])
+        return data
+
+
+class Fred(_BaseFred):
+    max_workers = 8
 
     def __init__(self,
                  api_key=None,
                  api_key_file=None,
-                 proxies=None):
+                 proxies=None,
+                 transport=None,
+                 rate_limiter=None,
+                 cache=None,
+                 metadata_cache=None,
+                 file_type='xml',
+                 stream=False,
+                 retry=None,
+                 hooks=None,
+                 coalesce=True):
+        """
+        Initialize the Fred class that provides useful functions to query the Fred dataset. You need to specify a valid
+        API key in one of 3 ways: pass the string via api_key, or set api_key_file to a file with the api key in the
+        first line, or set the environment variable 'FRED_API_KEY' to the value of your api key.
+
+        Parameters
+        ----------
+        api_key : str
+            API key. A free api key can be obtained on the Fred website at http://research.stlouisfed.org/fred2/.
+        api_key_file : str
+            Path to a file containing the api key.
+        proxies : dict
+            Proxies specifications: a dictionary mapping protocol names (e.g. 'http', 'https') to proxy URLs. If not
+            provided, environment variables 'HTTP_PROXY', 'HTTPS_PROXY' (or lowercase) are used, except for the hosts
+            listed in 'NO_PROXY'.
+        transport : object, optional
+            Transport used for HTTP requests, such as fredapi.transport.HTTPTransport or
+            fredapi.transport.UrllibTransport. Defaults to an HTTPTransport that keeps connections alive and uses
+            the proxies above. Any object with a get(url) method returning the response body as bytes can be used.
+        rate_limiter : RateLimiter, optional
+            Throttle shared by all requests made through this instance, including concurrent ones. Defaults to
+            FRED's limit of 120 requests per minute. Use fredapi.ratelimit.AdaptiveRateLimiter to also slow down
+            whenever the server rejects requests for exceeding the limit.
+        cache : FileCache, optional
+            Persistent cache of responses, such as fredapi.cache.FileCache('~/.cache/fredapi'). Requests are only
+            sent for responses that are missing from the cache or have expired.
+        metadata_cache : MemoryCache, optional
+            In-process memo for get_series_info(), get_series_vintage_dates() and search results, such as
+            fredapi.cache.MemoryCache(maxsize=1024, ttl=3600). Use invalidate_metadata() to drop entries.
+        file_type : str, optional
+            Wire format requested from FRED, 'xml' (the default) or 'json'. JSON responses are decoded with the json
+            module into plain lists of dicts, which is faster and lighter than building an XML element tree.
+        stream : bool, optional
+            If True, XML responses are parsed incrementally as they are read from the connection, and each element is
+            discarded once its attributes have been extracted, so memory use does not grow with the size of the
+            response. Requires a transport with an open(url) method, such as the default one. Responses that are
+            stored in the cache, and pages of search and release results requested in batches, are always read in
+            full.
+        retry : Retry, optional
+            Policy for retrying requests that fail with a transient error (HTTP 429 and 5xx, dropped connections)
+            with exponential backoff, honoring Retry-After. Defaults to fredapi.ratelimit.Retry(), use
+            Retry(total=0) to disable retries.
+        hooks : list of callable, optional
+            Functions called with a fredapi.metrics.RequestEvent for every request, reporting its URL (with the api
+            key redacted), endpoint, bytes received, network latency, parse time, result building time, retries and
+            whether it was a cache hit. A fredapi.metrics.RequestStats can be used to aggregate them.
+        coalesce : bool, optional
+            If True (the default), threads making the same call at the same time, such as get_series('DGS10'), share
+            one set of requests and one parsed result, and each gets its own copy of the result. Iterators such as
+            iter_search() are not coalesced.
+
+        """
+        super(Fred, self).__init__(api_key, api_key_file, proxies, file_type)
+
+        if transport is None:
+            # proxies from the environment are looked up by the transport, which also honours no_proxy
+            transport = HTTPTransport(proxies=proxies)
+        self.transport = transport
+
+        if rate_limiter is None:
+            rate_limiter = RateLimiter()
+        self.rate_limiter = rate_limiter
+        self.cache = cache
+        self.metadata_cache = metadata_cache
+        self.stream = stream
+        if retry is None:
+            retry = Retry()
+        self.retry = retry
+        self.hooks = list(hooks or [])
+        self._single_flight = _SingleFlight() if coalesce else None
+
+    def __fetch_data(self, url, use_cache=True, events=None, stream=True):
+        """
+        helper function for fetching data given a request URL. If events is a list, a RequestEvent measuring the
+        request is appended to it. stream=False reads the response in full even if the stream attribute is set.
+        """
+        url = self._request_url(url)
+        event = RequestEvent(url)
+        try:
+            return self.__fetch(url, use_cache, event, events, stream)
+        except Exception as exc:
+            event.error = exc
+            raise
+        finally:
+            if events is not None:
+                events.append(event)
+
+    def __fetch(self, url, use_cache, event, events, stream=True):
+        """
+        helper function for fetching data given a full request URL, from the cache if possible
+        """
+        # the cache drops the api key from its keys
+        cache = self.cache if use_cache else None
+        if cache is not None:
+            entry = cache.get(url)
+            if entry is not None and (entry.fresh or self.__revalidate(entry, events)):
+                event.cache_hit = True
+                return self._timed_parse(entry.body, event)
+
+        if stream and self.stream and cache is None and self.file_type == 'xml' and hasattr(self.transport, 'open'):
+            return self._parse_stream(self.__request(self.transport.open, url, event), event)
+        body = self.__request(self.transport.get, url, event)
+        if cache is not None:
+            cache.set(url, body)
+        return self._timed_parse(body, event)
+
+    def __request(self, send, url, event):
+        """
+        helper function for sending a request through the rate limiter, retrying transient failures as set by the
+        retry policy
+        """
+        attempt = 0
+        while True:
+            event.wait += self.rate_limiter.acquire()
+            started = time.perf_counter()
+            try:
+                response = send(url)
+            except Exception as exc:
+                event.latency = time.perf_counter() - started
+                if not self.retry.is_retryable(exc, attempt):
+                    if isinstance(exc, HTTPError):
+                        raise self._parse_error(exc.read())
+                    raise
+                wait = self.retry.backoff(attempt, exc)
+                if getattr(exc, 'code', None) == 429:
+                    self.rate_limiter.throttled(wait)
+                self.retry.sleep(wait)
+                event.wait += wait
+                attempt += 1
+                event.retries = attempt
+                continue
+            event.latency = time.perf_counter() - started
+            self.rate_limiter.succeeded()
+            return response
+
+    def __revalidate(self, entry, events=None):
         """
-        Initialize the Fred class that provides useful functions to query the Fred dataset. You need to specify a valid
-        API key in one of 3 ways: pass the string via api_key, or set api_key_file to a file with the api key in the
-        first line, or set the environment variable 'FRED_API_KEY' to the value of your api key.
+        helper function for checking whether an expired cached observations or vintage dates response can be reused
+        because the series has not been updated since it was stored
+        """
+        if not self.cache.revalidate or url_endpoint(entry.url) not in ('series/observations', 'series/vintagedates'):
+            return False
+        series_id = dict(url_parse.parse_qsl(url_parse.urlsplit(entry.url).query)).get('series_id')
+        if series_id is None:
+            return False
+        root = self.__fetch_data("%s/series?series_id=%s" % (self.root_url, series_id), use_cache=False,
+                                 events=events)
+        record = next(iter(self._records(root, 'seriess')), None)
+        self._close_response(root)
+        if record is None:
+            return False
+        last_updated = pd.Timestamp(record['last_updated']).timestamp()
+        if last_updated >= entry.stored_at:
+            return False
+        self.cache.touch(entry.url)
+        return True
 
-        Parameters
-        ----------
-        api_key : str
-            API key. A free api key can be obtained on the Fred website at http://research.stlouisfed.org/fred2/.
-        api_key_file : str
-            Path to a file containing the api key.
-        proxies : dict
-            Proxies specifications: a dictionary mapping protocol names (e.g. 'http', 'https') to proxy URLs. If not provided, environment variables 'HTTP_PROXY', 'HTTPS_PROXY' are used.
+    def __run(self, plan):
+        """
+        helper function for driving a request plan with blocking requests, see _BaseFred
+        """
+        events = [] if self.hooks else None
+        try:
+            url = next(plan)
+            while True:
+                roots, frame_time = [], 0.0
+                try:
+                    if isinstance(url, list):
+                        response = roots = self.__fetch_concurrent(url, events)
+                    else:
+                        response = self.__fetch_data(url, events=events)
+                        roots = [response]
+                    started = time.perf_counter()
+                    try:
+                        url = plan.send(response)
+                    finally:
+                        frame_time = time.perf_counter() - started
+                finally:
+                    for root in roots:
+                        self._close_response(root)
+                    if events:
+                        self._emit(events, frame_time)
+        except StopIteration as stop:
+            return stop.value
 
+    def __plan_fetch(self, url, parse):
         """
-        self.api_key = None
-        if api_key is not None:
-            self.api_key = api_key
-        elif api_key_file is not None:
-            f = open(api_key_file, 'r')
-            self.api_key = f.readline().strip()
-            f.close()
-        else:
-            self.api_key = os.environ.get('FRED_API_KEY')
+        request plan for a single request whose response is turned into a result by parse
+        """
+        root = yield url
+        return parse(root)
 
-        if self.api_key is None:
-            import textwrap
-            raise ValueError(textwrap.dedent("""\
-                    You need to set a valid API key. You can set it in 3 ways:
-                    pass the string with api_key, or set api_key_file to a
-                    file with the api key in the first line, or set the
-                    environment variable 'FRED_API_KEY' to the value of your
-                    api key. You can sign up for a free api key on the Fred
-                    website at http://research.stlouisfed.org/fred2/"""))
+    def __fetch_concurrent(self, urls, events=None):
+        """
+        helper function for fetching several request URLs at once from a pool of max_workers threads. The responses
+        are read in full rather than streamed, as the plan only parses them once the whole batch is in, and idle
+        streamed responses would each hold a connection open until then.
+        """
+        def fetch(url):
+            return self.__fetch_data(url, events=events, stream=False)
 
-        if not proxies:
-            http_proxy, https_proxy = os.getenv('HTTP_PROXY'), os.getenv('HTTPS_PROXY')
-            if http_proxy or https_proxy:
-                proxies = {'http': http_proxy, 'https': https_proxy}
+        roots, errors = self.__map_concurrent(fetch, urls, self.max_workers)
+        if errors:
+            for root in roots.values():
+                self._close_response(root)
+            raise errors[next(url for url in urls if url in errors)]
+        return [roots[url] for url in urls]
 
-        self.proxies = proxies
+    def __coalesced(self, key, plan):
+        """
+        helper function for driving a request plan whose result is shared with concurrent calls with the same key,
+        see the coalesce parameter of Fred
+        """
+        if self._single_flight is None:
+            return self.__run(plan)
+        return self._single_flight.do(key, lambda: self.__run(plan))
 
-        if self.proxies:
-            opener = url_request.build_opener(url_request.ProxyHandler(self.proxies))
-            url_request.install_opener(opener)
+    def __memoized(self, key, plan):
+        """
+        helper function for driving a request plan whose result is memoized in metadata_cache, and shared with
+        concurrent calls with the same key
+        """
+        if self.metadata_cache is None:
+            return self.__coalesced(key, plan)
+        return self.metadata_cache.get_or_set(key, lambda: self.__coalesced(key, plan))
 
-    def __fetch_data(self, url):
+    def __map_concurrent(self, func, items, max_workers):
         """
-        helper function for fetching data given a request URL
+        helper function for calling func on each item from a pool of worker threads. Returns a dict of results and a
+        dict of exceptions, both keyed by item.
         """
-        url += '&api_key=' + self.api_key
-        try:
-            response = urlopen(url)
-            root = ET.fromstring(response.read())
-        except HTTPError as exc:
-            root = ET.fromstring(exc.read())
-            raise ValueError(root.get('message'))
-        return root
+        results, errors = {}, {}
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = [(item, executor.submit(func, item)) for item in items]
+            for item, future in futures:
+                try:
+                    results[item] = future.result()
+                except Exception as exc:
+                    errors[item] = exc
+        return results, errors
 
-    def _parse(self, date_str, format='%Y-%m-%d'):
+    def __iter_search_results(self, url, limit, order_by, sort_order, filter, fields=None):
         """
-        helper function for parsing FRED date string into datetime
+        helper function for streaming search results: yields a DataFrame per page, in offset order. The pages after
+        the first one are requested and parsed concurrently, but at most max_workers of them are in flight or waiting
+        to be consumed at any time, so memory use stays bounded however slowly the pages are consumed.
         """
-        rv = pd.to_datetime(date_str, format=format)
-        if hasattr(rv, 'to_pydatetime'):
-            rv = rv.to_pydatetime()
-        return rv
+        url = self._search_url(url, order_by, sort_order, filter)
+        fields = self._check_search_fields(fields)
+
+        def parse(root):
+            return self._parse_series_search(root, fields)
+
+        data, num_results_total = self.__run(self.__plan_fetch(url, parse))
+        if data is None:
+            return
+        max_results_needed, offsets = self._search_pages(num_results_total, limit)
+        yield data.head(max_results_needed)
+        if not offsets:
+            return
+
+        def fetch_page(offset):
+            return self.__run(self.__plan_fetch(url + '&offset=' + str(offset), parse))
 
-    def get_series_info(self, series_id):
+        offsets = iter(offsets)
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            pending = deque((offset, executor.submit(fetch_page, offset))
+                            for offset in itertools.islice(offsets, self.max_workers))
+            try:
+                while pending:
+                    offset, future = pending.popleft()
+                    page, _ = future.result()
+                    for next_offset in itertools.islice(offsets, 1):
+                        pending.append((next_offset, executor.submit(fetch_page, next_offset)))
+                    if page is not None:
+                        yield page.head(max_results_needed - offset)
+            finally:
+                for _, future in pending:
+                    future.cancel()
+
+    def get_series_info(self, series_id, as_dict=False):
         """
         Get information about a series such as its title, frequency, observation start/end dates, units, notes, etc.
 
@@ -105,18 +1160,16 @@ class Fred:
         ----------
         series_id : str
             Fred series id such as 'CPIAUCSL'
+        as_dict : bool, optional
+            return a plain dict instead of a pandas Series, which does not need pandas at all
 
         Returns
         -------
-        info : Series
+        info : Series or dict
             a pandas Series containing information about the Fred series
         """
-        url = "%s/series?series_id=%s" % (self.root_url, series_id)
-        root = self.__fetch_data(url)
-        if root is None or not len(root):
-            raise ValueError('No info exists for series id: ' + series_id)
-        info = pd.Series(list(root)[0].attrib)
-        return info
+        key = ('series_info_dict' if as_dict else 'series_info', series_id)
+        return self.__memoized(key, self._plan_series_info(series_id, as_dict))
 
     def get_series(self, series_id, observation_start=None, observation_end=None, **kwargs):
         """
@@ -138,28 +1191,148 @@ class Fred:
         data : Series
             a Series where each index is the observation date and the value is the data for the Fred series
         """
-        url = "%s/series/observations?series_id=%s" % (self.root_url, series_id)
-        if observation_start is not None:
-            observation_start = pd.to_datetime(observation_start,
-                                               errors='raise')
-            url += '&observation_start=' + observation_start.strftime('%Y-%m-%d')
-        if observation_end is not None:
-            observation_end = pd.to_datetime(observation_end, errors='raise')
-            url += '&observation_end=' + observation_end.strftime('%Y-%m-%d')
-        if kwargs.keys():
-            url += '&' + urlencode(kwargs)
-        root = self.__fetch_data(url)
-        if root is None:
-            raise ValueError('No data exists for series id: ' + series_id)
-        data = {}
-        for child in root:
-            val = child.get('value')
-            if val == self.nan_char:
-                val = float('NaN')
-            else:
-                val = float(val)
-            data[self._parse(child.get('date'))] = val
-        return pd.Series(data)
+        key = ('series', series_id, observation_start, observation_end, tuple(sorted(kwargs.items())))
+        return self.__coalesced(key, self._plan_series(series_id, observation_start, observation_end, **kwargs))
+
+    def get_series_columns(self, series_id, observation_start=None, observation_end=None, **kwargs):
+        """
+        Get data for a Fred series id as plain columns, without pandas. This is the lightweight counterpart of
+        get_series(), for callers that do not need a pandas Series or do not have pandas installed.
+
+        Parameters
+        ----------
+        series_id : str
+            Fred series id such as 'CPIAUCSL'
+        observation_start : datetime or datetime-like str such as '2014-07-01', optional
+            earliest observation date. Strings other than YYYY-MM-DD are parsed with pandas.
+        observation_end : datetime or datetime-like str such as '2014-07-01', optional
+            latest observation date
+        kwargs : additional parameters
+            Any additional parameters supported by FRED. You can see
+            https://api.stlouisfed.org/docs/fred/series_observations.html for the full list
+
+        Returns
+        -------
+        columns : dict
+            {'date': list of datetime.date, 'value': array.array of floats}, with missing values as NaN
+        """
+        key = ('series_columns', series_id, observation_start, observation_end, tuple(sorted(kwargs.items())))
+        return self.__coalesced(key, self._plan_series_columns(series_id, observation_start, observation_end,
+                                                               **kwargs))
+
+    def get_series_many(self, series_ids, observation_start=None, observation_end=None, max_workers=None,
+                        as_frame=True, errors=None, **kwargs):
+        """
+        Get data for many Fred series ids at once. The requests are spread over a pool of worker threads and share
+        this instance's rate limiter, and each series is fetched and parsed exactly like get_series().
+
+        Parameters
+        ----------
+        series_ids : list of str
+            Fred series ids such as ['CPIAUCSL', 'PAYEMS']
+        observation_start : datetime or datetime-like str such as '7/1/2014', optional
+            earliest observation date
+        observation_end : datetime or datetime-like str such as '7/1/2014', optional
+            latest observation date
+        max_workers : int, optional
+            number of requests in flight at the same time, defaults to the max_workers attribute
+        as_frame : bool, optional
+            if True, return a DataFrame aligned on observation date with one column per series, otherwise return a
+            dict mapping each series id to its Series
+        errors : dict, optional
+            if given, series that fail are left out of the result and their exception is stored in this dict under
+            the series id. Otherwise the first failure is raised once all requests have finished.
+        kwargs : additional parameters
+            Any additional parameters supported by FRED, passed on to get_series()
+
+        Returns
+        -------
+        data : DataFrame or dict
+            a DataFrame indexed by observation date with one column per series id, or a dict of Series
+        """
+        series_ids = list(dict.fromkeys(series_ids))
+
+        def fetch(series_id):
+            return self.get_series(series_id, observation_start=observation_start,
+                                   observation_end=observation_end, **kwargs)
+
+        results, failures = self.__map_concurrent(fetch, series_ids, max_workers or self.max_workers)
+        return self._combine_series(series_ids, results, failures, as_frame, errors)
+
+    def get_panel(self, series_ids, frequency, observation_start=None, observation_end=None, aggregation_method='avg',
+                  units='lin', max_workers=None, errors=None):
+        """
+        Get data for many Fred series ids at a common frequency, as one DataFrame aligned on observation date. FRED
+        does the frequency conversion, so series of a higher frequency, such as daily ones for a monthly panel, are
+        aggregated on the server and only the converted observations are downloaded. The requests are spread over a
+        pool of worker threads like in get_series_many().
+
+        Parameters
+        ----------
+        series_ids : list of str
+            Fred series ids such as ['DGS10', 'ICSA', 'UNRATE']
+        frequency : str
+            frequency of the panel, one of 'd', 'w', 'bw', 'm', 'q', 'sa', 'a', or a weekly or biweekly frequency
+            ending on a given day such as 'wef' (weekly, ending Friday). It cannot be higher than the native
+            frequency of any of the series.
+        observation_start : datetime or datetime-like str such as '7/1/2014', optional
+            earliest observation date
+        observation_end : datetime or datetime-like str such as '7/1/2014', optional
+            latest observation date
+        aggregation_method : str or dict, optional
+            how observations are aggregated to the frequency: 'avg' (the default), 'sum' or 'eop' (end of period).
+            A dict maps series ids to their method, with 'avg' for the others.
+        units : str or dict, optional
+            data transformation such as 'lin' (levels, the default), 'chg' (change), 'pch' (percent change) or 'pc1'
+            (percent change from a year ago), see the FRED documentation. A dict maps series ids to their units,
+            with 'lin' for the others.
+        max_workers : int, optional
+            number of requests in flight at the same time, defaults to the max_workers attribute
+        errors : dict, optional
+            if given, series that fail are left out of the result and their exception is stored in this dict under
+            the series id. Otherwise the first failure is raised once all requests have finished.
+
+        Returns
+        -------
+        data : DataFrame
+            a DataFrame indexed by observation date with one column per series id
+        """
+        series_ids = list(dict.fromkeys(series_ids))
+        params = self._panel_options(series_ids, frequency, aggregation_method, units)
+
+        def fetch(series_id):
+            return self.__run(self._plan_observations(series_id, observation_start, observation_end,
+                                                      **params[series_id]))
+
+        columns, failures = self.__map_concurrent(fetch, series_ids, max_workers or self.max_workers)
+        self._handle_failures(series_ids, failures, errors)
+        return self._panel(series_ids, columns)
+
+    def update_series(self, series_id, series, revision_window=None, **kwargs):
+        """
+        Bring a previously downloaded series up to date. Only observations from the last known date onwards (or
+        from revision_window before it) are requested, and they are merged with the existing data, replacing any
+        overlapping observations so that recent revisions are picked up.
+
+        Parameters
+        ----------
+        series_id : str
+            Fred series id such as 'DGS10'
+        series : Series
+            data previously returned by get_series() for the same series id and parameters. If None or empty, the
+            full history is fetched.
+        revision_window : timedelta, DateOffset or str such as '90D', optional
+            also re-fetch observations this far before the last known date, to pick up revisions to them
+        kwargs : additional parameters
+            Any additional parameters supported by FRED, passed on to get_series(). These should be the same as the
+            ones used to fetch series.
+
+        Returns
+        -------
+        data : Series
+            a Series where each index is the observation date and the value is the data for the Fred series
+        """
+        return self.__run(self._plan_update_series(series_id, series, revision_window, **kwargs))
 
     def get_series_latest_release(self, series_id):
         """
@@ -181,7 +1354,7 @@ class Fred:
         """
         Get first-release data for a Fred series id. This ignores any revision to the data series. For instance,
         The US GDP for Q1 2014 was first released to be 17149.6, and then later revised to 17101.3, and 17016.0.
-        This will ignore revisions after the first release.
+        This will ignore revisions after the first release. Only the first releases are requested from FRED.
 
         Parameters
         ----------
@@ -193,15 +1366,14 @@ class Fred:
         data : Series
             a Series where each index is the observation date and the value is the data for the Fred series
         """
-        df = self.get_series_all_releases(series_id)
-        first_release = df.groupby('date').head(1)
-        data = first_release.set_index('date')['value']
-        return data
+        return self.__coalesced(('series_first_release', series_id), self._plan_series_first_release(series_id))
 
     def get_series_as_of_date(self, series_id, as_of_date):
         """
         Get latest data for a Fred series id as known on a particular date. This includes any revision to the data series
-        before or on as_of_date, but ignores any revision on dates after as_of_date.
+        before or on as_of_date, but ignores any revision on dates after as_of_date. Revisions published after
+        as_of_date are not requested from FRED, and only the latest revision known on as_of_date is kept for each
+        observation date.
 
         Parameters
         ----------
@@ -212,15 +1384,14 @@ class Fred:
 
         Returns
         -------
-        data : Series
-            a Series where each index is the observation date and the value is the data for the Fred series
+        data : DataFrame
+            a DataFrame with columns 'realtime_start', 'date' and 'value', with one row per observation date holding
+            the value known on as_of_date and the date it was reported
         """
-        as_of_date = pd.to_datetime(as_of_date)
-        df = self.get_series_all_releases(series_id)
-        data = df[df['realtime_start'] <= as_of_date]
-        return data
+        return self.__coalesced(('series_as_of_date', series_id, as_of_date),
+                                self._plan_series_as_of_date(series_id, as_of_date))
 
-    def get_series_all_releases(self, series_id, realtime_start=None, realtime_end=None):
+    def get_series_all_releases(self, series_id, realtime_start=None, realtime_end=None, include_realtime_end=False):
         """
         Get all data for a Fred series id including first releases and all revisions. This returns a DataFrame
         with three columns: 'date', 'realtime_start', and 'value'. For instance, the US GDP for Q4 2013 was first released
@@ -237,6 +1408,9 @@ class Fred:
             specifies the realtime_start value used in the query, defaults to the earliest possible start date allowed by Fred
         realtime_end : str, optional
             specifies the realtime_end value used in the query, defaults to the latest possible end date allowed by Fred
+        include_realtime_end : bool, optional
+            if True, also return a 'realtime_end' column with the last date on which each value was current, NaT if
+            it still is
 
         Returns
         -------
@@ -244,139 +1418,101 @@ class Fred:
             a DataFrame with columns 'date', 'realtime_start' and 'value' where 'date' is the observation period and 'realtime_start'
             is when the corresponding value (either first release or revision) is reported.
         """
-        if realtime_start is None:
-            realtime_start = self.earliest_realtime_start
-        if realtime_end is None:
-            realtime_end = self.latest_realtime_end
-        url = "%s/series/observations?series_id=%s&realtime_start=%s&realtime_end=%s" % (self.root_url,
-                                                                                         series_id,
-                                                                                         realtime_start,
-                                                                                         realtime_end)
-        root = self.__fetch_data(url)
-        if root is None:
-            raise ValueError('No data exists for series id: ' + series_id)
-        data = {}
-        i = 0
-        for child in root:
-            val = child.get('value')
-            if val == self.nan_char:
-                val = float('NaN')
-            else:
-                val = float(val)
-            realtime_start = self._parse(child.get('realtime_start'))
-            # realtime_end = self._parse(child.get('realtime_end'))
-            date = self._parse(child.get('date'))
-
-            data[i] = {'realtime_start': realtime_start,
-                       # 'realtime_end': realtime_end,
-                       'date': date,
-                       'value': val}
-            i += 1
-        data = pd.DataFrame(data).T
-        return data
+        key = ('series_all_releases', series_id, realtime_start, realtime_end, include_realtime_end)
+        return self.__coalesced(key, self._plan_series_all_releases(series_id, realtime_start, realtime_end,
+                                                                    include_realtime_end))
 
-    def get_series_vintage_dates(self, series_id):
+    def get_series_as_of_panel(self, series_ids, as_of_dates, max_workers=None):
         """
-        Get a list of vintage dates for a series. Vintage dates are the dates in history when a
-        series' data values were revised or new data values were released.
+        Get the data of several series as known on each of several dates, e.g. a real-time dataset at every FOMC
+        meeting. The revision history of each series up to the last as-of date is downloaded once, concurrently as
+        in get_series_many(), and the values known on every as-of date are then looked up in a vectorized pass.
 
         Parameters
         ----------
-        series_id : str
-            Fred series id such as 'CPIAUCSL'
+        series_ids : list of str
+            Fred series ids such as ['GDP', 'PAYEMS', 'CPIAUCSL']
+        as_of_dates : list of datetime or datetime-like str
+            dates on which to take a snapshot of the data
+        max_workers : int, optional
+            number of requests in flight at the same time, defaults to the max_workers attribute
 
         Returns
         -------
-        dates : list
-            list of vintage dates
+        data : DataFrame
+            a DataFrame indexed by (as_of, date), with one column per series id holding the latest value of each
+            observation date known on as_of
         """
-        url = "%s/series/vintagedates?series_id=%s" % (self.root_url, series_id)
-        root = self.__fetch_data(url)
-        if root is None:
-            raise ValueError('No vintage date exists for series id: ' + series_id)
-        dates = []
-        for child in root:
-            dates.append(self._parse(child.text))
-        return dates
+        series_ids = list(dict.fromkeys(series_ids))
+        as_of_dates = self._check_as_of_dates(as_of_dates)
+        realtime_end = max(pd.to_datetime(as_of_dates)).strftime('%Y-%m-%d')
 
-    def __do_series_search(self, url):
-        """
-        helper function for making one HTTP request for data, and parsing the returned results into a DataFrame
-        """
-        root = self.__fetch_data(url)
+        def fetch(series_id):
+            return self.get_series_all_releases(series_id, realtime_end=realtime_end, include_realtime_end=True)
 
-        series_ids = []
-        data = {}
+        results, failures = self.__map_concurrent(fetch, series_ids, max_workers or self.max_workers)
+        if failures:
+            raise failures[next(s for s in series_ids if s in failures)]
+        return self._as_of_panel(dict((series_id, results[series_id]) for series_id in series_ids), as_of_dates)
 
-        num_results_returned = 0  # number of results returned in this HTTP request
-        num_results_total = int(root.get('count'))  # total number of results, this can be larger than number of results returned
-        for child in root:
-            num_results_returned += 1
-            series_id = child.get('id')
-            series_ids.append(series_id)
-            data[series_id] = {"id": series_id}
-            fields = ["realtime_start", "realtime_end", "title", "observation_start", "observation_end",
-                      "frequency", "frequency_short", "units", "units_short", "seasonal_adjustment",
-                      "seasonal_adjustment_short", "last_updated", "popularity", "notes"]
-            for field in fields:
-                data[series_id][field] = child.get(field)
+    def iter_series_all_releases(self, series_id, realtime_start=None, realtime_end=None, chunksize=100000):
+        """
+        Iterate over all data for a Fred series id including first releases and all revisions, one chunk at a time.
+        Each chunk is requested and parsed only when the previous one has been consumed, so memory use is bounded
+        by the chunk size rather than by the length of the revision history.
 
-        if num_results_returned > 0:
-            data = pd.DataFrame(data, columns=series_ids).T
-            # parse datetime columns
-            for field in ["realtime_start", "realtime_end", "observation_start", "observation_end", "last_updated"]:
-                data[field] = data[field].apply(self._parse, format=None)
-            # set index name
-            data.index.name = 'series id'
-        else:
-            data = None
-        return data, num_results_total
+        Parameters
+        ----------
+        series_id : str
+            Fred series id such as 'GDP'
+        realtime_start : str, optional
+            specifies the realtime_start value used in the query, defaults to the earliest possible start date
+            allowed by Fred
+        realtime_end : str, optional
+            specifies the realtime_end value used in the query, defaults to the latest possible end date allowed by Fred
+        chunksize : int, optional
+            number of observations per request, at most 100000
 
-    def __get_search_results(self, url, limit, order_by, sort_order, filter):
-        """
-        helper function for getting search results up to specified limit on the number of results. The Fred HTTP API
-        truncates to 1000 results per request, so this may issue multiple HTTP requests to obtain more available data.
+        Returns
+        -------
+        chunks : iterator of DataFrame
+            DataFrames with the same columns as returned by get_series_all_releases()
         """
+        url = self._series_all_releases_url(series_id, realtime_start, realtime_end)
 
-        order_by_options = ['search_rank', 'series_id', 'title', 'units', 'frequency',
-                            'seasonal_adjustment', 'realtime_start', 'realtime_end', 'last_updated',
-                            'observation_start', 'observation_end', 'popularity']
-        if order_by is not None:
-            if order_by in order_by_options:
-                url = url + '&order_by=' + order_by
-            else:
-                raise ValueError('%s is not in the valid list of order_by options: %s' % (order_by, str(order_by_options)))
-
-        if filter is not None:
-            if len(filter) == 2:
-                url = url + '&filter_variable=%s&filter_value=%s' % (filter[0], filter[1])
-            else:
-                raise ValueError('Filter should be a 2 item tuple like (filter_variable, filter_value)')
+        def parse(root):
+            return self._parse_series_all_releases(root), int(root.get('count', 0))
 
-        sort_order_options = ['asc', 'desc']
-        if sort_order is not None:
-            if sort_order in sort_order_options:
-                url = url + '&sort_order=' + sort_order
-            else:
-                raise ValueError('%s is not in the valid list of sort_order options: %s' % (sort_order, str(sort_order_options)))
+        offset = 0
+        while True:
+            chunk, num_results_total = self.__run(self.__plan_fetch('%s&limit=%d&offset=%d' % (url, chunksize, offset),
+                                                                    parse))
+            num_results_returned = len(chunk)
+            if num_results_returned == 0:
+                return
+            yield chunk
+            offset += num_results_returned
+            if offset >= num_results_total:
+                return
 
-        data, num_results_total = self.__do_series_search(url)
-        if data is None:
-            return data
+    def get_series_vintage_dates(self, series_id):
+        """
+        Get a list of vintage dates for a series. Vintage dates are the dates in history when a
+        series' data values were revised or new data values were released.
 
-        if limit == 0:
-            max_results_needed = num_results_total
-        else:
-            max_results_needed = limit
+        Parameters
+        ----------
+        series_id : str
+            Fred series id such as 'CPIAUCSL'
 
-        if max_results_needed > self.max_results_per_request:
-            for i in range(1, max_results_needed // self.max_results_per_request + 1):
-                offset = i * self.max_results_per_request
-                next_data, _ = self.__do_series_search(url + '&offset=' + str(offset))
-                data = pd.concat([data, next_data])
-        return data.head(max_results_needed)
+        Returns
+        -------
+        dates : list
+            list of vintage dates
+        """
+        return self.__memoized(('series_vintage_dates', series_id), self._plan_series_vintage_dates(series_id))
 
-    def search(self, text, limit=1000, order_by=None, sort_order=None, filter=None):
+    def search(self, text, limit=1000, order_by=None, sort_order=None, filter=None, fields=None):
         """
         Do a fulltext search for series in the Fred dataset. Returns information about matching series in a DataFrame.
 
@@ -395,18 +1531,22 @@ class Fred:
         filter : tuple, optional
             filters the results. Expects a tuple like (filter_variable, filter_value).
             Valid filter_variable values are 'frequency', 'units', and 'seasonal_adjustment'
+        fields : list of str, optional
+            only keep these fields of the results, such as ['title', 'frequency_short', 'popularity'], with typed
+            columns: dates are datetime64, last_updated is in UTC, popularity is an integer, and the frequency and
+            seasonal adjustment columns are categoricals. This uses much less time and memory on large result sets,
+            mostly by leaving out the notes. Valid fields are listed in Fred.search_fields
 
         Returns
         -------
         info : DataFrame
             a DataFrame containing information about the matching Fred series
         """
-        url = "%s/series/search?search_text=%s&" % (self.root_url,
-                                                    quote_plus(text))
-        info = self.__get_search_results(url, limit, order_by, sort_order, filter)
-        return info
+        fields = self._check_search_fields(fields)
+        key = self._search_key('search', text, limit, order_by, sort_order, filter, fields)
+        return self.__memoized(key, self._plan_search(text, limit, order_by, sort_order, filter, fields))
 
-    def search_by_release(self, release_id, limit=0, order_by=None, sort_order=None, filter=None):
+    def search_by_release(self, release_id, limit=0, order_by=None, sort_order=None, filter=None, fields=None):
         """
         Search for series that belongs to a release id. Returns information about matching series in a DataFrame.
 
@@ -425,19 +1565,23 @@ class Fred:
         filter : tuple, optional
             filters the results. Expects a tuple like (filter_variable, filter_value).
             Valid filter_variable values are 'frequency', 'units', and 'seasonal_adjustment'
+        fields : list of str, optional
+            only keep these fields of the results, such as ['title', 'frequency_short', 'popularity'], with typed
+            columns: dates are datetime64, last_updated is in UTC, popularity is an integer, and the frequency and
+            seasonal adjustment columns are categoricals. This uses much less time and memory on large result sets,
+            mostly by leaving out the notes. Valid fields are listed in Fred.search_fields
 
         Returns
         -------
         info : DataFrame
             a DataFrame containing information about the matching Fred series
         """
-        url = "%s/release/series?release_id=%d" % (self.root_url, release_id)
-        info = self.__get_search_results(url, limit, order_by, sort_order, filter)
-        if info is None:
-            raise ValueError('No series exists for release id: ' + str(release_id))
-        return info
+        fields = self._check_search_fields(fields)
+        key = self._search_key('search_by_release', release_id, limit, order_by, sort_order, filter, fields)
+        return self.__memoized(key, self._plan_search_by_release(release_id, limit, order_by, sort_order, filter,
+                                                                 fields))
 
-    def search_by_category(self, category_id, limit=0, order_by=None, sort_order=None, filter=None):
+    def search_by_category(self, category_id, limit=0, order_by=None, sort_order=None, filter=None, fields=None):
         """
         Search for series that belongs to a category id. Returns information about matching series in a DataFrame.
 
@@ -456,15 +1600,76 @@ class Fred:
         filter : tuple, optional
             filters the results. Expects a tuple like (filter_variable, filter_value).
             Valid filter_variable values are 'frequency', 'units', and 'seasonal_adjustment'
+        fields : list of str, optional
+            only keep these fields of the results, such as ['title', 'frequency_short', 'popularity'], with typed
+            columns: dates are datetime64, last_updated is in UTC, popularity is an integer, and the frequency and
+            seasonal adjustment columns are categoricals. This uses much less time and memory on large result sets,
+            mostly by leaving out the notes. Valid fields are listed in Fred.search_fields
 
         Returns
         -------
         info : DataFrame
             a DataFrame containing information about the matching Fred series
         """
-        url = "%s/category/series?category_id=%d&" % (self.root_url,
-                                                      category_id)
-        info = self.__get_search_results(url, limit, order_by, sort_order, filter)
-        if info is None:
-            raise ValueError('No series exists for category id: ' + str(category_id))
-        return info
+        fields = self._check_search_fields(fields)
+        key = self._search_key('search_by_category', category_id, limit, order_by, sort_order, filter, fields)
+        return self.__memoized(key, self._plan_search_by_category(category_id, limit, order_by, sort_order, filter,
+                                                                  fields))
+
+    def get_category_children(self, category_id):
+        """
+        Get the child categories of a category. The category tree starts at category id 0.
+
+        Parameters
+        ----------
+        category_id : int
+            category id, e.g., 32991
+
+        Returns
+        -------
+        children : DataFrame
+            a DataFrame indexed by category id, with the name and parent_id of each child category
+        """
+        return self.__memoized(('category_children', category_id), self._plan_category_children(category_id))
+
+    def get_releases(self):
+        """
+        Get all releases of economic data.
+
+        Returns
+        -------
+        releases : DataFrame
+            a DataFrame indexed by release id, with the name, press_release, link, realtime_start and realtime_end of
+            each release
+        """
+        return self.__memoized(('releases',), self._plan_releases())
+
+    def iter_search(self, text, limit=1000, order_by=None, sort_order=None, filter=None, fields=None):
+        """
+        Iterate over the results of search() one page (up to 1000 series) at a time, so that large result sets can be
+        processed without holding all of them in memory. Pages after the first one are requested concurrently, at most
+        max_workers ahead of the caller, and yielded in offset order.
+
+        Parameters are the same as for search().
+
+        Returns
+        -------
+        pages : iterator of DataFrame
+            DataFrames containing information about the matching Fred series
+        """
+        url = self._search_base_url('search', text)
+        return self.__iter_search_results(url, limit, order_by, sort_order, filter, fields)
+
+    def iter_search_by_release(self, release_id, limit=0, order_by=None, sort_order=None, filter=None, fields=None):
+        """
+        Iterate over the results of search_by_release() one page at a time, see iter_search().
+        """
+        url = self._search_base_url('search_by_release', release_id)
+        return self.__iter_search_results(url, limit, order_by, sort_order, filter, fields)
+
+    def iter_search_by_category(self, category_id, limit=0, order_by=None, sort_order=None, filter=None, fields=None):
+        """
+        Iterate over the results of search_by_category() one page at a time, see iter_search().
+        """
+        url = self._search_base_url('search_by_category', category_id)
+        return self.__iter_search_results(url, limit, order_by, sort_order, filter, fields)
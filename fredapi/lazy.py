@@ -0,0 +1,23 @@
+"""
+Deferred imports of heavy dependencies such as pandas, so that importing fredapi stays fast.
+"""
+import importlib
+
+
+class LazyModule(object):
+    """
+    Stand-in for a module that is only imported when one of its attributes is first used. Attributes are then
+    stored on the stand-in, so later lookups cost the same as on the module itself.
+    """
+
+    def __init__(self, name):
+        self.__dict__['_name'] = name
+
+    def __getattr__(self, attr):
+        module = importlib.import_module(self._name)
+        value = getattr(module, attr)
+        self.__dict__[attr] = value
+        return value
+
+    def __repr__(self):
+        return '<lazy module %r>' % self._name
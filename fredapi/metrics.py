@@ -0,0 +1,116 @@
+"""
+Request-level instrumentation: per-request events passed to hooks, and aggregated timing statistics.
+"""
+import threading
+import urllib.parse as url_parse
+
+from fredapi.cache import url_endpoint
+
+
+def redact_url(url):
+    """
+    Return a request URL with the value of its api_key parameter masked, so that it can be logged.
+    """
+    parts = url_parse.urlsplit(url)
+    query = [(name, '***' if name == 'api_key' else value)
+             for name, value in url_parse.parse_qsl(parts.query, keep_blank_values=True)]
+    return url_parse.urlunsplit((parts.scheme, parts.netloc, parts.path, url_parse.urlencode(query, safe='*'), ''))
+
+
+class RequestEvent(object):
+    """
+    Measurements of one request, passed to the hooks of Fred and AsyncFred once its response has been turned into
+    a result. All times are in seconds.
+
+    Attributes
+    ----------
+    url : str
+        request URL with the api key redacted
+    endpoint : str
+        API endpoint such as 'series/observations'
+    bytes : int
+        size of the (decompressed) response body, or None if the request failed
+    latency : float
+        time spent in the transport for the last attempt. For streamed responses this only covers receiving the
+        headers, and the body transfer is counted in frame_time.
+    parse_time : float
+        time spent decoding the response body into an XML tree or JSON objects
+    frame_time : float
+        time spent building the result from the parsed response. Responses of requests made together, such as
+        the pages of a search, each get an even share of the time
+    wait : float
+        time spent waiting for the rate limiter and between retries
+    retries : int
+        number of retries before the last attempt
+    cache_hit : bool
+        whether the response was served from the cache
+    error : Exception
+        exception raised by the request, or None
+    """
+
+    def __init__(self, url):
+        self.url = redact_url(url)
+        self.endpoint = url_endpoint(url)
+        self.bytes = None
+        self.latency = 0.0
+        self.parse_time = 0.0
+        self.frame_time = 0.0
+        self.wait = 0.0
+        self.retries = 0
+        self.cache_hit = False
+        self.error = None
+
+    def __repr__(self):
+        return ('RequestEvent(%r, bytes=%r, latency=%.4f, parse_time=%.4f, frame_time=%.4f, retries=%d, '
+                'cache_hit=%r)' % (self.url, self.bytes, self.latency, self.parse_time, self.frame_time, self.retries,
+                                   self.cache_hit))
+
+
+class RequestStats(object):
+    """
+    Hook aggregating RequestEvents into totals overall and per endpoint, e.g. Fred(hooks=[RequestStats()]). Safe to
+    share between threads and clients.
+    """
+
+    fields = ('requests', 'errors', 'cache_hits', 'retries', 'bytes', 'latency', 'parse_time', 'frame_time', 'wait')
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._totals = {}
+
+    def __call__(self, event):
+        self.record(event)
+
+    def record(self, event):
+        """
+        Add the measurements of a RequestEvent.
+        """
+        values = (1, event.error is not None, event.cache_hit, event.retries, event.bytes or 0, event.latency,
+                  event.parse_time, event.frame_time, event.wait)
+        with self._lock:
+            for key in (None, event.endpoint):
+                totals = self._totals.setdefault(key, dict.fromkeys(self.fields, 0))
+                for field, value in zip(self.fields, values):
+                    totals[field] += value
+
+    def totals(self):
+        """
+        Return a dict with the number of requests, errors, cache hits and retries, and the total bytes received
+        and seconds spent in each stage, over all requests.
+        """
+        with self._lock:
+            return dict(self._totals.get(None, dict.fromkeys(self.fields, 0)))
+
+    def by_endpoint(self):
+        """
+        Return a dict mapping each endpoint to its totals, see totals().
+        """
+        with self._lock:
+            return dict((key, dict(totals)) for key, totals in self._totals.items() if key is not None)
+
+    def reset(self):
+        """
+        Clear all totals.
+        """
+        with self._lock:
+            self._totals = {}
@@ -0,0 +1,203 @@
+"""
+Client-side throttling and retries for requests made to the FRED web service.
+"""
+import email.utils
+import random
+import socket
+import threading
+import time
+import http.client as http_client
+import urllib.error as url_error
+
+
+class RateLimiter(object):
+    """
+    Token bucket shared by all requests made through a Fred instance. Each request takes one token; tokens are
+    refilled continuously at `rate` per `period` seconds, and up to `burst` of them can be saved up. The limiter is
+    safe to use from several threads at once.
+    """
+
+    def __init__(self, rate=120, period=60.0, burst=None, clock=time.monotonic, sleep=time.sleep):
+        """
+        Parameters
+        ----------
+        rate : int
+            number of requests allowed per period. FRED allows 120 requests per minute per API key.
+        period : float
+            length of the period in seconds
+        burst : int, optional
+            maximum number of requests that can be made back to back after a quiet spell, defaults to rate
+        clock : callable, optional
+            function returning the current time in seconds, for testing
+        sleep : callable, optional
+            function used to wait for a number of seconds, for testing
+        """
+        self.rate = float(rate) / period
+        self.burst = float(burst if burst is not None else rate)
+        self.clock = clock
+        self.sleep = sleep
+        self._tokens = self.burst
+        self._updated = clock()
+        self._lock = threading.Lock()
+
+    def _refill(self, now):
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def reserve(self):
+        """
+        Take a token without waiting, and return the number of seconds the caller has to wait before using it.
+        The token is reserved right away, so concurrent callers queue up behind each other.
+        """
+        with self._lock:
+            self._refill(self.clock())
+            self._tokens -= 1
+            return -self._tokens / self.rate if self._tokens < 0 else 0.0
+
+    def acquire(self):
+        """
+        Take a token, waiting until one is available. Returns the number of seconds waited.
+        """
+        wait = self.reserve()
+        if wait > 0:
+            self.sleep(wait)
+        return wait
+
+    def pause(self, seconds):
+        """
+        Hold back every request for at least the given number of seconds, e.g. after the server asked to slow down.
+        """
+        with self._lock:
+            self._refill(self.clock())
+            self._tokens = min(self._tokens, 1 - seconds * self.rate)
+
+    def throttled(self, retry_after=None):
+        """
+        Called when the server rejected a request for exceeding its rate limit. Pauses all requests for retry_after
+        seconds if given.
+        """
+        if retry_after:
+            self.pause(retry_after)
+
+    def succeeded(self):
+        """
+        Called when a request went through.
+        """
+
+
+class AdaptiveRateLimiter(RateLimiter):
+    """
+    Token bucket whose rate adapts to the server: it is cut by `decrease` each time a request is rejected for
+    exceeding the rate limit, and grows back by `increase` times the configured rate with each successful request
+    (additive increase, multiplicative decrease). This lets batch jobs run close to the quota, even when it is shared
+    with other clients, without repeatedly tripping it.
+    """
+
+    def __init__(self, rate=120, period=60.0, burst=None, min_rate=1, decrease=0.5, increase=0.01,
+                 clock=time.monotonic, sleep=time.sleep):
+        """
+        Parameters
+        ----------
+        rate : int
+            highest number of requests allowed per period
+        period : float
+            length of the period in seconds
+        burst : int, optional
+            maximum number of requests that can be made back to back after a quiet spell, defaults to rate
+        min_rate : int, optional
+            lowest number of requests per period the rate is cut down to
+        decrease : float, optional
+            factor applied to the rate when a request is rejected
+        increase : float, optional
+            fraction of the highest rate added back after each successful request
+        clock : callable, optional
+            function returning the current time in seconds, for testing
+        sleep : callable, optional
+            function used to wait for a number of seconds, for testing
+        """
+        super(AdaptiveRateLimiter, self).__init__(rate, period, burst, clock, sleep)
+        self.max_rate = self.rate
+        self.min_rate = float(min_rate) / period
+        self.decrease = decrease
+        self.increase = increase
+
+    def throttled(self, retry_after=None):
+        with self._lock:
+            self._refill(self.clock())
+            self.rate = max(self.min_rate, self.rate * self.decrease)
+        super(AdaptiveRateLimiter, self).throttled(retry_after)
+
+    def succeeded(self):
+        with self._lock:
+            if self.rate < self.max_rate:
+                self._refill(self.clock())
+                self.rate = min(self.max_rate, self.rate + self.max_rate * self.increase)
+
+
+class Retry(object):
+    """
+    Retry policy for requests failing with a transient error: rate limiting (HTTP 429), server errors and dropped
+    connections. Retries are spaced by exponential backoff with full jitter, unless the server sent a Retry-After
+    header, which is honored.
+    """
+
+    def __init__(self, total=3, backoff_factor=0.5, max_backoff=30.0, status_forcelist=(429, 500, 502, 503, 504),
+                 random=random.random, sleep=time.sleep):
+        """
+        Parameters
+        ----------
+        total : int
+            maximum number of retries of a request, 0 to disable retries
+        backoff_factor : float
+            the n-th retry waits a random time of up to backoff_factor * 2 ** n seconds
+        max_backoff : float
+            upper bound of the backoff in seconds, unless the server asks for longer with Retry-After
+        status_forcelist : tuple of int
+            HTTP status codes that are retried
+        random : callable, optional
+            function returning a random float in [0, 1), for testing
+        sleep : callable, optional
+            function used to wait for a number of seconds, for testing
+        """
+        self.total = total
+        self.backoff_factor = backoff_factor
+        self.max_backoff = max_backoff
+        self.status_forcelist = status_forcelist
+        self.random = random
+        self.sleep = sleep
+
+    def is_retryable(self, exc, attempt):
+        """
+        Return whether a request that failed with exc on the given attempt, counting from 0, should be retried.
+        """
+        if attempt >= self.total:
+            return False
+        if isinstance(exc, url_error.HTTPError):
+            return exc.code in self.status_forcelist
+        return isinstance(exc, (url_error.URLError, ConnectionError, socket.timeout, http_client.HTTPException))
+
+    def retry_after(self, exc):
+        """
+        Return the number of seconds to wait asked for by the Retry-After header of an HTTPError, or None.
+        """
+        headers = getattr(exc, 'headers', None)
+        value = headers.get('Retry-After') if headers is not None else None
+        if not value:
+            return None
+        try:
+            return max(0.0, float(value))
+        except ValueError:
+            pass
+        try:
+            return max(0.0, email.utils.parsedate_to_datetime(value).timestamp() - time.time())
+        except (TypeError, ValueError):
+            return None
+
+    def backoff(self, attempt, exc=None):
+        """
+        Return the number of seconds to wait before retrying a request that failed with exc on the given attempt.
+        """
+        retry_after = self.retry_after(exc) if exc is not None else None
+        if retry_after is not None:
+            return retry_after
+        return self.random() * min(self.max_backoff, self.backoff_factor * 2 ** attempt)
@@ -0,0 +1,155 @@
+"""
+Transports that record responses from the FRED web service to an archive, and replay them without network access.
+
+An archive is a zip file holding one member per request, named after the hash of the normalized request URL (without
+the api key), so recordings can be shared and replayed with any key. Each member holds a JSON header line with the URL
+and HTTP status, followed by the response body.
+"""
+import hashlib
+import io
+import json
+import threading
+import zipfile
+from email.message import Message
+
+from fredapi.cache import normalize_url
+from fredapi.transport import HTTPError, HTTPTransport
+
+
+def _member_name(url):
+    return hashlib.sha1(normalize_url(url).encode('utf-8')).hexdigest()
+
+
+class RecordingTransport(object):
+    """
+    Transport passing requests on to another transport and recording the responses in an archive. Successful
+    responses and client errors are recorded, while transient failures (HTTP 429 and 5xx) are not, so that they
+    are retried as usual. The first response recorded for a request is kept.
+    """
+
+    def __init__(self, path, transport=None):
+        """
+        Parameters
+        ----------
+        path : str
+            archive file, extended if it exists
+        transport : object, optional
+            transport used for the actual requests, defaults to an HTTPTransport
+        """
+        if transport is None:
+            transport = HTTPTransport()
+        self.transport = transport
+        self.path = path
+        self._lock = threading.Lock()
+        self._archive = zipfile.ZipFile(path, 'a', compression=zipfile.ZIP_DEFLATED)
+        self._recorded = set(self._archive.namelist())
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _record(self, url, status, body):
+        name = _member_name(url)
+        header = json.dumps({'url': normalize_url(url), 'status': status}).encode('utf-8')
+        with self._lock:
+            if name not in self._recorded:
+                self._archive.writestr(name, header + b'\n' + body)
+                self._recorded.add(name)
+
+    def get(self, url):
+        """
+        Fetch a URL through the wrapped transport and record the response.
+        """
+        try:
+            body = self.transport.get(url)
+        except HTTPError as exc:
+            body = exc.read()
+            if exc.code != 429 and exc.code < 500:
+                self._record(url, exc.code, body)
+            raise HTTPError(exc.url, exc.code, exc.msg, exc.headers, io.BytesIO(body))
+        self._record(url, 200, body)
+        return body
+
+    def close(self):
+        """
+        Close the wrapped transport and write out the archive.
+        """
+        self.transport.close()
+        with self._lock:
+            self._archive.close()
+
+
+class ReplayTransport(object):
+    """
+    Transport serving the responses recorded by a RecordingTransport, without any network access. Requests are
+    matched on their normalized URL, and requests that were not recorded raise ValueError.
+    """
+
+    def __init__(self, path):
+        """
+        Parameters
+        ----------
+        path : str
+            archive file written by RecordingTransport
+        """
+        self.path = path
+        self._lock = threading.Lock()
+        self._archive = zipfile.ZipFile(path, 'r')
+        self._names = set(self._archive.namelist())
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _read(self, url):
+        name = _member_name(url)
+        if name not in self._names:
+            raise ValueError('No recorded response for: ' + normalize_url(url))
+        with self._lock:
+            data = self._archive.read(name)
+        header, body = data.split(b'\n', 1)
+        status = json.loads(header.decode('utf-8'))['status']
+        if status >= 400:
+            raise HTTPError(url, status, 'Recorded error', Message(), io.BytesIO(body))
+        return body
+
+    def get(self, url):
+        """
+        Return the recorded response body for a URL.
+
+        Raises
+        ------
+        HTTPError
+            if the recorded response is an error; the response body can be read from the exception
+        ValueError
+            if no response was recorded for the URL
+        """
+        return self._read(url)
+
+    def open(self, url):
+        """
+        Return a file-like object reading the recorded response body for a URL.
+        """
+        return io.BytesIO(self._read(url))
+
+    def close(self):
+        """
+        Close the archive.
+        """
+        self._archive.close()
+
+
+class AsyncReplayTransport(ReplayTransport):
+    """
+    ReplayTransport for fredapi.async_fred.AsyncFred.
+    """
+
+    async def get(self, url):
+        return self._read(url)
+
+    async def close(self):
+        super(AsyncReplayTransport, self).close()
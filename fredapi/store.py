@@ -0,0 +1,265 @@
+"""
+Columnar on-disk store for downloaded series and their metadata, in Parquet or Feather format. Requires pyarrow.
+"""
+import os
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+
+try:
+    import pyarrow
+    import pyarrow.compute
+    import pyarrow.feather
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
+
+class SeriesStore(object):
+    """
+    Local store of series data and series metadata in a columnar format. Each series is kept in its own file under
+    directory/series, holding a 'date' and a 'value' column, and the metadata of all series (as returned by
+    get_series_info() or the search methods) is kept in one table indexed by series id. Reads are memory-mapped and
+    only load the requested columns, and Parquet reads skip the row groups outside the requested date range. Safe to
+    share between threads.
+    """
+
+    formats = ['parquet', 'feather']
+    # observations per Parquet row group of a series file. Row groups are the unit that reads of a date range can
+    # skip, using the date statistics kept for each of them.
+    row_group_size = 4096
+
+    def __init__(self, directory, format='parquet', max_workers=8):
+        """
+        Parameters
+        ----------
+        directory : str
+            directory holding the store, created if needed
+        format : str, optional
+            'parquet' (the default), which is compressed, or 'feather', which is stored uncompressed so that reads
+            are zero-copy memory maps
+        max_workers : int, optional
+            number of threads reading series at the same time in read_panel()
+        """
+        if pyarrow is None:
+            raise ImportError('SeriesStore requires pyarrow, which can be installed with: pip install pyarrow')
+        if format not in self.formats:
+            raise ValueError('%s is not in the valid list of format options: %s' % (format, str(self.formats)))
+        self.directory = directory
+        self.format = format
+        self.max_workers = max_workers
+        self._lock = threading.Lock()
+        series_directory = os.path.join(directory, 'series')
+        if not os.path.isdir(series_directory):
+            os.makedirs(series_directory)
+
+    def _path(self, series_id):
+        if not series_id or os.sep in series_id or (os.altsep and os.altsep in series_id) or series_id[0] == '.':
+            raise ValueError('Invalid series id: %r' % series_id)
+        return os.path.join(self.directory, 'series', '%s.%s' % (series_id, self.format))
+
+    def _metadata_path(self):
+        return os.path.join(self.directory, 'metadata.' + self.format)
+
+    def _write_table(self, table, path, row_group_size=None):
+        """
+        helper function for atomically replacing a file with a table
+        """
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+        os.close(fd)
+        try:
+            if self.format == 'parquet':
+                pyarrow.parquet.write_table(table, tmp_path, row_group_size=row_group_size)
+            else:
+                pyarrow.feather.write_feather(table, tmp_path, compression='uncompressed')
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.remove(tmp_path)
+            raise
+
+    def _read_table(self, path, columns=None, filter=None):
+        """
+        helper function for memory-mapping a table from a file, or returning None if the file does not exist. Only
+        the rows matching the filter expression are returned: Parquet row groups whose statistics rule them out are
+        not read at all, while Feather files, which are memory-mapped without copying, are filtered after mapping.
+        """
+        if not os.path.exists(path):
+            return None
+        # each file is small, so reading it on one thread is faster, and leaves read_panel() to spread the files
+        if self.format == 'parquet':
+            return pyarrow.parquet.read_table(path, columns=columns, filters=filter, memory_map=True,
+                                              use_threads=False)
+        table = pyarrow.feather.read_table(path, columns=columns, memory_map=True, use_threads=False)
+        return table.filter(filter) if filter is not None else table
+
+    def __contains__(self, series_id):
+        return os.path.exists(self._path(series_id))
+
+    def series_ids(self):
+        """
+        Return the sorted list of series ids with stored data.
+        """
+        suffix = '.' + self.format
+        return sorted(name[:-len(suffix)] for name in os.listdir(os.path.join(self.directory, 'series'))
+                      if name.endswith(suffix))
+
+    def write_series(self, series_id, series):
+        """
+        Store the data of a series, replacing any stored data.
+
+        Parameters
+        ----------
+        series_id : str
+            Fred series id such as 'CPIAUCSL'
+        series : Series
+            data indexed by observation date, as returned by get_series()
+        """
+        frame = pd.DataFrame({'date': pd.DatetimeIndex(series.index), 'value': series.to_numpy(dtype='float64')})
+        table = pyarrow.Table.from_pandas(frame, preserve_index=False)
+        with self._lock:
+            self._write_table(table, self._path(series_id), self.row_group_size)
+
+    def append_series(self, series_id, series):
+        """
+        Add new observations to the stored data of a series. Observations on dates that are already stored replace
+        the stored ones, so revisions can be appended too. Returns the combined data.
+        """
+        with self._lock:
+            stored = self._read_series(series_id)
+            if stored is not None and len(series):
+                stored = stored[~stored.index.isin(pd.DatetimeIndex(series.index))]
+                series = pd.concat([stored, series]).sort_index()
+            frame = pd.DataFrame({'date': pd.DatetimeIndex(series.index),
+                                  'value': series.to_numpy(dtype='float64')})
+            self._write_table(pyarrow.Table.from_pandas(frame, preserve_index=False), self._path(series_id),
+                              self.row_group_size)
+        return self.read_series(series_id)
+
+    def _read_series(self, series_id, start=None, end=None):
+        """
+        helper function for reading the stored data of a series, or None if there is none
+        """
+        date, dates = pyarrow.compute.field('date'), None
+        if start is not None:
+            dates = date >= pyarrow.scalar(pd.Timestamp(start).to_datetime64())
+        if end is not None:
+            upper = date <= pyarrow.scalar(pd.Timestamp(end).to_datetime64())
+            dates = upper if dates is None else dates & upper
+        table = self._read_table(self._path(series_id), filter=dates)
+        if table is None:
+            return None
+        return pd.Series(table.column('value').to_numpy(), index=pd.DatetimeIndex(table.column('date').to_numpy()))
+
+    def read_series(self, series_id, start=None, end=None):
+        """
+        Load the stored data of a series.
+
+        Parameters
+        ----------
+        series_id : str
+            Fred series id such as 'CPIAUCSL'
+        start : datetime or datetime-like str such as '7/1/2014', optional
+            earliest observation date to load
+        end : datetime or datetime-like str such as '7/1/2014', optional
+            latest observation date to load
+
+        Returns
+        -------
+        data : Series
+            a Series where each index is the observation date and the value is the data for the Fred series
+        """
+        data = self._read_series(series_id, start, end)
+        if data is None:
+            raise ValueError('No data stored for series id: ' + series_id)
+        return data
+
+    def read_panel(self, series_ids=None, start=None, end=None):
+        """
+        Load the stored data of many series at once, as a DataFrame aligned on observation date with one column per
+        series. The files are read concurrently.
+
+        Parameters
+        ----------
+        series_ids : list of str, optional
+            series ids to load, defaults to every stored series
+        start : datetime or datetime-like str such as '7/1/2014', optional
+            earliest observation date to load
+        end : datetime or datetime-like str such as '7/1/2014', optional
+            latest observation date to load
+        """
+        if series_ids is None:
+            series_ids = self.series_ids()
+        series_ids = list(dict.fromkeys(series_ids))
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            data = list(executor.map(lambda series_id: self.read_series(series_id, start, end), series_ids))
+        if not data:
+            return pd.DataFrame()
+        return pd.concat(dict(zip(series_ids, data)), axis=1)
+
+    def update(self, fred, series_id, revision_window=None, **kwargs):
+        """
+        Bring the stored data of a series up to date with Fred.update_series(), downloading the full history if
+        nothing is stored yet. Returns the updated data.
+        """
+        stored = self._read_series(series_id)
+        recent = fred.update_series(series_id, stored, revision_window=revision_window, **kwargs)
+        self.write_series(series_id, recent)
+        return recent
+
+    def write_metadata(self, info):
+        """
+        Store series metadata, replacing the stored metadata of the same series ids. Values are stored as strings: the
+        strings returned by FRED are kept as they are, while typed values, such as the Timestamps and numbers of
+        search results with fields, are converted with str().
+
+        Parameters
+        ----------
+        info : Series or DataFrame
+            a Series returned by get_series_info(), or a DataFrame returned by search(), search_by_release() or
+            search_by_category()
+        """
+        if isinstance(info, pd.Series):
+            info = info.to_frame().T.set_index('id')
+        info = info.copy()
+        for column in info.columns:
+            info[column] = [value if value is None or isinstance(value, str) else
+                            (None if pd.isnull(value) else str(value)) for value in info[column]]
+        info.index = info.index.astype(str)
+        info.index.name = 'series id'
+        with self._lock:
+            stored = self._read_metadata()
+            if stored is not None:
+                info = pd.concat([stored[~stored.index.isin(info.index)], info])
+            table = pyarrow.Table.from_pandas(info.reset_index(), preserve_index=False)
+            self._write_table(table, self._metadata_path())
+
+    def _read_metadata(self, columns=None):
+        """
+        helper function for reading the stored metadata, or None if there is none
+        """
+        if columns is not None:
+            columns = ['series id'] + [column for column in columns if column != 'series id']
+        table = self._read_table(self._metadata_path(), columns)
+        if table is None:
+            return None
+        return table.to_pandas().set_index('series id')
+
+    def read_metadata(self, series_ids=None, columns=None):
+        """
+        Load stored series metadata as a DataFrame indexed by series id.
+
+        Parameters
+        ----------
+        series_ids : list of str, optional
+            series ids to load, defaults to every stored series
+        columns : list of str, optional
+            columns to load, such as ['title', 'frequency_short'], defaults to all of them
+        """
+        info = self._read_metadata(columns)
+        if info is None:
+            return pd.DataFrame()
+        if series_ids is not None:
+            info = info[info.index.isin(list(series_ids))]
+        return info
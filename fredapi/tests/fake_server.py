@@ -0,0 +1,156 @@
+"""Local stand-in for the FRED web service used by the transport tests."""
+import gzip
+import http.client
+import select
+import socket
+import threading
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from socketserver import ThreadingMixIn
+from urllib.parse import urlsplit
+
+
+class _ThreadingHTTPServer(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+
+class FakeFredServer(object):
+    """Serve canned responses on localhost.
+
+    Parameters:
+    -----------
+    routes: dict mapping a request path (including the query string,
+        without the api_key parameter) to a (status, body) tuple.
+
+    The server speaks HTTP/1.1 with keep-alive, gzip-compresses bodies when
+    asked to, and records every request path and the client address it came
+    from so tests can check connection reuse.
+
+    """
+
+    def __init__(self, routes=None):
+        self.routes = dict(routes or {})
+        self.requests = []
+        self.clients = []
+        self._lock = threading.Lock()
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                path = self.path.split('&api_key=')[0]
+                with server._lock:
+                    server.requests.append(path)
+                    server.clients.append(self.client_address)
+                status, body = server.routes.get(
+                    path, (404, b'<error code="404" message="Not Found" />'))
+                if not isinstance(body, bytes):
+                    body = body.encode('utf-8')
+                self.send_response(status)
+                self.send_header('Content-Type', 'text/xml')
+                if 'gzip' in self.headers.get('Accept-Encoding', ''):
+                    body = gzip.compress(body)
+                    self.send_header('Content-Encoding', 'gzip')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+        self.httpd = _ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.thread = threading.Thread(target=self.httpd.serve_forever)
+        self.thread.daemon = True
+
+    @property
+    def url(self):
+        return 'http://127.0.0.1:%d' % self.httpd.server_address[1]
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+class FakeProxyServer(object):
+    """Forwarding proxy on localhost.
+
+    Plain http requests arrive with the absolute URL as the request target
+    and are forwarded, CONNECT requests are answered with 200 and the
+    connection is then piped to the requested host and port. Every request
+    line and its Proxy-Authorization header are recorded in requests.
+
+    """
+
+    def __init__(self):
+        self.requests = []
+        self._lock = threading.Lock()
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def log_message(self, *args):
+                pass
+
+            def record(self):
+                with server._lock:
+                    server.requests.append(
+                        (self.command, self.path,
+                         self.headers.get('Proxy-Authorization')))
+
+            def do_GET(self):
+                self.record()
+                parts = urlsplit(self.path)
+                conn = http.client.HTTPConnection(parts.hostname, parts.port)
+                conn.request('GET', parts.path + '?' + parts.query)
+                response = conn.getresponse()
+                body = response.read()
+                conn.close()
+                self.send_response(response.status)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_CONNECT(self):
+                self.record()
+                host, port = self.path.rsplit(':', 1)
+                upstream = socket.create_connection((host, int(port)))
+                self.send_response(200, 'Connection established')
+                self.end_headers()
+                self.wfile.flush()
+                sockets = [self.connection, upstream]
+                try:
+                    while True:
+                        readable, _, _ = select.select(sockets, [], [], 5)
+                        if not readable:
+                            break
+                        for sock in readable:
+                            data = sock.recv(65536)
+                            if not data:
+                                return
+                            other = upstream if sock is self.connection \
+                                else self.connection
+                            other.sendall(data)
+                finally:
+                    upstream.close()
+                    self.close_connection = True
+
+        self.httpd = _ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.thread = threading.Thread(target=self.httpd.serve_forever)
+        self.thread.daemon = True
+
+    @property
+    def url(self):
+        return 'http://127.0.0.1:%d' % self.httpd.server_address[1]
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.httpd.shutdown()
+        self.httpd.server_close()
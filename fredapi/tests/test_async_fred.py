@@ -0,0 +1,128 @@
+from __future__ import unicode_literals
+
+import asyncio
+import os
+import unittest
+import warnings
+from unittest import mock
+
+import fredapi
+from fredapi.metrics import RequestStats
+from fredapi.tests.fake_server import FakeFredServer
+from fredapi.tests.test_fred import (gdp_all_releases_call, payems_info_call,
+                                     search_call, sp500_obs_call)
+
+
+def route(call):
+    """Turn an HTTPCall fixture into a FakeFredServer route."""
+    path = call.url[len(fredapi.Fred.root_url) - len('/fred'):]
+    return path.split('&api_key=')[0], (200, call.response)
+
+
+class TestAsyncFred(unittest.TestCase):
+    """Run AsyncFred against a local stand-in server."""
+
+    def setUp(self):
+        self.server = FakeFredServer(dict(route(call) for call in [
+            sp500_obs_call, gdp_all_releases_call, payems_info_call,
+            search_call]))
+        self.server.routes['/fred/series?series_id=invalid'] = (
+            400, '<error code="400" message="Bad Request." />')
+        self.server.__enter__()
+
+    def tearDown(self):
+        self.server.__exit__()
+
+    def run_with_fred(self, func, **kwargs):
+        async def main():
+            async with fredapi.AsyncFred(api_key='secret', **kwargs) as fred:
+                fred.root_url = self.server.url + '/fred'
+                return await func(fred)
+        return asyncio.run(main())
+
+    def test_matches_sync_client(self):
+        """Results are identical to the ones returned by Fred."""
+        async def fetch(fred):
+            return await asyncio.gather(
+                fred.get_series('SP500', observation_start='9/2/2014',
+                                observation_end='9/5/2014'),
+                fred.get_series_info('PAYEMS'),
+                fred.get_series_all_releases('GDP'),
+                fred.search_by_release(175, limit=3, order_by='series_id',
+                                       sort_order='asc'))
+        serie, info, releases, search = self.run_with_fred(fetch)
+
+        fred = fredapi.Fred(api_key='secret')
+        fred.root_url = self.server.url + '/fred'
+        self.assertTrue(serie.equals(fred.get_series(
+            'SP500', observation_start='9/2/2014',
+            observation_end='9/5/2014')))
+        self.assertTrue(info.equals(fred.get_series_info('PAYEMS')))
+        self.assertTrue(releases.equals(fred.get_series_all_releases('GDP')))
+        self.assertTrue(search.equals(fred.search_by_release(
+            175, limit=3, order_by='series_id', sort_order='asc')))
+        fred.transport.close()
+
+    def test_concurrency_cap(self):
+        """Many requests share at most max_concurrency connections."""
+        async def fetch(fred):
+            return await fred.get_series_many(
+                ['SP500'] + ['SP500&n=%d' % i for i in range(9)],
+                errors={})
+        self.run_with_fred(fetch, max_concurrency=2)
+        self.assertEqual(len(self.server.requests), 10)
+        self.assertLessEqual(len(set(self.server.clients)), 2)
+
+    def test_error(self):
+        """Error responses raise ValueError with FRED's message."""
+        async def fetch(fred):
+            return await fred.get_series_info('invalid')
+        with self.assertRaises(ValueError) as context:
+            self.run_with_fred(fetch)
+        self.assertEqual(str(context.exception), 'Bad Request.')
+
+    def test_hooks(self):
+        """Every request is reported to the hooks."""
+        stats = RequestStats()
+
+        async def fetch(fred):
+            await fred.get_series_info('PAYEMS')
+            await fred.get_series_all_releases('GDP')
+        self.run_with_fred(fetch, hooks=[stats])
+        totals = stats.totals()
+        self.assertEqual(totals['requests'], 2)
+        self.assertGreater(totals['bytes'], 0)
+        self.assertEqual(sorted(stats.by_endpoint()),
+                         ['series', 'series/observations'])
+
+    def test_reuse_across_event_loops(self):
+        """An instance can be used from successive asyncio.run() calls."""
+        fred = fredapi.AsyncFred(api_key='secret', max_concurrency=2)
+        fred.root_url = self.server.url + '/fred'
+
+        async def fetch():
+            return await asyncio.gather(fred.get_series_info('PAYEMS'),
+                                        fred.get_series_all_releases('GDP'))
+        first = asyncio.run(fetch())
+        second = asyncio.run(fetch())
+        asyncio.run(fred.close())
+        self.assertEqual(len(self.server.requests), 4)
+        self.assertTrue(first[0].equals(second[0]))
+        self.assertTrue(first[1].equals(second[1]))
+
+    def test_proxy_warning(self):
+        """The default transport warns that it ignores proxies set in the environment."""
+        environ = dict((key, value) for key, value in os.environ.items()
+                       if not key.lower().endswith('_proxy'))
+        environ['https_proxy'] = 'http://proxy:3128'
+        with mock.patch.dict(os.environ, environ, clear=True):
+            with self.assertWarns(UserWarning):
+                fredapi.AsyncFred(api_key='secret')
+            os.environ['no_proxy'] = 'api.stlouisfed.org'
+            with warnings.catch_warnings():
+                warnings.simplefilter('error')
+                fredapi.AsyncFred(api_key='secret')
+
+
+if __name__ == '__main__':
+    unittest.main()
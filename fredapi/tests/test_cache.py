@@ -0,0 +1,123 @@
+from __future__ import unicode_literals
+
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+import fredapi
+from fredapi.cache import FileCache, MemoryCache, normalize_url
+from fredapi.tests.test_fred import payems_info_call, sp500_obs_call
+
+
+class FakeClock(object):
+
+    def __init__(self, now):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+class TestFileCache(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        # 2015-06-28, after PAYEMS was last updated on 2015-06-05
+        self.clock = FakeClock(1435500000.0)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_normalize_url(self):
+        """The api key and parameter order do not change the key."""
+        self.assertEqual(
+            normalize_url('https://x/fred/series?series_id=A&api_key=k&b=1'),
+            normalize_url('https://x/fred/series?b=1&series_id=A'))
+
+    @mock.patch('fredapi.transport.HTTPTransport.get')
+    def test_hit_and_expiry(self, http_get):
+        """Fresh responses are served from disk, expired ones refetched."""
+        http_get.return_value = sp500_obs_call.response.encode()
+        cache = FileCache(self.directory, clock=self.clock)
+        fred = fredapi.Fred(api_key='secret', cache=cache)
+        first = fred.get_series('SP500', observation_start='9/2/2014',
+                                observation_end='9/5/2014')
+        second = fredapi.Fred(api_key='other', cache=cache).get_series(
+            'SP500', observation_start='9/2/2014', observation_end='9/5/2014')
+        self.assertEqual(http_get.call_count, 1)
+        self.assertTrue(first.equals(second))
+
+        self.clock.now += cache.ttl['series/observations'] + 1
+        fred.get_series('SP500', observation_start='9/2/2014',
+                        observation_end='9/5/2014')
+        self.assertEqual(http_get.call_count, 2)
+
+    @mock.patch('fredapi.transport.HTTPTransport.get')
+    def test_revalidate(self, http_get):
+        """Expired observations are reused if the series was not updated."""
+        def fake_get(url):
+            if '/series/observations' in url:
+                return sp500_obs_call.response.encode()
+            return payems_info_call.response.encode()
+        http_get.side_effect = fake_get
+        cache = FileCache(self.directory, ttl=60, revalidate=True,
+                          clock=self.clock)
+        fred = fredapi.Fred(api_key='secret', cache=cache)
+        fred.get_series('PAYEMS')
+        self.clock.now += 120
+        fred.get_series('PAYEMS')
+        urls = [call[0][0] for call in http_get.call_args_list]
+        self.assertEqual(len(urls), 2)
+        self.assertIn('/series?series_id=PAYEMS', urls[1])
+        # revalidation marks the entry fresh again
+        fred.get_series('PAYEMS')
+        self.assertEqual(http_get.call_count, 2)
+
+    def test_lru_eviction(self):
+        """The least recently used entries go once max_size is exceeded."""
+        cache = FileCache(self.directory, max_size=2500, clock=self.clock)
+        for name in 'abc':
+            cache.set('https://x/fred/series?series_id=' + name, b'x' * 1000)
+            self.clock.now += 1
+        self.assertIsNone(cache.get('https://x/fred/series?series_id=a'))
+        self.assertIsNotNone(cache.get('https://x/fred/series?series_id=b'))
+        self.assertIsNotNone(cache.get('https://x/fred/series?series_id=c'))
+
+
+class TestMemoryCache(unittest.TestCase):
+
+    @mock.patch('fredapi.transport.HTTPTransport.get')
+    def test_memoized_series_info(self, http_get):
+        """Repeated metadata lookups are served from memory."""
+        http_get.return_value = payems_info_call.response
+        clock = FakeClock(0.0)
+        memo = MemoryCache(maxsize=10, ttl=60, clock=clock)
+        fred = fredapi.Fred(api_key='secret', metadata_cache=memo)
+        info = fred.get_series_info('PAYEMS')
+        info['title'] = 'changed by the caller'
+        self.assertEqual(fred.get_series_info('PAYEMS')['title'],
+                         'All Employees: Total Nonfarm Payrolls')
+        self.assertEqual(http_get.call_count, 1)
+        self.assertEqual(memo.stats(), {'hits': 1, 'misses': 1, 'size': 1})
+
+        fred.invalidate_metadata('PAYEMS')
+        fred.get_series_info('PAYEMS')
+        self.assertEqual(http_get.call_count, 2)
+        clock.now += 61
+        fred.get_series_info('PAYEMS')
+        self.assertEqual(http_get.call_count, 3)
+
+    def test_lru_eviction(self):
+        """The least recently used entries go once maxsize is exceeded."""
+        memo = MemoryCache(maxsize=2)
+        memo.set('a', 1)
+        memo.set('b', 2)
+        memo.lookup('a')
+        memo.set('c', 3)
+        self.assertEqual(memo.lookup('b'), (False, None))
+        self.assertEqual(memo.lookup('a'), (True, 1))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,161 @@
+from __future__ import unicode_literals
+
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+from unittest import mock
+from urllib.parse import parse_qsl
+
+import fredapi
+from fredapi.catalog import Catalog, CatalogCrawler
+
+children = {0: [1, 2], 1: [3], 2: [], 3: [1]}
+members = {('category', 1): ['S1', 'S2'], ('category', 3): ['S2', 'S3'],
+           ('release', 10): ['S1'], ('release', 11): ['S3', 'S4']}
+
+
+def series_page(series_ids):
+    series = ''.join('<series id="%s" title="Series %s" frequency_short="M" popularity="%d" />'
+                     % (series_id, series_id, i) for i, series_id in enumerate(series_ids))
+    return '<seriess count="%d" offset="0" limit="1000">%s</seriess>' % (len(series_ids), series)
+
+
+def fake_get(url, fail=()):
+    """Fake transport get serving a small category tree and two releases."""
+    path, query = url.split('/fred/')[1].split('?')
+    params = dict(parse_qsl(query))
+    if path == 'category/children':
+        category_id = int(params['category_id'])
+        if category_id in fail:
+            raise fredapi.fred.HTTPError(url, 400, '', '', None)
+        return '<categories>%s</categories>' % ''.join(
+            '<category id="%d" name="C%d" parent_id="%d" />' % (child, child, category_id)
+            for child in children[category_id])
+    if path == 'releases':
+        return ('<releases count="2" offset="0" limit="1000"><release id="10" name="R10" />'
+                '<release id="11" name="R11" /></releases>')
+    if path == 'category/series':
+        return series_page(members.get(('category', int(params['category_id'])), []))
+    return series_page(members.get(('release', int(params['release_id'])), []))
+
+
+class FakeTransport(object):
+    """Serve fake_get, keeping track of the most requests in flight at once."""
+
+    def __init__(self, fail=(), delay=0):
+        self.fail = fail
+        self.delay = delay
+        self.in_flight = self.max_in_flight = 0
+        self.lock = threading.Lock()
+
+    def get(self, url):
+        with self.lock:
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            time.sleep(self.delay)
+            return fake_get(url, self.fail)
+        finally:
+            with self.lock:
+                self.in_flight -= 1
+
+    def close(self):
+        pass
+
+
+class TestCatalogCrawler(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def crawler(self, **kwargs):
+        fred = fredapi.Fred(api_key='secret', transport=FakeTransport(**kwargs))
+        return CatalogCrawler(fred, self.directory, fields=['title', 'frequency_short', 'popularity'])
+
+    def test_crawl(self):
+        """Series are listed once with every category and release they belong to."""
+        catalog = self.crawler().crawl()
+        self.assertEqual(list(catalog.series.index), ['S1', 'S2', 'S3', 'S4'])
+        self.assertEqual(list(catalog.series['categories']), [(1,), (1, 3), (3,), ()])
+        self.assertEqual(list(catalog.series['releases']), [(10,), (), (11,), (11,)])
+        self.assertEqual(catalog.series['frequency_short'].dtype, 'category')
+        self.assertEqual(sorted(catalog.categories.index), [1, 2, 3])
+        self.assertEqual(list(catalog.releases['name']), ['R10', 'R11'])
+        self.assertEqual(list(catalog.series_in_category(1, recursive=True).index), ['S1', 'S2', 'S3'])
+        self.assertEqual(list(catalog.series_in_release(11).index), ['S3', 'S4'])
+
+        loaded = Catalog.load(self.crawler().path)
+        self.assertTrue(loaded.series.equals(catalog.series))
+
+    def test_bounded_concurrency(self):
+        """The pages of a node are requested one at a time, so max_workers bounds the requests in flight."""
+        fred = fredapi.Fred(api_key='secret', transport=FakeTransport(delay=0.01))
+        fred.max_results_per_request = 1
+        crawler = CatalogCrawler(fred, self.directory, fields=['title'], max_workers=2)
+        series_ids = ['S%d' % i for i in range(10)]
+        with mock.patch.dict(members, {('category', 1): series_ids, ('category', 3): series_ids}):
+            self.assertEqual(len(crawler.crawl()), 10)
+        self.assertEqual(fred.transport.max_in_flight, 2)
+
+    def test_resume(self):
+        """An interrupted crawl resumes from the nodes saved so far."""
+        with self.assertRaises(ValueError):
+            self.crawler(fail=(3,)).crawl()
+        crawler = self.crawler()
+        catalog = crawler.crawl()
+        self.assertEqual(len(catalog), 4)
+        self.assertGreater(crawler.resumed, 0)
+        self.assertEqual(crawler.requested + crawler.resumed, 6)
+
+        crawler = self.crawler()
+        crawler.crawl(resume=False)
+        self.assertEqual((crawler.requested, crawler.resumed), (6, 0))
+
+
+class TestCatalogSearch(unittest.TestCase):
+
+    def setUp(self):
+        series = fredapi.fred.pd.DataFrame({
+            'title': ['Real Gross Domestic Product', 'Gross Domestic Product', 'Real Potential Gross Domestic Product',
+                      'Unemployment Rate'],
+            'units': ['Billions of Chained 2009 Dollars', 'Billions of Dollars', 'Billions of Chained 2009 Dollars',
+                      'Percent'],
+            'frequency': ['Quarterly', 'Quarterly', 'Quarterly', 'Monthly'],
+            'seasonal_adjustment': ['Seasonally Adjusted Annual Rate', 'Seasonally Adjusted Annual Rate',
+                                    'Not Seasonally Adjusted', 'Seasonally Adjusted'],
+            'popularity': ['93', '95', '70', '94'],
+            'notes': ['Real GDP.', None, 'Potential GDP.', 'Civilian unemployment rate.']},
+            index=fredapi.fred.pd.Index(['GDPC1', 'GDP', 'GDPPOT', 'UNRATE'], name='series id'))
+        self.catalog = Catalog(series)
+
+    def test_search(self):
+        """Every word has to match, and matches are ranked."""
+        self.assertEqual(list(self.catalog.search('real gdp').index), ['GDPC1', 'GDPPOT'])
+        self.assertEqual(list(self.catalog.search('Gross Domestic Product').index)[-1], 'GDPPOT')
+        self.assertEqual(list(self.catalog.search('unrate').index), ['UNRATE'])
+        self.assertEqual(len(self.catalog.search('real inflation')), 0)
+        self.assertEqual(len(self.catalog.search('product', limit=2)), 2)
+
+    def test_search_options(self):
+        """order_by, sort_order and filter behave as in Fred.search()."""
+        self.assertEqual(list(self.catalog.search('product', order_by='popularity').index),
+                         ['GDP', 'GDPC1', 'GDPPOT'])
+        self.assertEqual(list(self.catalog.search('', order_by='series_id', sort_order='desc').index),
+                         ['UNRATE', 'GDPPOT', 'GDPC1', 'GDP'])
+        info = self.catalog.search('product', filter=('seasonal_adjustment', 'Not Seasonally Adjusted'))
+        self.assertEqual(list(info.index), ['GDPPOT'])
+        with self.assertRaises(ValueError):
+            self.catalog.search('product', order_by='bogus')
+        with self.assertRaises(ValueError):
+            self.catalog.search('product', filter=('title', 'GDP'))
+        with self.assertRaises(ValueError):
+            self.catalog.search('product', order_by='last_updated')
+
+
+if __name__ == '__main__':
+    unittest.main()
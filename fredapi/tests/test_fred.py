@@ -3,15 +3,22 @@ import sys
 if sys.version_info[0] >= 3:
     unicode = str
 
+import functools
 import io
+import json
+import subprocess
+import threading
+import time
 import unittest
 if sys.version_info < (3, 3):
     import mock  # pylint: disable=import-error
 else:
     from unittest import mock  # pylint: disable=import-error
 import textwrap
+import xml.etree.ElementTree as ET
 import fredapi
 import fredapi.fred
+import fredapi.transport
 
 
 # Change here if you want to make actual calls to Fred
@@ -64,6 +71,26 @@ sp500_obs_call = HTTPCall('series/observations?series_id=SP500&{}&{}'.
   <observation realtime_start="2015-06-28" realtime_end="2015-06-28"
                date="2014-09-05" value="2007.71"/>
 </observations>'''))
+gdp_all_releases_call = HTTPCall('series/observations?series_id=GDP&{}&{}'.
+                                 format('realtime_start=1776-07-04',
+                                        'realtime_end=9999-12-31'),
+                                 response=textwrap.dedent('''\
+<?xml version="1.0" encoding="utf-8" ?>
+<observations realtime_start="1776-07-04" realtime_end="9999-12-31"
+              observation_start="1600-01-01"
+              observation_end="9999-12-31" units="lin"
+              output_type="1" file_type="xml"
+              order_by="observation_date" sort_order="asc"
+              count="4" offset="0" limit="100000">
+  <observation realtime_start="2014-01-30" realtime_end="2014-02-27"
+               date="2013-10-01" value="17102.5"/>
+  <observation realtime_start="2014-02-28" realtime_end="2014-03-26"
+               date="2013-10-01" value="17080.7"/>
+  <observation realtime_start="2014-03-27" realtime_end="9999-12-31"
+               date="2013-10-01" value="17089.6"/>
+  <observation realtime_start="2014-04-30" realtime_end="9999-12-31"
+               date="2014-01-01" value="."/>
+</observations>'''))
 search_call = HTTPCall('release/series?release_id=175&' +
                        'order_by=series_id&sort_order=asc',
                        response=textwrap.dedent('''\
@@ -114,6 +141,46 @@ payems_info_call = HTTPCall('series?series_id=PAYEMS',
 </seriess>'''))
 
 
+# attributes FRED's JSON responses send as numbers rather than strings
+json_int_fields = ['count', 'offset', 'limit', 'popularity', 'group_popularity']
+
+
+def as_json(response, key):
+    """Convert an XML fixture to the equivalent FRED JSON response."""
+    def typed(attrib):
+        return dict((name, int(value) if name in json_int_fields else value)
+                    for name, value in attrib.items())
+    root = ET.fromstring(response)
+    data = typed(root.attrib)
+    data[key] = [typed(child.attrib) for child in root]
+    return json.dumps(data)
+
+
+def search_page(count, offset, size):
+    """Build a page of release/series search results."""
+    series = ''.join(
+        '<series id="S%05d" realtime_start="2015-07-19" '
+        'realtime_end="2015-07-19" title="t" observation_start="1969-01-01" '
+        'observation_end="2013-01-01" frequency="Annual" frequency_short="A" '
+        'units="Dollars" units_short="$" '
+        'seasonal_adjustment="Not Seasonally Adjusted" '
+        'seasonal_adjustment_short="NSA" '
+        'last_updated="2015-01-29 12:10:21-06" popularity="0" notes="..." />'
+        % i for i in range(offset, min(offset + size, count)))
+    return ('<seriess count="%d" offset="%d" limit="%d">%s</seriess>'
+            % (count, offset, size, series))
+
+
+def paged_search_response(count, size):
+    """Fake transport get returning the page matching the URL offset."""
+    def fake_get(url):
+        offset = 0
+        if '&offset=' in url:
+            offset = int(url.split('&offset=')[1].split('&')[0])
+        return search_page(count, offset, size)
+    return fake_get
+
+
 class TestFred(unittest.TestCase):
 
     """Test fredapi.Fred class.
@@ -140,23 +207,24 @@ class TestFred(unittest.TestCase):
         """
         self.fred = fredapi.Fred(api_key=fred_api_key, proxies=None)
         self.fake_fred_call = fake_fred_call
-        self.__original_urlopen = fredapi.fred.urlopen
+        self.__original_get = fredapi.transport.HTTPTransport.get
 
     def tearDown(self):
         """Cleanup."""
         pass
 
     def prepare_urlopen(self, urlopen, http_response=None, side_effect=None):
-        """Set urlopen to return http_response or the regular call."""
+        """Set the transport to return http_response or the regular call."""
         if self.fake_fred_call:
             if http_response:
-                urlopen.return_value.read.return_value = http_response
+                urlopen.return_value = http_response
             elif side_effect:
-                urlopen.return_value.read.side_effect = side_effect
+                urlopen.side_effect = side_effect
         else:
-            urlopen.side_effect = self.__original_urlopen
+            urlopen.side_effect = functools.partial(self.__original_get,
+                                                    self.fred.transport)
 
-    @mock.patch('fredapi.fred.urlopen')
+    @mock.patch('fredapi.transport.HTTPTransport.get')
     def test_get_series(self, urlopen):
         """Test retrieval of series for SP500."""
         self.prepare_urlopen(urlopen,
@@ -167,7 +235,322 @@ class TestFred(unittest.TestCase):
         self.assertEqual(serie.loc['9/2/2014'], 2002.28)
         self.assertEqual(len(serie), 4)
 
-    @mock.patch('fredapi.fred.urlopen')
+    @mock.patch('fredapi.transport.HTTPTransport.get')
+    def test_get_series_all_releases(self, urlopen):
+        """Test typed columns returned by get_series_all_releases."""
+        self.prepare_urlopen(urlopen,
+                             http_response=gdp_all_releases_call.response)
+        df = self.fred.get_series_all_releases('GDP')
+        urlopen.assert_called_with(gdp_all_releases_call.url)
+        self.assertEqual(list(df.columns),
+                         ['realtime_start', 'date', 'value'])
+        self.assertEqual(df['value'].dtype.kind, 'f')
+        self.assertEqual(df['date'].dtype.kind, 'M')
+        self.assertEqual(df['realtime_start'].dtype.kind, 'M')
+        self.assertEqual(df['value'].iloc[1], 17080.7)
+        self.assertTrue(df['value'].isnull().iloc[3])
+
+    @mock.patch('fredapi.transport.HTTPTransport.get')
+    def test_point_in_time_queries(self, urlopen):
+        """Test that vintage constraints are sent to Fred."""
+        self.prepare_urlopen(urlopen,
+                             http_response=gdp_all_releases_call.response)
+        df = self.fred.get_series_as_of_date('GDP', '3/1/2014')
+        self.assertIn('realtime_end=2014-03-01', urlopen.call_args[0][0])
+        self.assertEqual(list(df['value']), [17080.7])
+        self.assertEqual(list(df.columns), ['realtime_start', 'date', 'value'])
+
+        # an observation dropped before the as of date is left out, as in
+        # get_series_as_of_panel()
+        urlopen.return_value = gdp_all_releases_call.response.replace(
+            '  <observation',
+            '  <observation realtime_start="2014-02-20" '
+            'realtime_end="2014-02-25" date="2013-07-01" value="16912.9"/>\n'
+            '  <observation', 1)
+        df = self.fred.get_series_as_of_date('GDP', '3/1/2014')
+        self.assertEqual(list(df['value']), [17080.7])
+        panel = self.fred.get_series_as_of_panel(['GDP'], ['3/1/2014'])
+        self.assertEqual(list(panel['GDP']), [17080.7])
+
+        self.prepare_urlopen(urlopen,
+                             http_response=gdp_all_releases_call.response)
+        first = self.fred.get_series_first_release('GDP')
+        self.assertIn('&output_type=4', urlopen.call_args[0][0])
+        self.assertEqual(first.loc['10/1/2013'], 17102.5)
+        self.assertEqual(len(first), 2)
+
+    @mock.patch('fredapi.transport.HTTPTransport.get')
+    def test_get_series_as_of_panel(self, urlopen):
+        """Test snapshots of several series at several dates."""
+        self.prepare_urlopen(urlopen,
+                             http_response=gdp_all_releases_call.response)
+        as_of_dates = ['2014-05-01', '2014-02-01', '2014-03-01']
+        panel = self.fred.get_series_as_of_panel(['GDP', 'GDPC1'],
+                                                 as_of_dates)
+        self.assertEqual(urlopen.call_count, 2)
+        self.assertIn('realtime_end=2014-05-01', urlopen.call_args[0][0])
+        self.assertEqual(list(panel.columns), ['GDP', 'GDPC1'])
+        self.assertEqual(list(panel.index.names), ['as_of', 'date'])
+        self.assertEqual(len(panel), 4)
+        for as_of_date in as_of_dates:
+            expected = self.fred.get_series_as_of_date('GDP', as_of_date)
+            snapshot = panel.loc[as_of_date, 'GDPC1']
+            self.assertEqual(list(snapshot.index), list(expected['date']))
+            self.assertEqual(list(snapshot.fillna(0)),
+                             list(expected['value'].fillna(0)))
+        with self.assertRaises(ValueError) as context:
+            self.fred.get_series_as_of_panel(['GDP'], [])
+        self.assertEqual(str(context.exception), 'as_of_dates is empty')
+
+    @mock.patch('fredapi.transport.HTTPTransport.get')
+    def test_get_series_many(self, urlopen):
+        """Test fetching several series concurrently."""
+        def fake_get(url):
+            if 'series_id=invalid' in url:
+                raise fredapi.fred.HTTPError(url, 400, '', '', io.BytesIO(
+                    b'<error code="400" message="Bad Request." />'))
+            return sp500_obs_call.response
+        urlopen.side_effect = fake_get
+
+        errors = {}
+        df = self.fred.get_series_many(['SP500', 'invalid', 'DGS10'],
+                                       errors=errors, max_workers=3)
+        self.assertEqual(list(df.columns), ['SP500', 'DGS10'])
+        self.assertEqual(list(errors), ['invalid'])
+        self.assertEqual(df['SP500'].loc['9/2/2014'], 2002.28)
+        self.assertEqual(len(df), 4)
+        self.assertEqual(urlopen.call_count, 3)
+
+        data = self.fred.get_series_many(['SP500'], as_frame=False)
+        self.assertEqual(list(data), ['SP500'])
+        with self.assertRaises(ValueError):
+            self.fred.get_series_many(['SP500', 'invalid'])
+
+    @mock.patch('fredapi.transport.HTTPTransport.get')
+    def test_coalesce(self, urlopen):
+        """Test that concurrent identical calls share one request."""
+        flights = self.fred._single_flight._flights
+
+        def fake_get(url):
+            # hold the request until the other three callers wait on it
+            deadline = time.monotonic() + 5
+            for flight in list(flights.values()):
+                while flight.waiters < 3 and time.monotonic() < deadline:
+                    time.sleep(0.001)
+            return sp500_obs_call.response
+        urlopen.side_effect = fake_get
+
+        def together(func):
+            results = []
+            threads = [threading.Thread(target=lambda: results.append(func()))
+                       for _ in range(4)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            return results
+
+        results = together(lambda: self.fred.get_series('SP500'))
+        self.assertEqual(urlopen.call_count, 1)
+        self.assertEqual(len(results), 4)
+        self.assertTrue(all(result.equals(results[0]) for result in results))
+        # every caller gets its own copy
+        results[0].iloc[0] = 0.0
+        self.assertEqual(results[1].iloc[0], 2002.28)
+
+        results = together(lambda: self.fred.get_series_columns('SP500'))
+        self.assertEqual(urlopen.call_count, 2)
+        self.assertEqual(len(set(id(result['value']) for result in results)),
+                         4)
+
+        fred = fredapi.Fred(api_key=fred_api_key, coalesce=False)
+        fred.get_series('SP500')
+        fred.get_series('SP500')
+        self.assertEqual(urlopen.call_count, 4)
+
+    def test_core_without_pandas(self):
+        """Test that importing fredapi and the plain column API never import pandas."""
+        script = textwrap.dedent('''\
+            import sys
+            sys.modules['pandas'] = sys.modules['numpy'] = None
+
+            class Transport(object):
+                def get(self, url):
+                    if 'observations' in url:
+                        return ('<observations><observation date="2014-07-01" value="1973.28" />'
+                                '<observation date="2014-07-02" value="." /></observations>')
+                    if 'vintagedates' in url:
+                        return '<vintage_dates count="1"><vintage_date>2014-07-01</vintage_date></vintage_dates>'
+                    return '<seriess><series id="SP500" title="S&amp;P 500" /></seriess>'
+
+                def close(self):
+                    pass
+
+            import fredapi
+            fred = fredapi.Fred(api_key='secret', transport=Transport())
+            columns = fred.get_series_columns('SP500', observation_start='2014-07-01')
+            assert [str(date) for date in columns['date']] == ['2014-07-01', '2014-07-02'], columns
+            assert columns['value'][0] == 1973.28 and columns['value'][1] != columns['value'][1], columns
+            assert fred.get_series_info('SP500', as_dict=True) == {'id': 'SP500', 'title': 'S&P 500'}
+            assert len(fred.get_series_vintage_dates('SP500')) == 1
+        ''')
+        result = subprocess.run([sys.executable, '-c', script], capture_output=True, text=True)
+        self.assertEqual(result.returncode, 0, result.stderr)
+
+    @mock.patch('fredapi.transport.HTTPTransport.get')
+    def test_get_panel(self, urlopen):
+        """Test that frequency conversion is pushed to FRED and aligned."""
+        def fake_get(url):
+            if 'series_id=invalid' in url:
+                raise fredapi.fred.HTTPError(url, 400, '', '', io.BytesIO(
+                    b'<error code="400" message="Bad Request." />'))
+            if 'series_id=DGS10' in url:
+                return sp500_obs_call.response.replace('2014-09-02', '2014-09-01')
+            return sp500_obs_call.response
+        urlopen.side_effect = fake_get
+
+        errors = {}
+        df = self.fred.get_panel(['SP500', 'DGS10', 'invalid'], 'm',
+                                 aggregation_method={'SP500': 'eop'},
+                                 units='pch', errors=errors)
+        urls = sorted(call[0][0] for call in urlopen.call_args_list)
+        self.assertIn('frequency=m&aggregation_method=avg&units=pch', urls[0])
+        self.assertIn('frequency=m&aggregation_method=eop&units=pch', urls[1])
+        self.assertEqual(list(errors), ['invalid'])
+        self.assertEqual(list(df.columns), ['SP500', 'DGS10'])
+        self.assertEqual(df.index.name, 'date')
+        self.assertEqual(len(df), 5)
+        self.assertEqual(df['DGS10'].loc['9/1/2014'], 2002.28)
+        self.assertTrue(fredapi.fred.np.isnan(df['SP500'].loc['9/1/2014']))
+        with self.assertRaises(ValueError):
+            self.fred.get_panel(['SP500'], 'monthly')
+        with self.assertRaises(ValueError):
+            self.fred.get_panel(['SP500'], 'm', aggregation_method='max')
+
+    @mock.patch('fredapi.transport.HTTPTransport.get')
+    def test_update_series(self, urlopen):
+        """Test incremental refresh of a stored series."""
+        self.prepare_urlopen(urlopen, http_response=sp500_obs_call.response)
+        stored = fredapi.fred.pd.Series(
+            [1990.0, 1999.0],
+            index=fredapi.fred.pd.to_datetime(['2014-09-01', '2014-09-03']))
+        serie = self.fred.update_series('SP500', stored, revision_window='1D')
+        url = urlopen.call_args[0][0]
+        self.assertIn('observation_start=2014-09-02', url)
+        self.assertEqual(len(serie), 5)
+        self.assertEqual(serie.loc['9/1/2014'], 1990.0)
+        # the stored value inside the revision window is replaced
+        self.assertEqual(serie.loc['9/3/2014'], 2000.72)
+        self.assertTrue(serie.index.is_monotonic_increasing)
+
+    @mock.patch('fredapi.transport.HTTPTransport.get')
+    def test_search_pagination(self, urlopen):
+        """Test that all pages of a large search are fetched."""
+        self.fred.max_results_per_request = 10
+        urlopen.side_effect = paged_search_response(25, 10)
+        info = self.fred.search_by_release(175)
+        self.assertEqual(len(info), 25)
+        self.assertEqual(list(info.index[[0, 10, 24]]),
+                         ['S00000', 'S00010', 'S00024'])
+        self.assertEqual(urlopen.call_count, 3)
+
+        urlopen.reset_mock()
+        info = self.fred.search_by_release(175, limit=15)
+        self.assertEqual(len(info), 15)
+        self.assertEqual(urlopen.call_count, 2)
+
+        urlopen.reset_mock()
+        pages = list(self.fred.iter_search_by_release(175))
+        self.assertEqual([len(page) for page in pages], [10, 10, 5])
+        self.assertEqual(urlopen.call_count, 3)
+
+        # pages are fetched at most max_workers ahead of the caller
+        urlopen.reset_mock()
+        urlopen.side_effect = paged_search_response(300, 10)
+        self.fred.max_workers = 2
+        pages = self.fred.iter_search_by_release(175)
+        first, second = next(pages), next(pages)
+        time.sleep(0.1)
+        self.assertLessEqual(urlopen.call_count, 4)
+        offsets = [page.index[0] for page in [first, second] + list(pages)]
+        self.assertEqual(offsets, ['S%05d' % i for i in range(0, 300, 10)])
+        self.assertEqual(urlopen.call_count, 30)
+
+    def test_stream_reads_batches_in_full(self):
+        """Test that pages requested in a batch are not left open as streams."""
+        fake_get = paged_search_response(25, 10)
+        transport = mock.Mock()
+        transport.get.side_effect = lambda url: fake_get(url).encode()
+        transport.open.side_effect = lambda url: io.BytesIO(fake_get(url).encode())
+        fred = fredapi.Fred(api_key=fred_api_key, transport=transport,
+                            stream=True)
+        fred.max_results_per_request = 10
+        self.assertEqual(len(fred.search_by_release(175)), 25)
+        self.assertEqual(transport.open.call_count, 1)
+        self.assertEqual(transport.get.call_count, 2)
+
+    @mock.patch('fredapi.transport.HTTPTransport.get')
+    def test_search_fields(self, urlopen):
+        """Test that only the selected search fields are kept, typed."""
+        self.fred.max_results_per_request = 10
+        urlopen.side_effect = paged_search_response(25, 10)
+        fields = ['observation_start', 'last_updated', 'popularity',
+                  'frequency_short']
+        info = self.fred.search_by_release(175, fields=fields)
+        self.assertEqual(list(info.columns), fields)
+        self.assertEqual(len(info), 25)
+        self.assertEqual(info.index.name, 'series id')
+        self.assertEqual(info['observation_start'].iloc[0],
+                         fredapi.fred.pd.Timestamp('1969-01-01'))
+        self.assertEqual(info['last_updated'].iloc[24],
+                         fredapi.fred.pd.Timestamp('2015-01-29 18:10:21',
+                                                   tz='UTC'))
+        self.assertEqual(info['popularity'].dtype, 'int64')
+        self.assertEqual(info['frequency_short'].dtype, 'category')
+        pages = list(self.fred.iter_search_by_release(175, fields=['title']))
+        self.assertEqual([list(page.columns) for page in pages],
+                         [['title']] * 3)
+        with self.assertRaises(ValueError):
+            self.fred.search_by_release(175, fields=['bogus'])
+
+    @mock.patch('fredapi.transport.HTTPTransport.get')
+    def test_iter_series_all_releases(self, urlopen):
+        """Test streaming the revision history in chunks."""
+        self.prepare_urlopen(urlopen,
+                             http_response=gdp_all_releases_call.response)
+        chunks = list(self.fred.iter_series_all_releases('GDP',
+                                                         chunksize=100))
+        self.assertEqual(len(chunks), 1)
+        self.assertTrue(chunks[0].equals(
+            self.fred.get_series_all_releases('GDP')))
+        self.assertIn('&limit=100&offset=0', urlopen.call_args_list[0][0][0])
+
+    @mock.patch('fredapi.transport.HTTPTransport.get')
+    def test_json_file_type(self, urlopen):
+        """Test that JSON responses give the same results as XML ones."""
+        fred_json = fredapi.Fred(api_key=fred_api_key, file_type='json')
+        for call, key, method, args in [
+                (gdp_all_releases_call, 'observations',
+                 'get_series_all_releases', ('GDP',)),
+                (sp500_obs_call, 'observations', 'get_series', ('SP500',)),
+                (payems_info_call, 'seriess', 'get_series_info', ('PAYEMS',)),
+                (search_call, 'seriess', 'search_by_release', (175, 3))]:
+            urlopen.return_value = call.response
+            expected = getattr(self.fred, method)(*args)
+            urlopen.return_value = as_json(call.response, key)
+            actual = getattr(fred_json, method)(*args)
+            self.assertIn('&file_type=json&api_key=', urlopen.call_args[0][0])
+            self.assertTrue(actual.equals(expected), method)
+
+        urlopen.side_effect = fredapi.fred.HTTPError(
+            '', 400, '', '', io.BytesIO(json.dumps(
+                {'error_code': 400,
+                 'error_message': 'Bad Request.'}).encode()))
+        with self.assertRaises(ValueError) as context:
+            fred_json.get_series_info('invalid')
+        self.assertEqual(unicode(context.exception), 'Bad Request.')
+
+    @mock.patch('fredapi.transport.HTTPTransport.get')
     def test_get_series_info_payem(self, urlopen):
         """Test retrieval of get_series_info for PAYEMS."""
         url = payems_info_call.url
@@ -179,7 +562,7 @@ class TestFred(unittest.TestCase):
         self.assertEqual(info['frequency'], 'Monthly')
         self.assertEqual(info['frequency_short'], 'M')
 
-    @mock.patch('fredapi.fred.urlopen')
+    @mock.patch('fredapi.transport.HTTPTransport.get')
     def test_invalid_id_in_get_series(self, urlopen):
         """Test invalid series id in get_series."""
         url = ('{}/series/observations?series_id=invalid&api_key={}'.
@@ -197,7 +580,7 @@ class TestFred(unittest.TestCase):
             self.fred.get_series('invalid')
         urlopen.assert_called_with(url)
 
-    @mock.patch('fredapi.fred.urlopen')
+    @mock.patch('fredapi.transport.HTTPTransport.get')
     def test_invalid_id_in_get_series_info(self, urlopen):
         """Test invalid series id in get_series_info."""
         url = '{}/series?series_id=invalid&api_key={}'.format(self.root_url,
@@ -216,20 +599,20 @@ class TestFred(unittest.TestCase):
         self.assertEqual(unicode(context.exception), error_msg)
         urlopen.assert_called_with(url)
 
-    @mock.patch('fredapi.fred.urlopen')
+    @mock.patch('fredapi.transport.HTTPTransport.get')
     def test_invalid_kwarg_in_get_series(self, urlopen):
         """Test invalid keyword argument in call to get_series."""
         url = '{}/series?series_id=invalid&api_key={}'.format(self.root_url,
                                                               fred_api_key)
-        side_effect = fredapi.fred.HTTPError(url, 400, '', '', sys.stderr)
+        side_effect = fredapi.fred.HTTPError(url, 400, '', '', io.StringIO())
         self.prepare_urlopen(urlopen, side_effect=side_effect)
-        with self.assertRaises(ValueError) as context:
+        with self.assertRaises(ValueError):
             self.fred.get_series('SP500',
                                  observation_start='invalid-datetime-str')
         self.assertFalse(urlopen.called)
 
     @unittest.skip('Not sure why this crashes in some environments, skipping')
-    @mock.patch('fredapi.fred.urlopen')
+    @mock.patch('fredapi.transport.HTTPTransport.get')
     def test_search(self, urlopen):
         """Simple test to check retrieval of series info."""
         self.prepare_urlopen(urlopen, http_response=search_call.response)
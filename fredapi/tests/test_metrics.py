@@ -0,0 +1,86 @@
+from __future__ import unicode_literals
+
+import io
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+import fredapi
+from fredapi.cache import FileCache
+from fredapi.metrics import RequestStats, redact_url
+from fredapi.tests.fake_server import FakeFredServer
+from fredapi.tests.test_fred import paged_search_response, sp500_obs_call
+from fredapi.tests.test_transport import observations
+from fredapi.transport import HTTPTransport
+
+
+class TestRequestEvents(unittest.TestCase):
+
+    def setUp(self):
+        self.events = []
+        self.stats = RequestStats()
+        self.fred = fredapi.Fred(api_key='secret', hooks=[self.events.append, self.stats])
+
+    def test_redact_url(self):
+        """The api key is masked and the other parameters kept in order."""
+        self.assertEqual(redact_url('https://x/fred/series?series_id=A&api_key=secret&b=1'),
+                         'https://x/fred/series?series_id=A&api_key=***&b=1')
+
+    @mock.patch('fredapi.transport.HTTPTransport.get')
+    def test_events(self, http_get):
+        """Every request is reported once with its measurements."""
+        http_get.return_value = sp500_obs_call.response
+        self.fred.get_series('SP500')
+        event, = self.events
+        self.assertNotIn('secret', event.url)
+        self.assertEqual(event.endpoint, 'series/observations')
+        self.assertEqual(event.bytes, len(sp500_obs_call.response))
+        self.assertGreater(event.parse_time, 0)
+        self.assertGreater(event.frame_time, 0)
+        self.assertFalse(event.cache_hit)
+        self.assertIsNone(event.error)
+
+        self.fred.max_results_per_request = 10
+        http_get.side_effect = paged_search_response(25, 10)
+        self.assertEqual(len(self.fred.search_by_release(175)), 25)
+        self.assertEqual(sum(len(page) for page in self.fred.iter_search_by_release(175)), 25)
+        self.assertEqual(len(self.events), 7)
+        self.assertEqual(self.stats.by_endpoint()['release/series']['requests'], 6)
+
+        http_get.side_effect = fredapi.fred.HTTPError(
+            'url', 400, '', '', io.BytesIO(b'<error message="Bad Request." />'))
+        with self.assertRaises(ValueError):
+            self.fred.get_series('invalid')
+        self.assertIsInstance(self.events[-1].error, ValueError)
+        totals = self.stats.totals()
+        self.assertEqual((totals['requests'], totals['errors']), (8, 1))
+
+    @mock.patch('fredapi.transport.HTTPTransport.get')
+    def test_cache_hits(self, http_get):
+        """Responses served from the cache are reported as cache hits."""
+        directory = tempfile.mkdtemp()
+        try:
+            fred = fredapi.Fred(api_key='secret', cache=FileCache(directory), hooks=[self.stats])
+            http_get.return_value = sp500_obs_call.response.encode('utf-8')
+            fred.get_series('SP500')
+            fred.get_series('SP500')
+        finally:
+            shutil.rmtree(directory)
+        totals = self.stats.totals()
+        self.assertEqual((totals['requests'], totals['cache_hits']), (2, 1))
+        self.assertEqual(http_get.call_count, 1)
+
+    def test_streamed_bytes(self):
+        """The size of streamed responses is counted as they are read."""
+        with FakeFredServer({'/fred/series/observations?series_id=SP500': (200, observations)}) as server:
+            transport = HTTPTransport()
+            fred = fredapi.Fred(api_key='secret', transport=transport, stream=True, hooks=[self.events.append])
+            fred.root_url = server.url + '/fred'
+            fred.get_series('SP500')
+            transport.close()
+        self.assertEqual(self.events[0].bytes, len(observations))
+
+
+if __name__ == '__main__':
+    unittest.main()
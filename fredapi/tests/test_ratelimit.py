@@ -0,0 +1,111 @@
+import io
+import unittest
+from email.message import Message
+from unittest import mock
+
+import fredapi
+from fredapi.fred import HTTPError
+from fredapi.ratelimit import AdaptiveRateLimiter, RateLimiter, Retry
+from fredapi.tests.test_fred import sp500_obs_call
+
+
+class FakeClock(object):
+    """Clock whose sleep advances time instead of blocking."""
+
+    def __init__(self):
+        self.now = 0.0
+        self.slept = []
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.slept.append(seconds)
+        self.now += seconds
+
+
+class TestRateLimiter(unittest.TestCase):
+
+    def test_burst_then_throttle(self):
+        """Requests beyond the burst wait for the bucket to refill."""
+        clock = FakeClock()
+        limiter = RateLimiter(rate=2, period=1.0, burst=2,
+                              clock=clock, sleep=clock.sleep)
+        self.assertEqual(limiter.acquire(), 0)
+        self.assertEqual(limiter.acquire(), 0)
+        self.assertAlmostEqual(limiter.acquire(), 0.5)
+        self.assertAlmostEqual(limiter.acquire(), 0.5)
+        clock.now += 10
+        self.assertEqual(limiter.acquire(), 0)
+        self.assertEqual(len(clock.slept), 2)
+
+    def test_pause(self):
+        """A pause holds back the next request even with tokens left."""
+        clock = FakeClock()
+        limiter = RateLimiter(rate=2, period=1.0, burst=2,
+                              clock=clock, sleep=clock.sleep)
+        limiter.throttled(retry_after=3)
+        self.assertAlmostEqual(limiter.acquire(), 3)
+        self.assertAlmostEqual(limiter.acquire(), 0.5)
+
+    def test_adaptive_rate(self):
+        """The rate is halved when throttled and recovers on success."""
+        clock = FakeClock()
+        limiter = AdaptiveRateLimiter(rate=120, period=60.0, min_rate=30,
+                                      increase=0.25, clock=clock,
+                                      sleep=clock.sleep)
+        limiter.throttled()
+        self.assertAlmostEqual(limiter.rate, 1.0)
+        limiter.throttled()
+        limiter.throttled()
+        self.assertAlmostEqual(limiter.rate, 0.5)
+        for _ in range(10):
+            limiter.succeeded()
+        self.assertAlmostEqual(limiter.rate, 2.0)
+
+
+def http_error(code, retry_after=None):
+    headers = Message()
+    if retry_after is not None:
+        headers['Retry-After'] = retry_after
+    return HTTPError('url', code, 'error', headers, io.BytesIO(
+        b'<error code="%d" message="Error %d." />' % (code, code)))
+
+
+class TestRetry(unittest.TestCase):
+
+    def test_backoff(self):
+        """Backoff grows exponentially up to the cap and honors Retry-After."""
+        retry = Retry(total=10, backoff_factor=0.5, max_backoff=4,
+                      random=lambda: 1.0)
+        self.assertEqual([retry.backoff(n) for n in range(5)],
+                         [0.5, 1.0, 2.0, 4, 4])
+        self.assertEqual(retry.backoff(0, http_error(429, '7')), 7.0)
+        self.assertTrue(retry.is_retryable(http_error(503), 9))
+        self.assertFalse(retry.is_retryable(http_error(503), 10))
+        self.assertFalse(retry.is_retryable(http_error(400), 0))
+        self.assertTrue(retry.is_retryable(ConnectionResetError(), 0))
+
+    @mock.patch('fredapi.transport.HTTPTransport.get')
+    def test_fred_retries(self, http_get):
+        """Fred retries transient errors and pauses its rate limiter."""
+        clock = FakeClock()
+        limiter = RateLimiter(clock=clock, sleep=clock.sleep)
+        retry = Retry(random=lambda: 1.0, sleep=clock.sleep)
+        fred = fredapi.Fred(api_key='secret', rate_limiter=limiter,
+                            retry=retry)
+        http_get.side_effect = [http_error(429, '5'), http_error(502),
+                                sp500_obs_call.response]
+        self.assertEqual(len(fred.get_series('SP500')), 4)
+        self.assertEqual(http_get.call_count, 3)
+        # the Retry-After wait, which also covers the limiter pause, then backoff
+        self.assertEqual(clock.slept, [5.0, 1.0])
+
+        http_get.side_effect = [http_error(400)]
+        with self.assertRaises(ValueError) as context:
+            fred.get_series('SP500')
+        self.assertEqual(str(context.exception), 'Error 400.')
+
+
+if __name__ == '__main__':
+    unittest.main()
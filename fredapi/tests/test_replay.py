@@ -0,0 +1,63 @@
+from __future__ import unicode_literals
+
+import asyncio
+import os
+import shutil
+import tempfile
+import unittest
+
+import fredapi
+from fredapi.replay import AsyncReplayTransport, RecordingTransport, ReplayTransport
+from fredapi.tests.fake_server import FakeFredServer
+from fredapi.tests.test_async_fred import route
+from fredapi.tests.test_fred import gdp_all_releases_call, payems_info_call, sp500_obs_call
+
+
+class TestReplay(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'responses.zip')
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def record(self):
+        routes = dict(route(call) for call in [sp500_obs_call, gdp_all_releases_call, payems_info_call])
+        routes['/fred/series?series_id=invalid'] = (400, '<error code="400" message="Bad Request." />')
+        with FakeFredServer(routes) as server:
+            fred = fredapi.Fred(api_key='recording', transport=RecordingTransport(self.path))
+            fred.root_url = server.url + '/fred'
+            results = (fred.get_series('SP500', '9/2/2014', '9/5/2014'), fred.get_series_info('PAYEMS'),
+                       fred.get_series_all_releases('GDP'))
+            with self.assertRaises(ValueError):
+                fred.get_series_info('invalid')
+            fred.transport.close()
+            return server.url, results
+
+    def test_record_and_replay(self):
+        """Recorded responses are replayed for any api key without network access."""
+        url, (serie, info, releases) = self.record()
+        for stream in [False, True]:
+            fred = fredapi.Fred(api_key='replay', transport=ReplayTransport(self.path), stream=stream)
+            fred.root_url = url + '/fred'
+            self.assertTrue(serie.equals(fred.get_series('SP500', '9/2/2014', '9/5/2014')))
+            self.assertTrue(info.equals(fred.get_series_info('PAYEMS')))
+            self.assertTrue(releases.equals(fred.get_series_all_releases('GDP')))
+            with self.assertRaises(ValueError) as context:
+                fred.get_series_info('invalid')
+            self.assertEqual(str(context.exception), 'Bad Request.')
+            with self.assertRaises(ValueError) as context:
+                fred.get_series('GDP')
+            self.assertIn('No recorded response', str(context.exception))
+            fred.transport.close()
+
+        async def fetch():
+            async with fredapi.AsyncFred(api_key='replay', transport=AsyncReplayTransport(self.path)) as fred:
+                fred.root_url = url + '/fred'
+                return await fred.get_series('SP500', '9/2/2014', '9/5/2014')
+        self.assertTrue(serie.equals(asyncio.run(fetch())))
+
+
+if __name__ == '__main__':
+    unittest.main()
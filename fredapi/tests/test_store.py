@@ -0,0 +1,90 @@
+from __future__ import unicode_literals
+
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+import pandas as pd
+
+import fredapi
+from fredapi.tests.test_fred import payems_info_call, search_call, sp500_obs_call
+
+try:
+    import pyarrow
+except ImportError:
+    pyarrow = None
+
+if pyarrow is not None:
+    from fredapi.store import SeriesStore
+
+
+@unittest.skipIf(pyarrow is None, 'pyarrow is not installed')
+class TestSeriesStore(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.fred = fredapi.Fred(api_key='secret')
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    @mock.patch('fredapi.transport.HTTPTransport.get')
+    def test_series_round_trip(self, http_get):
+        """Series are stored per file and loaded with date pruning."""
+        http_get.return_value = sp500_obs_call.response
+        serie = self.fred.get_series('SP500')
+        for format in ['parquet', 'feather']:
+            store = SeriesStore(self.directory, format=format)
+            store.write_series('SP500', serie)
+            store.write_series('DGS10', serie * 2)
+            self.assertEqual(store.series_ids(), ['DGS10', 'SP500'])
+            self.assertTrue(store.read_series('SP500').equals(serie))
+            self.assertEqual(list(store.read_series('SP500', start='9/3/2014', end='9/4/2014')),
+                             [2000.72, 1997.65])
+            panel = store.read_panel(start='9/5/2014')
+            self.assertEqual(list(panel.columns), ['DGS10', 'SP500'])
+            self.assertEqual(panel.loc['9/5/2014', 'DGS10'], 2 * 2007.71)
+        with self.assertRaises(ValueError):
+            store.read_series('GDP')
+        with self.assertRaises(ValueError):
+            store.write_series('../GDP', serie)
+
+    def test_date_pruning(self):
+        """Date ranges are pushed down to the Parquet reader, which skips row groups."""
+        store = SeriesStore(self.directory)
+        store.row_group_size = 10
+        serie = pd.Series(range(100), index=pd.date_range('2014-01-01', periods=100), dtype='float64')
+        store.write_series('X', serie)
+        self.assertEqual(pyarrow.parquet.ParquetFile(store._path('X')).num_row_groups, 10)
+        with mock.patch('pyarrow.parquet.read_table', wraps=pyarrow.parquet.read_table) as read_table:
+            data = store.read_series('X', start='2014-02-05', end='2014-02-10')
+        self.assertIsNotNone(read_table.call_args[1]['filters'])
+        self.assertTrue(data.equals(serie['2014-02-05':'2014-02-10']))
+
+    def test_append(self):
+        """Appended observations replace the stored ones on the same dates."""
+        store = SeriesStore(self.directory)
+        store.write_series('X', pd.Series([1.0, 2.0], index=pd.to_datetime(['2014-01-01', '2014-02-01'])))
+        data = store.append_series('X', pd.Series([2.5, 3.0], index=pd.to_datetime(['2014-02-01', '2014-03-01'])))
+        self.assertEqual(list(data), [1.0, 2.5, 3.0])
+        self.assertTrue(data.equals(store.read_series('X')))
+
+    @mock.patch('fredapi.transport.HTTPTransport.get')
+    def test_metadata(self, http_get):
+        """Info and search results are upserted into one table."""
+        store = SeriesStore(self.directory)
+        http_get.return_value = search_call.response
+        store.write_metadata(self.fred.search_by_release(175, limit=3))
+        http_get.return_value = payems_info_call.response
+        store.write_metadata(self.fred.get_series_info('PAYEMS'))
+        store.write_metadata(self.fred.get_series_info('PAYEMS'))
+        info = store.read_metadata(columns=['title', 'frequency_short'])
+        self.assertEqual(list(info.columns), ['title', 'frequency_short'])
+        self.assertEqual(len(info), 4)
+        self.assertEqual(info.loc['PAYEMS', 'title'], 'All Employees: Total Nonfarm Payrolls')
+        self.assertEqual(list(store.read_metadata(['PCPI01001']).index), ['PCPI01001'])
+
+
+if __name__ == '__main__':
+    unittest.main()
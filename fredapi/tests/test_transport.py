@@ -0,0 +1,135 @@
+from __future__ import unicode_literals
+
+import base64
+import http.client
+import os
+import unittest
+from unittest import mock
+
+import fredapi
+from fredapi.transport import HTTPError, HTTPTransport, UrllibTransport
+from fredapi.tests.fake_server import FakeFredServer, FakeProxyServer
+
+
+observations = '''\
+<?xml version="1.0" encoding="utf-8" ?>
+<observations count="2" offset="0" limit="100000">
+  <observation realtime_start="2015-06-28" realtime_end="2015-06-28"
+               date="2014-09-02" value="2002.28"/>
+  <observation realtime_start="2015-06-28" realtime_end="2015-06-28"
+               date="2014-09-03" value="."/>
+</observations>'''
+
+
+class TestHTTPTransport(unittest.TestCase):
+    """Run the transports against a local stand-in server."""
+
+    def setUp(self):
+        self.server = FakeFredServer({
+            '/fred/series/observations?series_id=SP500':
+                (200, observations),
+            '/fred/series?series_id=invalid':
+                (400, '<error code="400" message="Bad Request." />'),
+        })
+        self.server.__enter__()
+        self.transport = HTTPTransport(pool_size=2, timeout=5)
+        self.fred = fredapi.Fred(api_key='secret', transport=self.transport)
+        self.fred.root_url = self.server.url + '/fred'
+
+    def tearDown(self):
+        self.transport.close()
+        self.server.__exit__()
+
+    def test_connection_is_reused(self):
+        """Consecutive requests go over a single keep-alive connection."""
+        for _ in range(3):
+            serie = self.fred.get_series('SP500')
+        self.assertEqual(len(self.server.requests), 3)
+        self.assertEqual(len(set(self.server.clients)), 1)
+        self.assertEqual(serie.iloc[0], 2002.28)
+        self.assertEqual(len(serie), 2)
+
+    def test_gzip_body_is_decoded(self):
+        """Compressed responses are decompressed transparently."""
+        url = self.server.url + '/fred/series/observations?series_id=SP500'
+        self.assertEqual(self.transport.get(url), observations.encode())
+
+    def test_error_status(self):
+        """Error responses raise HTTPError carrying the response body."""
+        url = self.server.url + '/fred/series?series_id=invalid'
+        with self.assertRaises(HTTPError) as context:
+            self.transport.get(url)
+        self.assertEqual(context.exception.code, 400)
+        with self.assertRaises(ValueError) as context:
+            self.fred.get_series_info('invalid')
+        self.assertEqual(str(context.exception), 'Bad Request.')
+
+    def test_streamed_parsing(self):
+        """Streamed XML responses give the same results and the connection is still reused."""
+        fred = fredapi.Fred(api_key='secret', transport=self.transport, stream=True)
+        fred.root_url = self.server.url + '/fred'
+        for _ in range(2):
+            serie = fred.get_series('SP500')
+        self.assertTrue(serie.equals(self.fred.get_series('SP500')))
+        self.assertEqual(len(set(self.server.clients)), 1)
+        with self.assertRaises(ValueError) as context:
+            fred.get_series_info('invalid')
+        self.assertEqual(str(context.exception), 'Bad Request.')
+
+    def test_urllib_transport(self):
+        """The urllib transport works against the same server."""
+        fred = fredapi.Fred(api_key='secret', transport=UrllibTransport())
+        fred.root_url = self.server.url + '/fred'
+        self.assertEqual(len(fred.get_series('SP500')), 2)
+
+
+class TestProxies(unittest.TestCase):
+    """Run HTTPTransport through a local forwarding proxy."""
+
+    def setUp(self):
+        self.server = FakeFredServer({'/fred/series/observations?series_id=SP500': (200, observations)})
+        self.server.__enter__()
+        self.proxy = FakeProxyServer()
+        self.proxy.__enter__()
+        self.url = self.server.url + '/fred/series/observations?series_id=SP500'
+        # run without any proxy settings inherited from the environment
+        environ = dict((key, value) for key, value in os.environ.items() if not key.lower().endswith('_proxy'))
+        self.environ = mock.patch.dict(os.environ, environ, clear=True)
+        self.environ.start()
+
+    def tearDown(self):
+        self.environ.stop()
+        self.proxy.__exit__()
+        self.server.__exit__()
+
+    def test_connect_tunnel(self):
+        """https requests are tunnelled with CONNECT, sending the proxy credentials."""
+        transport = HTTPTransport(proxies={'https': self.proxy.url.replace('//', '//user:secret@')})
+        url = self.url.replace('http://', 'https://')
+        # the stand-in server speaks plain http, so the tunnel is not wrapped in TLS
+        with mock.patch('http.client.HTTPSConnection', http.client.HTTPConnection), transport:
+            self.assertEqual(transport.get(url), observations.encode())
+        target = self.server.url.split('//')[1]
+        credentials = 'Basic ' + base64.b64encode(b'user:secret').decode()
+        self.assertEqual(self.proxy.requests, [('CONNECT', target, credentials)])
+        self.assertEqual(len(self.server.requests), 1)
+
+    def test_environment_proxies(self):
+        """Lowercase proxy variables are honoured, and no_proxy hosts are reached directly."""
+        os.environ['http_proxy'] = self.proxy.url
+        fred = fredapi.Fred(api_key='secret')
+        fred.root_url = self.server.url + '/fred'
+        self.assertEqual(fred.proxies['http'], self.proxy.url)
+        self.assertEqual(len(fred.get_series('SP500')), 2)
+        self.assertEqual([request[:2] for request in self.proxy.requests],
+                         [('GET', self.url + '&api_key=secret')])
+
+        os.environ['no_proxy'] = '127.0.0.1'
+        with HTTPTransport() as transport:
+            self.assertEqual(transport.get(self.url), observations.encode())
+        self.assertEqual(len(self.proxy.requests), 1)
+        self.assertEqual(len(self.server.requests), 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
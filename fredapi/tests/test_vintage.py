@@ -0,0 +1,93 @@
+from __future__ import unicode_literals
+
+import unittest
+from unittest import mock
+
+import fredapi
+from fredapi.tests.test_fred import gdp_all_releases_call
+from fredapi.vintage import VintageStore
+
+
+vintage_dates = '''\
+<vintage_dates count="%d">%s</vintage_dates>'''
+
+# revisions released from 2014-05-29 on, as returned with realtime_start=2014-05-29: values that were still current
+# on that date come back with their realtime_start clipped to it
+recent_releases = '''\
+<observations count="4">
+  <observation realtime_start="2014-05-29" realtime_end="9999-12-31"
+               date="2013-10-01" value="17089.6"/>
+  <observation realtime_start="2014-05-29" realtime_end="2014-06-24"
+               date="2014-01-01" value="17101.3"/>
+  <observation realtime_start="2014-06-25" realtime_end="9999-12-31"
+               date="2014-01-01" value="17016.0"/>
+  <observation realtime_start="2014-07-30" realtime_end="9999-12-31"
+               date="2014-04-01" value="17294.7"/>
+</observations>'''
+
+
+def make_vintage_dates(*dates):
+    return vintage_dates % (len(dates), ''.join('<vintage_date>%s</vintage_date>' % d for d in dates))
+
+
+class TestVintageStore(unittest.TestCase):
+
+    def setUp(self):
+        self.fred = fredapi.Fred(api_key='secret')
+        self.store = VintageStore(self.fred)
+
+    @mock.patch('fredapi.transport.HTTPTransport.get')
+    def test_as_of_queries(self, http_get):
+        """The history is downloaded once and as-of queries match Fred."""
+        http_get.return_value = gdp_all_releases_call.response
+        for as_of_date in ['2014-01-29', '2014-02-27', '2014-02-28', '2014-05-01']:
+            expected = self.fred.get_series_as_of_date('GDP', as_of_date)
+            data = self.store.get_series_as_of_date('GDP', as_of_date)
+            self.assertEqual(list(data.columns), list(expected.columns))
+            self.assertEqual(list(data['date']), list(expected['date']))
+            self.assertEqual(list(data['realtime_start']), list(expected['realtime_start']))
+            self.assertEqual(list(data['value'].fillna(0)), list(expected['value'].fillna(0)))
+        self.assertEqual(http_get.call_count, 5)
+        self.assertEqual(len(self.store.get_series_as_of_date('GDP', '2013-12-31')), 0)
+        first = self.store.get_series_first_release('GDP')
+        self.assertEqual(list(first.fillna(0)), [17102.5, 0])
+        panel = self.store.get_series_as_of_panel(['GDP'], ['2014-02-28', '2014-05-01'])
+        self.assertEqual(panel.loc[('2014-02-28', '2013-10-01'), 'GDP'], 17080.7)
+        self.assertEqual(len(panel), 3)
+        self.assertEqual(http_get.call_count, 5)
+        history = self.store.history('GDP')
+        self.assertTrue(history['realtime_end'].isnull().iloc[2])
+        self.assertEqual(str(history['realtime_end'].iloc[0].date()), '2014-02-27')
+
+    @mock.patch('fredapi.transport.HTTPTransport.get')
+    def test_update(self, http_get):
+        """Only revisions from the first new vintage date are requested."""
+        http_get.return_value = gdp_all_releases_call.response
+        self.store.load('GDP')
+
+        http_get.return_value = make_vintage_dates('2014-03-27', '2014-04-30')
+        self.assertFalse(self.store.update('GDP'))
+
+        def fake_get(url):
+            if 'vintagedates' in url:
+                return make_vintage_dates('2014-04-30', '2014-05-29', '2014-06-25', '2014-07-30')
+            self.assertIn('realtime_start=2014-05-29', url)
+            return recent_releases
+        http_get.side_effect = fake_get
+        self.assertTrue(self.store.update('GDP'))
+
+        history = self.store.history('GDP')
+        self.assertEqual(len(history), 7)
+        # the value current on 2014-05-29 keeps the date it was first reported on
+        self.assertEqual(list(history['realtime_start'].dt.strftime('%Y-%m-%d')[:3]),
+                         ['2014-01-30', '2014-02-28', '2014-03-27'])
+        data = self.store.get_series_as_of_date('GDP', '2014-06-01')
+        self.assertEqual(list(data['value']), [17089.6, 17101.3])
+        data = self.store.get_series_as_of_date('GDP', '2014-05-01')
+        self.assertEqual(data['value'].iloc[0], 17089.6)
+        self.assertTrue(data['value'].isnull().iloc[1])
+        self.assertEqual(len(self.store.get_series_as_of_date('GDP', '2014-08-01')), 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,482 @@
+"""
+HTTP transports used by Fred to talk to the FRED web service.
+
+A transport is any object with a ``get(url)`` method returning the response body as bytes, raising
+``urllib.error.HTTPError`` for error responses, and a ``close()`` method. Each Fred instance owns its transport, so
+connection pools, timeouts and proxies are configured per instance rather than process-wide. Transports for
+fredapi.async_fred.AsyncFred have the same interface with ``get`` and ``close`` as coroutines. Transports may
+also provide ``open(url)``, returning a file-like object to read the body from as it arrives, which Fred uses to
+parse responses incrementally.
+"""
+import base64
+import gzip
+import io
+import ssl
+import threading
+import zlib
+import http.client as http_client
+import urllib.error as url_error
+import urllib.parse as url_parse
+import urllib.request as url_request
+
+from fredapi.lazy import LazyModule
+
+# asyncio is only needed by AsyncHTTPTransport, so it is imported on first use
+asyncio = LazyModule('asyncio')
+
+HTTPError = url_error.HTTPError
+
+# errors raised when a pooled keep-alive connection has been closed by the server while it sat idle
+_STALE_CONNECTION_ERRORS = (http_client.RemoteDisconnected, http_client.BadStatusLine,
+                            ConnectionResetError, BrokenPipeError)
+
+_REDIRECT_CODES = (301, 302, 303, 307, 308)
+
+
+def _decode_body(body, encoding):
+    """
+    helper function for decompressing a response body according to its Content-Encoding header
+    """
+    encoding = (encoding or '').strip().lower()
+    if encoding in ('gzip', 'x-gzip'):
+        return gzip.decompress(body)
+    if encoding == 'deflate':
+        try:
+            return zlib.decompress(body)
+        except zlib.error:
+            return zlib.decompress(body, -zlib.MAX_WBITS)
+    return body
+
+
+class _PooledResponse(object):
+    """
+    File-like view of a response body that is read straight from a pooled connection, decompressing on the fly. The
+    connection goes back to the pool when the stream is closed after the whole body has been read.
+    """
+
+    def __init__(self, transport, key, conn, response):
+        self._transport = transport
+        self._key = key
+        self._conn = conn
+        self._response = response
+        encoding = (response.getheader('Content-Encoding') or '').strip().lower()
+        if encoding in ('gzip', 'x-gzip'):
+            self._stream = gzip.GzipFile(fileobj=response)
+        elif encoding == 'deflate':
+            self._stream = io.BytesIO(_decode_body(response.read(), encoding))
+        else:
+            self._stream = response
+
+    def read(self, size=-1):
+        return self._stream.read(size)
+
+    def close(self):
+        if self._conn is None:
+            return
+        conn, self._conn = self._conn, None
+        if self._response.isclosed() and not self._response.will_close:
+            self._transport._release(self._key, conn)
+        else:
+            conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class HTTPTransport(object):
+    """
+    Transport that keeps persistent (keep-alive) connections to each host in a bounded pool, and asks for
+    gzip-compressed responses.
+    """
+
+    def __init__(self, pool_size=10, timeout=30, proxies=None, compress=True, max_redirects=5):
+        """
+        Parameters
+        ----------
+        pool_size : int
+            maximum number of idle connections kept open per host
+        timeout : float
+            socket timeout in seconds for connecting and reading
+        proxies : dict, optional
+            a dictionary mapping protocol names (e.g. 'http', 'https') to proxy URLs. If not given, the proxies set in
+            the environment (http_proxy, https_proxy, HTTPS_PROXY, ...) are used as urllib would, skipping the hosts
+            listed in no_proxy.
+        compress : bool
+            whether to request gzip-compressed responses
+        max_redirects : int
+            maximum number of redirects followed for a single request
+        """
+        self.pool_size = pool_size
+        self.timeout = timeout
+        self.proxies = dict(proxies) if proxies else None
+        self.compress = compress
+        self.max_redirects = max_redirects
+        self._idle = {}
+        self._lock = threading.Lock()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _proxy_for(self, scheme, host):
+        if self.proxies is None:
+            if url_request.proxy_bypass(host):
+                return None
+            proxy = url_request.getproxies().get(scheme)
+        else:
+            proxy = self.proxies.get(scheme)
+        if not proxy:
+            return None
+        if '://' not in proxy:
+            proxy = 'http://' + proxy
+        return url_parse.urlsplit(proxy)
+
+    def _new_connection(self, scheme, host, port):
+        proxy = self._proxy_for(scheme, host)
+        if proxy is None:
+            conn_class = http_client.HTTPSConnection if scheme == 'https' else http_client.HTTPConnection
+            return conn_class(host, port, timeout=self.timeout)
+
+        proxy_headers = {}
+        if proxy.username:
+            credentials = '%s:%s' % (url_parse.unquote(proxy.username), url_parse.unquote(proxy.password or ''))
+            proxy_headers['Proxy-Authorization'] = 'Basic ' + base64.b64encode(credentials.encode()).decode()
+        if scheme == 'https':
+            # tunnel through the proxy with CONNECT, the target connection is then encrypted end to end
+            conn = http_client.HTTPSConnection(proxy.hostname, proxy.port or 80, timeout=self.timeout)
+            conn.set_tunnel(host, port, headers=proxy_headers)
+        else:
+            conn = http_client.HTTPConnection(proxy.hostname, proxy.port or 80, timeout=self.timeout)
+            conn._fredapi_proxy_headers = proxy_headers
+        return conn
+
+    def _acquire(self, key):
+        with self._lock:
+            idle = self._idle.get(key)
+            if idle:
+                return idle.pop(), True
+        return self._new_connection(*key), False
+
+    def _release(self, key, conn):
+        with self._lock:
+            idle = self._idle.setdefault(key, [])
+            if len(idle) < self.pool_size:
+                idle.append(conn)
+                return
+        conn.close()
+
+    def _request(self, url, stream=False):
+        parts = url_parse.urlsplit(url)
+        scheme = parts.scheme or 'http'
+        port = parts.port or (443 if scheme == 'https' else 80)
+        key = (scheme, parts.hostname, port)
+
+        headers = {'Accept-Encoding': 'gzip' if self.compress else 'identity',
+                   'Connection': 'keep-alive'}
+        target = parts.path or '/'
+        if parts.query:
+            target += '?' + parts.query
+
+        while True:
+            conn, reused = self._acquire(key)
+            request_target = target
+            request_headers = headers
+            proxy_headers = getattr(conn, '_fredapi_proxy_headers', None)
+            if proxy_headers is not None:
+                # plain http through a proxy: send the absolute URL to the proxy
+                request_target = url
+                request_headers = dict(headers, **proxy_headers)
+            try:
+                conn.request('GET', request_target, headers=request_headers)
+                response = conn.getresponse()
+                if stream and response.status < 300:
+                    return response, _PooledResponse(self, key, conn, response)
+                body = response.read()
+            except _STALE_CONNECTION_ERRORS:
+                conn.close()
+                if reused:
+                    continue
+                raise
+            except Exception:
+                conn.close()
+                raise
+            if response.will_close:
+                conn.close()
+            else:
+                self._release(key, conn)
+            return response, _decode_body(body, response.getheader('Content-Encoding'))
+
+    def get(self, url):
+        """
+        Fetch a URL and return the (decompressed) response body as bytes.
+
+        Raises
+        ------
+        HTTPError
+            if the server responds with an error status; the response body can be read from the exception
+        """
+        for _ in range(self.max_redirects + 1):
+            response, body = self._request(url)
+            if response.status in _REDIRECT_CODES and response.getheader('Location'):
+                url = url_parse.urljoin(url, response.getheader('Location'))
+                continue
+            if response.status >= 400:
+                raise HTTPError(url, response.status, response.reason, response.msg, io.BytesIO(body))
+            return body
+        raise HTTPError(url, response.status, 'Too many redirects', response.msg, io.BytesIO(body))
+
+    def open(self, url):
+        """
+        Fetch a URL and return a file-like object streaming the (decompressed) response body. Close it once done;
+        the connection is reused if the whole body has been read.
+
+        Raises
+        ------
+        HTTPError
+            if the server responds with an error status; the response body can be read from the exception
+        """
+        for _ in range(self.max_redirects + 1):
+            response, body = self._request(url, stream=True)
+            if not isinstance(body, bytes):
+                return body
+            if response.status in _REDIRECT_CODES and response.getheader('Location'):
+                url = url_parse.urljoin(url, response.getheader('Location'))
+                continue
+            raise HTTPError(url, response.status, response.reason, response.msg, io.BytesIO(body))
+        raise HTTPError(url, response.status, 'Too many redirects', response.msg, io.BytesIO(body))
+
+    def close(self):
+        """
+        Close all idle pooled connections.
+        """
+        with self._lock:
+            idle, self._idle = self._idle, {}
+        for connections in idle.values():
+            for conn in connections:
+                conn.close()
+
+
+class UrllibTransport(object):
+    """
+    Transport built on urllib's openers. It does not reuse connections, but follows urllib's handling of
+    redirects, proxies and authentication. The opener is private to the transport, so proxy settings do not leak
+    into other users of urllib in the same process.
+    """
+
+    def __init__(self, timeout=30, proxies=None):
+        """
+        Parameters
+        ----------
+        timeout : float
+            socket timeout in seconds
+        proxies : dict, optional
+            a dictionary mapping protocol names (e.g. 'http', 'https') to proxy URLs
+        """
+        self.timeout = timeout
+        self.proxies = proxies
+        handlers = [url_request.ProxyHandler(proxies)] if proxies else []
+        self.opener = url_request.build_opener(*handlers)
+
+    def get(self, url):
+        """
+        Fetch a URL and return the response body as bytes.
+        """
+        response = self.opener.open(url, timeout=self.timeout)
+        try:
+            return response.read()
+        finally:
+            response.close()
+
+    def open(self, url):
+        """
+        Fetch a URL and return a file-like object streaming the response body.
+        """
+        return self.opener.open(url, timeout=self.timeout)
+
+    def close(self):
+        pass
+
+
+class AsyncHTTPTransport(object):
+    """
+    Asyncio counterpart of HTTPTransport: keeps a bounded pool of persistent connections per host and asks for
+    gzip-compressed responses. Proxies are not supported; use a custom transport if you need one.
+    """
+
+    def __init__(self, pool_size=10, timeout=30, compress=True, max_redirects=5, ssl_context=None):
+        """
+        Parameters
+        ----------
+        pool_size : int
+            maximum number of idle connections kept open per host
+        timeout : float
+            timeout in seconds for connecting and for reading each response
+        compress : bool
+            whether to request gzip-compressed responses
+        max_redirects : int
+            maximum number of redirects followed for a single request
+        ssl_context : ssl.SSLContext, optional
+            context used for https connections, defaults to ssl.create_default_context()
+        """
+        self.pool_size = pool_size
+        self.timeout = timeout
+        self.compress = compress
+        self.max_redirects = max_redirects
+        self.ssl_context = ssl_context
+        self._idle = {}
+        self._loop = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    async def _open(self, scheme, host, port):
+        context = None
+        if scheme == 'https':
+            context = self.ssl_context or ssl.create_default_context()
+        return await asyncio.wait_for(asyncio.open_connection(host, port, ssl=context), self.timeout)
+
+    def _check_loop(self):
+        """
+        drop the idle connections opened in another event loop, e.g. by an earlier asyncio.run() call, since they
+        cannot be used from the running one
+        """
+        loop = asyncio.get_running_loop()
+        if self._loop is loop:
+            return
+        idle, self._idle = self._idle, {}
+        for connections in idle.values():
+            for _, writer in connections:
+                try:
+                    writer.close()
+                except RuntimeError:
+                    # the loop they were opened in is already closed
+                    pass
+        self._loop = loop
+
+    async def _acquire(self, key):
+        self._check_loop()
+        idle = self._idle.get(key)
+        while idle:
+            reader, writer = idle.pop()
+            if not reader.at_eof():
+                return (reader, writer), True
+            writer.close()
+        return await self._open(*key), False
+
+    def _release(self, key, connection):
+        idle = self._idle.setdefault(key, [])
+        if len(idle) < self.pool_size:
+            idle.append(connection)
+        else:
+            connection[1].close()
+
+    async def _read_response(self, reader):
+        status_line = await reader.readline()
+        if not status_line:
+            raise ConnectionResetError('connection closed by server')
+        parts = status_line.decode('latin-1').rstrip('\r\n').split(' ', 2)
+        version, status = parts[0], int(parts[1])
+        reason = parts[2] if len(parts) > 2 else ''
+
+        raw_headers = []
+        while True:
+            line = await reader.readline()
+            raw_headers.append(line)
+            if line in (b'\r\n', b'\n', b''):
+                break
+        headers = http_client.parse_headers(io.BytesIO(b''.join(raw_headers)))
+
+        keep_alive = version == 'HTTP/1.1' and headers.get('Connection', '').lower() != 'close'
+        if headers.get('Transfer-Encoding', '').lower() == 'chunked':
+            chunks = []
+            while True:
+                size = int((await reader.readline()).split(b';')[0], 16)
+                if size == 0:
+                    while (await reader.readline()) not in (b'\r\n', b'\n', b''):
+                        pass
+                    break
+                chunks.append(await reader.readexactly(size))
+                await reader.readline()
+            body = b''.join(chunks)
+        elif headers.get('Content-Length') is not None:
+            body = await reader.readexactly(int(headers['Content-Length']))
+        else:
+            body = await reader.read()
+            keep_alive = False
+        return status, reason, headers, body, keep_alive
+
+    async def _request(self, url):
+        parts = url_parse.urlsplit(url)
+        scheme = parts.scheme or 'http'
+        port = parts.port or (443 if scheme == 'https' else 80)
+        key = (scheme, parts.hostname, port)
+
+        target = parts.path or '/'
+        if parts.query:
+            target += '?' + parts.query
+        request = ('GET %s HTTP/1.1\r\nHost: %s\r\nAccept-Encoding: %s\r\nConnection: keep-alive\r\n\r\n'
+                   % (target, parts.netloc, 'gzip' if self.compress else 'identity')).encode('latin-1')
+
+        while True:
+            (reader, writer), reused = await self._acquire(key)
+            try:
+                writer.write(request)
+                await writer.drain()
+                status, reason, headers, body, keep_alive = await asyncio.wait_for(self._read_response(reader),
+                                                                                   self.timeout)
+            except (ConnectionError, asyncio.IncompleteReadError):
+                writer.close()
+                if reused:
+                    continue
+                raise
+            except BaseException:
+                writer.close()
+                raise
+            if keep_alive:
+                self._release(key, (reader, writer))
+            else:
+                writer.close()
+            return status, reason, headers, _decode_body(body, headers.get('Content-Encoding'))
+
+    async def get(self, url):
+        """
+        Fetch a URL and return the (decompressed) response body as bytes.
+
+        Raises
+        ------
+        HTTPError
+            if the server responds with an error status; the response body can be read from the exception
+        """
+        for _ in range(self.max_redirects + 1):
+            status, reason, headers, body = await self._request(url)
+            if status in _REDIRECT_CODES and headers.get('Location'):
+                url = url_parse.urljoin(url, headers['Location'])
+                continue
+            if status >= 400:
+                raise HTTPError(url, status, reason, headers, io.BytesIO(body))
+            return body
+        raise HTTPError(url, status, 'Too many redirects', headers, io.BytesIO(body))
+
+    async def close(self):
+        """
+        Close all idle pooled connections.
+        """
+        self._check_loop()
+        idle, self._idle = self._idle, {}
+        self._loop = None
+        writers = [writer for connections in idle.values() for _, writer in connections]
+        for writer in writers:
+            writer.close()
+        for writer in writers:
+            try:
+                await writer.wait_closed()
+            except (ConnectionError, ssl.SSLError):
+                pass
@@ -0,0 +1,209 @@
+"""
+Local store of series revision histories, for point-in-time queries without further requests.
+"""
+import threading
+
+import numpy as np
+import pandas as pd
+
+# realtime_end of values that are still current
+_OPEN = np.iinfo(np.int64).max
+
+
+def _days(values):
+    """
+    helper function for converting datetime64 values to whole days since the epoch, with NaT mapped to _OPEN
+    """
+    values = np.asarray(values, dtype='datetime64[ns]')
+    days = values.astype('datetime64[D]').astype('int64')
+    days[np.isnat(values)] = _OPEN
+    return days
+
+
+class _History(object):
+    """
+    Revision history of one series sorted by date and realtime_start, with the arrays used for binary searches:
+    every row gets the key (date number << 32) + realtime_start day, so the row holding the value of a date as of a
+    given day is found with a single searchsorted call for all dates at once.
+    """
+
+    def __init__(self, frame, last_vintage=None):
+        frame = frame.sort_values(['date', 'realtime_start'], kind='mergesort').reset_index(drop=True)
+        self.frame = frame
+        dates = _days(frame['date'])
+        new_date = np.empty(len(dates), dtype=bool)
+        new_date[:1] = True
+        new_date[1:] = dates[1:] != dates[:-1]
+        self.starts = np.flatnonzero(new_date)
+        self.group_keys = np.arange(len(self.starts), dtype='int64') << 32
+        groups = np.cumsum(new_date) - 1
+        self.keys = (groups << 32) + (_days(frame['realtime_start']) + (1 << 31))
+        self.realtime_end = _days(frame['realtime_end'])
+        if last_vintage is None and len(frame):
+            last_vintage = frame['realtime_start'].max()
+        self.last_vintage = last_vintage
+
+    def rows_as_of(self, day):
+        """
+        Return the positions of the rows holding the value of each date as known on day, a number of days since the
+        epoch. Dates that had not been released yet, or had been dropped, by then are left out.
+        """
+        rows = np.searchsorted(self.keys, self.group_keys + (day + (1 << 31)), side='right') - 1
+        valid = rows >= self.starts
+        valid[valid] = self.realtime_end[rows[valid]] >= day
+        return rows[valid]
+
+
+class VintageStore(object):
+    """
+    In-memory store of the full revision history of series, including realtime_end, so that point-in-time queries
+    are answered locally by binary search instead of downloading the history again for every as-of date. Histories
+    are downloaded on first use, and update() fetches only the vintages released since. Safe to share between
+    threads.
+    """
+
+    def __init__(self, fred):
+        """
+        Parameters
+        ----------
+        fred : Fred
+            client used to download the revision histories
+        """
+        self.fred = fred
+        self._histories = {}
+        self._lock = threading.Lock()
+
+    def __contains__(self, series_id):
+        return series_id in self._histories
+
+    def __len__(self):
+        return len(self._histories)
+
+    def _history(self, series_id):
+        """
+        helper function for getting the stored history of a series, downloading it if needed
+        """
+        history = self._histories.get(series_id)
+        if history is None:
+            self.load(series_id)
+            history = self._histories[series_id]
+        return history
+
+    def load(self, series_id):
+        """
+        Download the full revision history of a series into the store, replacing any stored one.
+        """
+        self.add(series_id, self.fred.get_series_all_releases(series_id, include_realtime_end=True))
+
+    def add(self, series_id, history, last_vintage=None):
+        """
+        Store a revision history, such as one returned by history() or by get_series_all_releases() with
+        include_realtime_end=True, replacing any stored one.
+
+        Parameters
+        ----------
+        series_id : str
+            Fred series id such as 'GDP'
+        history : DataFrame
+            revision history with columns 'realtime_start', 'realtime_end', 'date' and 'value'
+        last_vintage : datetime, optional
+            latest vintage date the history is known to cover, defaults to its latest realtime_start
+        """
+        history = _History(history[['realtime_start', 'realtime_end', 'date', 'value']], last_vintage)
+        with self._lock:
+            self._histories[series_id] = history
+
+    def history(self, series_id):
+        """
+        Return the stored revision history of a series as a DataFrame with columns 'realtime_start', 'realtime_end',
+        'date' and 'value', sorted by date and realtime_start.
+        """
+        return self._history(series_id).frame.copy()
+
+    def update(self, series_id):
+        """
+        Bring the stored history of a series up to date. get_series_vintage_dates() is checked for vintages newer
+        than the stored ones, and only the revisions from the first of them onwards are downloaded.
+
+        Returns
+        -------
+        updated : bool
+            whether new vintages were added
+        """
+        if series_id not in self._histories:
+            self.load(series_id)
+            return True
+        history = self._histories[series_id]
+        # a memoized list of vintage dates would hide new vintages
+        self.fred.invalidate_metadata(series_id)
+        vintage_dates = [pd.Timestamp(d) for d in self.fred.get_series_vintage_dates(series_id)]
+        new_vintages = [d for d in vintage_dates if history.last_vintage is None or d > history.last_vintage]
+        if not new_vintages:
+            return False
+
+        start = min(new_vintages)
+        recent = self.fred.get_series_all_releases(series_id, realtime_start=start.strftime('%Y-%m-%d'),
+                                                   include_realtime_end=True)
+        old = history.frame
+        # values that were already current on start come back with realtime_start clipped to start; restore the
+        # date they were first reported on
+        current = old.iloc[history.rows_as_of(_days([start])[0])].set_index('date')
+        clipped = (recent['realtime_start'] == start).to_numpy()
+        dates = recent.loc[clipped, 'date']
+        previous = dates.map(current['value']).to_numpy()
+        values = recent.loc[clipped, 'value'].to_numpy()
+        same = (previous == values) | (np.isnan(previous) & np.isnan(values) & dates.isin(current.index).to_numpy())
+        restored = recent.index[clipped][same]
+        recent.loc[restored, 'realtime_start'] = dates[same].map(current['realtime_start']).to_numpy()
+        # the other ones were revised on start
+        superseded = current[~current.index.isin(dates[same])].reset_index()
+        superseded['realtime_end'] = start - pd.Timedelta(days=1)
+
+        kept = old[old['realtime_end'] < start]
+        self.add(series_id, pd.concat([kept, superseded, recent], ignore_index=True), max(new_vintages))
+        return True
+
+    def get_series_as_of_date(self, series_id, as_of_date):
+        """
+        Get the data of a series as known on a particular date, from the stored revision history.
+
+        Parameters
+        ----------
+        series_id : str
+            Fred series id such as 'GDP'
+        as_of_date : datetime, or datetime-like str such as '10/25/2014'
+            Include data revisions on or before this date, and ignore revisions afterwards
+
+        Returns
+        -------
+        data : DataFrame
+            a DataFrame with the same columns as Fred.get_series_as_of_date(): realtime_start, date, and the latest
+            value known on as_of_date
+        """
+        history = self._history(series_id)
+        rows = history.rows_as_of(_days([pd.to_datetime(as_of_date)])[0])
+        return history.frame.iloc[rows][['realtime_start', 'date', 'value']]
+
+    def get_series_as_of_panel(self, series_ids, as_of_dates):
+        """
+        Get the data of several series as known on each of several dates from the stored revision histories, see
+        Fred.get_series_as_of_panel()
+        """
+        series_ids = list(dict.fromkeys(series_ids))
+        as_of_dates = self.fred._check_as_of_dates(as_of_dates)
+        histories = dict((series_id, self._history(series_id).frame) for series_id in series_ids)
+        return self.fred._as_of_panel(histories, as_of_dates)
+
+    def get_series_first_release(self, series_id):
+        """
+        Get the first release of each observation of a series, from the stored revision history.
+
+        Returns
+        -------
+        data : Series
+            a Series where each index is the observation date and the value is the first released one
+        """
+        history = self._history(series_id)
+        frame = history.frame
+        return pd.Series(frame['value'].to_numpy()[history.starts],
+                         index=pd.DatetimeIndex(frame['date'].to_numpy()[history.starts]), name='value')